@@ -0,0 +1,99 @@
+"""
+Load test for the knowledge base app.
+
+Runs a fixed number of GET requests over keep-alive connections at the given
+concurrency and reports requests/sec and latency percentiles.
+
+Usage:
+    python load_test.py --url http://localhost:4000/ --concurrency 50 --requests 5000
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def worker(url: str, count: int, headers: Dict[str, str], latencies: List[float], errors: List[str]) -> None:
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    connection = connection_class(parts.netloc, timeout=30)
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(f"HTTP {response.status}")
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            connection = connection_class(parts.netloc, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the knowledge base app")
+    parser.add_argument("--url", default="http://localhost:4000/", help="URL to request")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="Number of concurrent clients")
+    parser.add_argument("-n", "--requests", type=int, default=5000, help="Total number of requests")
+    parser.add_argument("--gzip", action="store_true", help="Send Accept-Encoding: gzip")
+    parser.add_argument("--etag", help="Send If-None-Match with this ETag to measure 304 responses")
+    args = parser.parse_args()
+
+    headers: Dict[str, str] = {}
+    if args.gzip:
+        headers["Accept-Encoding"] = "gzip"
+    if args.etag:
+        headers["If-None-Match"] = args.etag
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    per_worker, remainder = divmod(args.requests, args.concurrency)
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(args.url, per_worker + (1 if i < remainder else 0), headers, latencies, errors),
+        )
+        for i in range(args.concurrency)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"URL:          {args.url}")
+    print(f"Concurrency:  {args.concurrency}")
+    print(f"Requests:     {len(latencies)} ok, {len(errors)} failed in {elapsed:.2f}s")
+    print(f"Requests/sec: {len(latencies) / elapsed:.1f}")
+    if latencies:
+        print(f"Latency mean: {statistics.fmean(latencies) * 1000:.2f} ms")
+        print(f"Latency p50:  {percentile(latencies, 50) * 1000:.2f} ms")
+        print(f"Latency p95:  {percentile(latencies, 95) * 1000:.2f} ms")
+        print(f"Latency p99:  {percentile(latencies, 99) * 1000:.2f} ms")
+    if errors:
+        print(f"First error:  {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
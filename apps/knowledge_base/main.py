@@ -1,12 +1,189 @@
-from fastapi import FastAPI
+import base64
+import gzip
+import hashlib
 import json
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+KNOWLEDGE_BASE_PATH = os.getenv("KNOWLEDGE_BASE_PATH") or "knowledge_base.json"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class Snapshot:
+    """
+    One parsed version of the knowledge base file.
+
+    Everything a request needs (serialized and gzipped body, NDJSON lines,
+    validators) is computed once per version rather than once per request.
+    """
+
+    def __init__(self, raw: bytes, mtime_ns: int) -> None:
+        data = json.loads(raw)
+        self.documents: List[Dict[str, Any]] = data.get("documents", []) if isinstance(data, dict) else data
+        self.body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.gzipped_body = gzip.compress(self.body, mtime=0)
+        self.lines = [json.dumps(document, separators=(",", ":")).encode("utf-8") + b"\n" for document in self.documents]
+        self.etag = '"' + hashlib.sha256(raw).hexdigest()[:32] + '"'
+        # Strong validators differ per content-coding
+        self.gzip_etag = self.etag[:-1] + '-gzip"'
+        # HTTP dates have a one-second resolution
+        self.last_modified = datetime.fromtimestamp(mtime_ns // 1_000_000_000, tz=timezone.utc)
+        self.mtime_ns = mtime_ns
+
+    def headers(self, etag: Optional[str] = None) -> Dict[str, str]:
+        """Validator headers for a response derived from this version."""
+        return {
+            "ETag": etag or self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+
+    def not_modified(self, request: Request, *etags: str) -> bool:
+        """Check the request's conditional headers against this version, matching any of the given ETags."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or any(etag in tags for etag in etags or (self.etag,))
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                return self.last_modified <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+class KnowledgeBase:
+    """Knowledge base file, parsed once and reloaded when its mtime changes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Snapshot:
+        """Get the snapshot of the file as it is now, reparsing it only if it changed."""
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.mtime_ns != mtime_ns:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.mtime_ns != mtime_ns:
+                    with open(self.path, "rb") as f:
+                        snapshot = Snapshot(f.read(), mtime_ns)
+                    self._snapshot = snapshot
+        return snapshot
+
+
+class PrecompressedAwareGZipMiddleware(GZipMiddleware):
+    """GZip middleware leaving alone the paths that negotiate their own encoding."""
+
+    # Paths serving a precompressed body, see read_root
+    precompressed_paths = ("/",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.precompressed_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+knowledge_base = KnowledgeBase(KNOWLEDGE_BASE_PATH)
 
 app = FastAPI()
+# Compresses pages and streams; "/" serves its own precompressed body
+app.add_middleware(PrecompressedAwareGZipMiddleware, minimum_size=1000)
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode("ascii")).decode("ascii")
+
+
+def accepts_gzip(request: Request) -> bool:
+    """Check if the request's Accept-Encoding allows gzip, honoring q-values such as gzip;q=0."""
+    qualities: Dict[str, float] = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    if "gzip" in qualities:
+        return qualities["gzip"] > 0
+    if "x-gzip" in qualities:
+        return qualities["x-gzip"] > 0
+    return qualities.get("*", 0.0) > 0
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
 
 
 @app.get("/")
-def read_root():
-    with open("knowledge_base.json", "r") as f:
-        knowledge_base_data = json.load(f)
-    return knowledge_base_data
-    
+def read_root(request: Request):
+    kb = knowledge_base.current()
+    gzipped = accepts_gzip(request)
+    headers = kb.headers(kb.gzip_etag if gzipped else kb.etag)
+    # Every variant, 304s included, so that shared caches key on the encoding
+    headers["Vary"] = "Accept-Encoding"
+    if kb.not_modified(request, kb.etag, kb.gzip_etag):
+        return Response(status_code=304, headers=headers)
+
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(kb.gzipped_body, media_type="application/json", headers=headers)
+    return Response(kb.body, media_type="application/json", headers=headers)
+
+
+@app.get("/documents")
+def read_documents(
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    kb = knowledge_base.current()
+    offset = decode_cursor(cursor) if cursor else 0
+    etag = kb.etag[:-1] + f'-{offset}-{limit}"'
+    if kb.not_modified(request, etag):
+        return Response(status_code=304, headers=kb.headers(etag))
+
+    end = offset + limit
+    page = {
+        "documents": kb.documents[offset:end],
+        "next_cursor": encode_cursor(end) if end < len(kb.documents) else None,
+    }
+    body = json.dumps(page, separators=(",", ":")).encode("utf-8")
+    return Response(body, media_type="application/json", headers=kb.headers(etag))
+
+
+@app.get("/documents.ndjson")
+def stream_documents(request: Request):
+    kb = knowledge_base.current()
+    if kb.not_modified(request):
+        return Response(status_code=304, headers=kb.headers())
+
+    # The snapshot keeps streaming the same version even if the file is reloaded
+    return StreamingResponse(iter(kb.lines), media_type="application/x-ndjson", headers=kb.headers())
@@ -0,0 +1,153 @@
+"""
+Embedding backend benchmark.
+
+Loads each embedding backend in a fresh interpreter and measures:
+
+- load time, including the backend's imports
+- encode throughput over knowledge-base texts
+- peak RSS of the process
+- retrieval recall: paraphrased questions about each document of
+  knowledge_base.json must rank that document first (recall@1) or in the
+  top 3 (recall@3)
+
+Models are downloaded from the Hugging Face Hub on first use, so the first
+run needs network access.
+
+Usage:
+    uv run --extra onnx --extra fastembed python -m benchmarks.embeddings \\
+        [--backends huggingface onnx onnx-int8 fastembed] [--model NAME] [--texts 512] [--output FILE]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from benchmarks import fakes
+from benchmarks.suite import KNOWLEDGE_BASE_PATH, PROJECT_DIR, RESULT_PATH_ENV, run_child
+
+BACKENDS: List[str] = ["huggingface", "onnx", "onnx-int8", "fastembed"]
+
+# Questions paraphrasing one document each, with the title of that document
+RECALL_QUERIES: List[Tuple[str, str]] = [
+    ("interpreted language that is easy to read", "Python: Introduction"),
+    ("built-in modules for file handling and networking", "Python: Standard Library"),
+    ("PEP8 and virtual environments", "Python: Best Practices"),
+    ("open-source language with a syntax that is natural to write", "Ruby: Introduction"),
+    ("blocks, mixins and classes", "Ruby: Core Concepts"),
+    ("managing gems and test-driven development", "Ruby: Best Practices"),
+    ("functional language running on the Erlang VM", "Elixir: Introduction"),
+    ("supervision trees and the actor model", "Elixir: Concurrency and Fault Tolerance"),
+    ("pipeline operator and pattern matching", "Elixir: Best Practices"),
+]
+
+
+def cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def measure_backend(backend: str, model_name: str, texts: int) -> Dict[str, float]:
+    """
+    Load a backend and measure it, in the benchmarked process.
+
+    Args:
+        backend: Embedding backend, see EMBEDDING_BACKENDS
+        model_name: Model to load
+        texts: Number of texts encoded to measure throughput
+
+    Returns:
+        Load time, encode throughput and recall metrics
+    """
+    sys.path.insert(0, PROJECT_DIR)
+    from services.huggingface.embedding_model_service import EmbeddingModelService
+
+    start = time.perf_counter()
+    embeddings = EmbeddingModelService.get_embeddings(backend, model_name, "auto")
+    load_s = time.perf_counter() - start
+
+    documents: List[Dict[str, Any]] = json.loads(fakes.build_knowledge_base(KNOWLEDGE_BASE_PATH, texts))["documents"]
+    corpus = [f"{document['title']}\n{document['body']}" for document in documents]
+    # The first call initializes the runtime's kernels and thread pools
+    embeddings.embed_documents(corpus[:8])
+    start = time.perf_counter()
+    embeddings.embed_documents(corpus)
+    encode_s = time.perf_counter() - start
+
+    with open(KNOWLEDGE_BASE_PATH, "r", encoding="utf-8") as f:
+        originals: List[Dict[str, Any]] = json.load(f)["documents"]
+    titles = [document["title"] for document in originals]
+    vectors = embeddings.embed_documents([document["body"] for document in originals])
+    hits_at_1 = hits_at_3 = 0
+    for question, title in RECALL_QUERIES:
+        query_vector = embeddings.embed_query(question)
+        ranked = sorted(range(len(titles)), key=lambda i: cosine(query_vector, vectors[i]), reverse=True)
+        ranked_titles = [titles[i] for i in ranked]
+        hits_at_1 += ranked_titles[0] == title
+        hits_at_3 += title in ranked_titles[:3]
+
+    return {
+        "load_s": load_s,
+        "encode_ms_per_text": encode_s / len(corpus) * 1000,
+        "texts_per_s": len(corpus) / encode_s,
+        "recall_at_1": hits_at_1 / len(RECALL_QUERIES),
+        "recall_at_3": hits_at_3 / len(RECALL_QUERIES),
+        "dimension": len(vectors[0]),
+    }
+
+
+def run_child_backend(backend: str, args: List[str]) -> int:
+    """Entry point of the benchmarked processes: measure one backend and save its metrics."""
+    model_name, texts = args[0], int(args[1])
+    metrics = measure_backend(backend, model_name, texts)
+    with open(os.environ[RESULT_PATH_ENV], "w") as f:
+        json.dump(metrics, f)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the embedding backends")
+    parser.add_argument('--child', choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS, help='Backends to measure')
+    parser.add_argument('--model', default=os.getenv("EMBEDDING_MODEL_NAME") or "sentence-transformers/all-mpnet-base-v2",
+                        help='Model loaded by every backend, e.g. sentence-transformers/all-MiniLM-L6-v2')
+    parser.add_argument('--texts', type=int, default=512, help='Number of texts encoded to measure throughput')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    parser.add_argument('args', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child_backend(args.child, args.args)
+
+    results: Dict[str, Dict[str, float]] = {}
+    errors: Dict[str, str] = {}
+    with tempfile.TemporaryDirectory(prefix="lowe-embeddings-bench-") as workdir:
+        for backend in args.backends:
+            print(f"Measuring {backend} ...", file=sys.stderr)
+            result = run_child(backend, [args.model, str(args.texts)], dict(os.environ), workdir, module="benchmarks.embeddings")
+            if result.returncode != 0 or not result.metrics:
+                lines = result.output.strip().splitlines()
+                errors[backend] = lines[-1] if lines else f"exit status {result.returncode}"
+                continue
+            results[backend] = {**result.metrics, "peak_rss_mb": result.peak_rss_mb}
+
+    columns = ["load_s", "texts_per_s", "encode_ms_per_text", "peak_rss_mb", "recall_at_1", "recall_at_3", "dimension"]
+    print(f"model: {args.model}")
+    print(f"{'backend':12}" + "".join(f"{column:>20}" for column in columns))
+    for backend, metrics in results.items():
+        print(f"{backend:12}" + "".join(f"{metrics[column]:>20.3f}" for column in columns))
+    for backend, error in errors.items():
+        print(f"{backend:12} failed: {error}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model, "texts": args.texts, "results": results, "errors": errors}, f, indent=2, sort_keys=True)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
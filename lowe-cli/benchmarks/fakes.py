@@ -0,0 +1,199 @@
+"""
+Deterministic local stand-ins for the chat model, the embeddings model and the knowledge base.
+
+They let the benchmarks run offline and give the same numbers for the same
+code: the fake chat model answers with a fixed text at a fixed latency, and
+the fake embeddings are derived from a hash of the text.
+
+The fakes are installed with import hooks, so that they only load the modules
+the code under measurement would load anyway.
+"""
+import hashlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+# Settings of the fakes, passed to the benchmarked processes through the environment
+FIRST_TOKEN_LATENCY_ENV: str = "BENCH_FIRST_TOKEN_MS"
+TOKEN_LATENCY_ENV: str = "BENCH_TOKEN_MS"
+RESPONSE_TOKENS_ENV: str = "BENCH_RESPONSE_TOKENS"
+REAL_EMBEDDINGS_ENV: str = "BENCH_REAL_EMBEDDINGS"
+EMBEDDING_SIZE: int = 768
+
+RESPONSE_WORDS: Sequence[str] = (
+    "Use", "`git", "rebase", "-i", "HEAD~3`", "to", "squash", "the", "last", "three", "commits.", "See", "[1]",
+    "for", "details", "on", "**interactive**", "rebasing", "and", "conflict", "resolution.",
+)
+
+
+def build_chat_model() -> Any:
+    """
+    Create the fake chat model configured by the BENCH_* environment variables.
+
+    Returns:
+        A chat model answering every prompt with the same text, streamed one
+        word at a time after BENCH_FIRST_TOKEN_MS, with BENCH_TOKEN_MS between words
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    class FakeChatModel(BaseChatModel):
+        """Chat model with a fixed answer and a fixed latency."""
+        first_token_latency: float = 0.0
+        token_latency: float = 0.0
+        response_tokens: int = 60
+
+        @property
+        def _llm_type(self) -> str:
+            return "lowe-benchmark-fake"
+
+        def _words(self) -> List[str]:
+            return [RESPONSE_WORDS[i % len(RESPONSE_WORDS)] + " " for i in range(self.response_tokens)]
+
+        def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+            time.sleep(self.first_token_latency + self.token_latency * max(self.response_tokens - 1, 0))
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self._words())))])
+
+        def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+            time.sleep(self.first_token_latency)
+            for i, word in enumerate(self._words()):
+                if i:
+                    time.sleep(self.token_latency)
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+                if run_manager is not None:
+                    run_manager.on_llm_new_token(word, chunk=chunk)
+                yield chunk
+
+    return FakeChatModel(
+        first_token_latency=float(os.getenv(FIRST_TOKEN_LATENCY_ENV) or 300) / 1000,
+        token_latency=float(os.getenv(TOKEN_LATENCY_ENV) or 5) / 1000,
+        response_tokens=int(os.getenv(RESPONSE_TOKENS_ENV) or 60),
+    )
+
+
+def build_embeddings() -> Any:
+    """Create embeddings derived from a hash of the text, with the size of the default model's."""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    return DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+
+
+class _PatchOnImport(importlib.abc.MetaPathFinder):
+    """Import hook applying a patch to a module right after it is executed."""
+
+    def __init__(self, patches: Dict[str, Callable[[ModuleType], None]]) -> None:
+        self.patches: Dict[str, Callable[[ModuleType], None]] = patches
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Optional[importlib.machinery.ModuleSpec]:
+        patch = self.patches.get(fullname)
+        if patch is None:
+            return None
+        # Let the regular finders locate the module, skipping this hook
+        sys.meta_path.remove(self)
+        try:
+            spec = importlib.util.find_spec(fullname)
+        finally:
+            sys.meta_path.insert(0, self)
+        if spec is None or spec.loader is None:
+            return spec
+        loader = spec.loader
+        exec_module = loader.exec_module
+
+        def exec_and_patch(module: ModuleType) -> None:
+            exec_module(module)
+            patch(module)
+
+        loader.exec_module = exec_and_patch  # type: ignore[method-assign]
+        return spec
+
+
+def install() -> None:
+    """Replace the chat model, and unless BENCH_REAL_EMBEDDINGS=1 the embeddings model, with the fakes."""
+    def patch_chat_models(module: ModuleType) -> None:
+        module.init_chat_model = lambda *args, **kwargs: build_chat_model()
+
+    def patch_embedding_model_service(module: ModuleType) -> None:
+        module.EmbeddingModelService._load = staticmethod(lambda backend, model_name, device: build_embeddings())
+
+    patches: Dict[str, Callable[[ModuleType], None]] = {"langchain.chat_models": patch_chat_models}
+    if os.getenv(REAL_EMBEDDINGS_ENV) != "1":
+        patches["services.huggingface.embedding_model_service"] = patch_embedding_model_service
+    sys.meta_path.insert(0, _PatchOnImport(patches))
+
+
+def build_knowledge_base(source_path: str, documents: int) -> bytes:
+    """
+    Build a knowledge base of a given size from the bundled one.
+
+    Args:
+        source_path: Path of knowledge_base.json
+        documents: Number of documents, the bundled ones are repeated with numbered titles and urls
+
+    Returns:
+        JSON body served as the knowledge base
+    """
+    with open(source_path, "r", encoding="utf-8") as f:
+        originals: List[Dict[str, Any]] = json.load(f)["documents"]
+    scaled: List[Dict[str, Any]] = []
+    for i in range(documents):
+        document = dict(originals[i % len(originals)])
+        copy = i // len(originals)
+        if copy:
+            document["title"] = f"{document.get('title', '')} ({copy})"
+            document["url"] = f"{document.get('url', '')}/{copy}"
+            document["body"] = f"{document.get('body', '')} Revision {copy}."
+        scaled.append(document)
+    return json.dumps({"documents": scaled}).encode("utf-8")
+
+
+class KnowledgeBaseServer:
+    """In-process HTTP server serving a knowledge base body, with ETag revalidation."""
+
+    def __init__(self, body: bytes) -> None:
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server: ThreadingHTTPServer = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def __enter__(self) -> "KnowledgeBaseServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,132 @@
+"""
+Import-time budget check for the one-shot entry points.
+
+Runs each entry point's import path in a fresh interpreter with
+``python -X importtime`` and fails when the cumulative import time goes over
+the budget, or when a module that only the RAG/chat paths need gets imported.
+
+Usage:
+    uv run python -m benchmarks.import_budget [--budget-ms 1500] [--command perform]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+PROJECT_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points checked by default, mapped to the handler they dispatch to
+ENTRY_POINTS: Dict[str, str] = {
+    '-p': 'perform',
+    '-d': 'help',
+}
+
+# Modules that must never be loaded on the -p / -d paths
+FORBIDDEN_MODULES: Tuple[str, ...] = (
+    'chromadb',
+    'langchain_chroma',
+    'langchain_huggingface',
+    'sentence_transformers',
+    'torch',
+    'onnxruntime',
+    'fastembed',
+    'langgraph',
+)
+
+IMPORT_LINE = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|( *)(\S+)")
+
+
+@dataclass
+class ImportReport:
+    """Parsed result of a ``-X importtime`` run."""
+    total_us: int = 0
+    top_level: List[Tuple[str, int]] = field(default_factory=list)
+    modules: List[str] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_us / 1000
+
+
+def parse_importtime(stderr: str) -> ImportReport:
+    """
+    Parse the stderr of a ``python -X importtime`` run.
+
+    Args:
+        stderr: Captured standard error of the interpreter
+
+    Returns:
+        ImportReport with the summed cumulative time of top-level imports
+    """
+    report = ImportReport()
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        cumulative, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        report.modules.append(module)
+        # Nested imports are already included in their parent's cumulative time
+        if len(indent) <= 1:
+            report.total_us += cumulative
+            report.top_level.append((module, cumulative))
+    return report
+
+
+def measure(command_name: str) -> ImportReport:
+    """
+    Import everything the given command needs in a fresh interpreter.
+
+    Args:
+        command_name: Command registered in the CommandFactory
+
+    Returns:
+        ImportReport for the command's import path
+    """
+    code = (
+        "import main\n"
+        "from services.commands.command_handlers import CommandHandlers\n"
+        f"CommandHandlers._factory.load_handler_class({command_name!r})\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing the '{command_name}' path failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check the cold-start import budget of LoweCLI entry points")
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv("LOWE_IMPORT_BUDGET_MS") or 1500),
+                        help='Maximum cumulative import time per entry point in milliseconds')
+    parser.add_argument('--command', action='append', choices=sorted(ENTRY_POINTS.values()),
+                        help='Command to check (defaults to all one-shot commands)')
+    parser.add_argument('--top', type=int, default=5, help='Number of heaviest imports to show')
+    args = parser.parse_args()
+
+    failed = False
+    for flag, command_name in ENTRY_POINTS.items():
+        if args.command and command_name not in args.command:
+            continue
+        report = measure(command_name)
+        forbidden = sorted({m.split('.')[0] for m in report.modules if m.split('.')[0] in FORBIDDEN_MODULES})
+        over_budget = report.total_ms > args.budget_ms
+        status = "FAIL" if over_budget or forbidden else "ok"
+        print(f"[{status}] lowe-cli {flag}: {report.total_ms:.1f} ms of imports (budget {args.budget_ms:.0f} ms)")
+        for module, cumulative in sorted(report.top_level, key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {module}")
+        if forbidden:
+            print(f"    forbidden imports: {', '.join(forbidden)}")
+        failed = failed or status == "FAIL"
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
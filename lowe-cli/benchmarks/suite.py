@@ -0,0 +1,413 @@
+"""
+Offline end-to-end benchmark suite.
+
+Serves a knowledge base from an in-process HTTP server and replaces the chat
+and embeddings models with the deterministic fakes of benchmarks.fakes, so it
+runs without an API key or network access. Every measurement runs in a fresh
+interpreter:
+
+- cold start of the -d, -p and -l entry points (wall time, repeated)
+- knowledge-base index build, and the no-op reindex that follows it
+- retrieval latency and lookup latency
+- per-turn latency of an ask session
+- peak RSS of each of these processes
+
+Results are written as JSON with one flat, lower-is-better metric per key
+(``*_s``, ``*_ms``, ``*_mb``), so runs on different commits can be compared
+with --compare.
+
+Usage:
+    uv run python -m benchmarks.suite [--repeat 5] [--documents 500] [--output FILE] [--compare BASELINE]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import fakes
+
+PROJECT_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KNOWLEDGE_BASE_PATH: str = os.path.join(os.path.dirname(PROJECT_DIR), "apps", "knowledge_base", "knowledge_base.json")
+RESULTS_DIR: str = os.path.join(PROJECT_DIR, "benchmarks", "results")
+RESULT_PATH_ENV: str = "BENCH_RESULT_PATH"
+
+# Entry points measured for cold start, with their arguments
+ENTRY_POINTS: Dict[str, List[str]] = {
+    'docs': ['-d', 'What is a list comprehension?'],
+    'perform': ['-p', 'show the last three commits'],
+    'lookup': ['-l', 'Elixir concurrency and fault tolerance'],
+}
+
+RETRIEVAL_QUERIES: List[str] = [
+    "What is Python used for?",
+    "modules in the standard library",
+    "ruby blocks and procs",
+    "elixir supervisors",
+    "best practices for readable code",
+    "fault tolerance",
+    "Ruby: Core Concepts",
+    "python documentation",
+]
+
+ASK_MESSAGES: List[str] = [
+    "TypeError: 'NoneType' object is not subscriptable",
+    "It happens in the line that reads the config file",
+    "How do I make that key optional?",
+    "And how would I test it?",
+]
+
+HISTORY_COMMANDS: List[str] = [
+    "git status", "git log --oneline -5", "ls -la", "cd ..", "bin/rails db:migrate", "docker compose up -d",
+    "uv sync", "python -m pytest -q", "git commit -m 'wip'", "grep -rn TODO .", "make build", "kubectl get pods",
+]
+
+# Metric suffixes compared between runs, all lower is better
+COMPARED_SUFFIXES = ("_s", "_ms", "_mb")
+
+
+@dataclass
+class ChildResult:
+    """Outcome of a benchmarked process."""
+    seconds: float
+    peak_rss_mb: float
+    returncode: int
+    output: str
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Get a percentile of sorted values by the nearest-rank method.
+
+    The result is the smallest value that at least pct percent of the values
+    are less than or equal to, so it is always one of the measured values
+    rather than an interpolation between two of them. 0.0 for no values.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_child(
+    scenario: str, args: List[str], env: Dict[str, str], workdir: str, module: str = "benchmarks.suite"
+) -> ChildResult:
+    """
+    Run a scenario in a fresh interpreter.
+
+    Args:
+        scenario: Name of the scenario, see SCENARIOS, or "cli" to run main with args
+        args: Arguments of the scenario
+        env: Environment of the process
+        workdir: Directory for the output and result files
+        module: Benchmark module run with --child scenario -- args
+
+    Returns:
+        Wall time, peak RSS, exit status, output tail and the metrics reported by the scenario
+    """
+    result_path = os.path.join(workdir, f"{scenario}.result.json")
+    output_path = os.path.join(workdir, f"{scenario}.out")
+    if os.path.exists(result_path):
+        os.remove(result_path)
+
+    with open(output_path, "wb") as output:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", module, "--child", scenario, "--", *args],
+            cwd=PROJECT_DIR,
+            env={**env, RESULT_PATH_ENV: result_path},
+            stdin=subprocess.DEVNULL,
+            stdout=output,
+            stderr=subprocess.STDOUT,
+        )
+        # wait4 reports the resource usage of this child only
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss_kb = usage.ru_maxrss / 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    with open(output_path, "r", encoding="utf-8", errors="replace") as f:
+        tail = f.read()[-2000:]
+    metrics: Dict[str, float] = {}
+    if os.path.exists(result_path):
+        with open(result_path, "r") as f:
+            metrics = json.load(f)
+    return ChildResult(seconds, peak_rss_kb / 1024, process.returncode, tail, metrics)
+
+
+def scenario_cli(args: List[str]) -> Dict[str, float]:
+    """Run the CLI entry point with the given arguments."""
+    import warnings
+    warnings.filterwarnings("ignore")
+    sys.argv = ["lowe-cli", *args]
+    import main
+    main.main()
+    return {}
+
+
+def scenario_index(args: List[str]) -> Dict[str, float]:
+    """Build the knowledge-base index from scratch, then run the reindex that finds nothing to change."""
+    from services.vector_db.indexing_service import IndexingService
+    from utils.constants import Constants
+
+    start = time.perf_counter()
+    stats = IndexingService.index_documents(Constants.KNOWLEDGE_BASE)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    IndexingService.index_documents(Constants.KNOWLEDGE_BASE)
+    noop_s = time.perf_counter() - start
+    return {"build_s": build_s, "noop_s": noop_s, "chunks": stats.added}
+
+
+def scenario_retrieval(args: List[str]) -> Dict[str, float]:
+    """Time retrieval of each query, then full lookups with the fake chat model."""
+    from services.llm_client import LlmClient
+    from utils.constants import Constants
+
+    client = LlmClient.get_instance()
+    retrieval_ms: List[float] = []
+    for query in RETRIEVAL_QUERIES:
+        start = time.perf_counter()
+        client.retrieve({"question": query, "k": Constants.RAG_TOP_K})
+        retrieval_ms.append((time.perf_counter() - start) * 1000)
+
+    lookup_ms: List[float] = []
+    for query in RETRIEVAL_QUERIES:
+        start = time.perf_counter()
+        client.retrieve_and_invoke(query, Constants.LOOKUP_SYSTEM_PROMPT)
+        lookup_ms.append((time.perf_counter() - start) * 1000)
+
+    # The first retrieval loads the embeddings model and opens the stores
+    warm = sorted(retrieval_ms[1:])
+    lookups = sorted(lookup_ms)
+    return {
+        "first_query_ms": retrieval_ms[0],
+        "p50_ms": percentile(warm, 50),
+        "p95_ms": percentile(warm, 95),
+        "lookup_p50_ms": percentile(lookups, 50),
+        "lookup_p95_ms": percentile(lookups, 95),
+    }
+
+
+def scenario_ask(args: List[str]) -> Dict[str, float]:
+    """Time each turn of an ask session, and its first chunk, as the terminal would receive them."""
+    from services.cli.cli_interface import CLIInterface
+
+    turns = int(args[0]) if args else len(ASK_MESSAGES)
+    cli = CLIInterface()
+    turn_ms: List[float] = []
+    first_chunk_ms: List[float] = []
+    for i in range(turns):
+        start = time.perf_counter()
+        first_chunk: Optional[float] = None
+        for _ in cli.stream_reply(ASK_MESSAGES[i % len(ASK_MESSAGES)]):
+            if first_chunk is None:
+                first_chunk = time.perf_counter()
+        end = time.perf_counter()
+        turn_ms.append((end - start) * 1000)
+        first_chunk_ms.append(((first_chunk or end) - start) * 1000)
+        cli.chat_management.summarize_in_background(cli.session_id)
+
+    warm = sorted(turn_ms[1:] or turn_ms)
+    return {
+        "first_turn_ms": turn_ms[0],
+        "turn_p50_ms": percentile(warm, 50),
+        "turn_p95_ms": percentile(warm, 95),
+        "first_chunk_p50_ms": percentile(sorted(first_chunk_ms), 50),
+    }
+
+
+SCENARIOS: Dict[str, Callable[[List[str]], Dict[str, float]]] = {
+    'cli': scenario_cli,
+    'index': scenario_index,
+    'retrieval': scenario_retrieval,
+    'ask': scenario_ask,
+}
+
+
+def run_scenario(scenario: str, args: List[str]) -> int:
+    """Entry point of the benchmarked processes: install the fakes, run a scenario and save its metrics."""
+    sys.path.insert(0, PROJECT_DIR)
+    fakes.install()
+    metrics = SCENARIOS[scenario](args)
+    with open(os.environ[RESULT_PATH_ENV], "w") as f:
+        json.dump(metrics, f)
+    return 0
+
+
+def git_revision() -> Dict[str, Any]:
+    """Get the commit the benchmarks ran on and whether the tree had local changes."""
+    def git(*args: str) -> str:
+        result = subprocess.run(["git", *args], cwd=PROJECT_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+def benchmark_environment(workdir: str, knowledge_base_url: str, args: argparse.Namespace) -> Dict[str, str]:
+    """Build the environment of the benchmarked processes, isolated in workdir."""
+    history_path = os.path.join(workdir, "history")
+    with open(history_path, "w") as f:
+        for i in range(args.history_lines):
+            f.write(HISTORY_COMMANDS[i % len(HISTORY_COMMANDS)] + "\n")
+
+    return {
+        **os.environ,
+        "PYTHONPATH": PROJECT_DIR,
+        "KNOWLEDGE_BASE_URL": knowledge_base_url,
+        "CHROMA_DB_PATH": os.path.join(workdir, "chroma"),
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "EMBEDDING_CACHE_DIR": os.path.join(workdir, "cache", "embeddings"),
+        "SESSIONS_DIR": os.path.join(workdir, "sessions"),
+        "DAEMON_SOCKET_PATH": os.path.join(workdir, "no-daemon.sock"),
+        "HISTFILE": history_path,
+        "RESPONSE_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        fakes.FIRST_TOKEN_LATENCY_ENV: str(args.first_token_ms),
+        fakes.TOKEN_LATENCY_ENV: str(args.token_ms),
+        fakes.RESPONSE_TOKENS_ENV: str(args.response_tokens),
+        fakes.REAL_EMBEDDINGS_ENV: "1" if args.real_embeddings else "0",
+    }
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every benchmark and collect the results."""
+    metrics: Dict[str, float] = {}
+    errors: Dict[str, str] = {}
+    workdir = args.workdir or tempfile.mkdtemp(prefix="lowe-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    def record(name: str, result: ChildResult) -> bool:
+        metrics[f"{name}.peak_rss_mb"] = max(metrics.get(f"{name}.peak_rss_mb", 0.0), result.peak_rss_mb)
+        for key, value in result.metrics.items():
+            metrics[f"{name}.{key}"] = value
+        if result.returncode != 0:
+            errors[name] = result.output
+            print(f"[FAIL] {name} exited with {result.returncode}", file=sys.stderr)
+        return result.returncode == 0
+
+    try:
+        body = fakes.build_knowledge_base(KNOWLEDGE_BASE_PATH, args.documents)
+        with fakes.KnowledgeBaseServer(body) as server:
+            env = benchmark_environment(workdir, server.url, args)
+
+            print("Building the index...", file=sys.stderr)
+            record("index", run_child("index", [], env, workdir))
+            print("Measuring retrieval...", file=sys.stderr)
+            record("retrieval", run_child("retrieval", [], env, workdir))
+            print("Measuring ask turns...", file=sys.stderr)
+            record("ask", run_child("ask", [str(args.turns)], env, workdir))
+
+            for name, cli_args in ENTRY_POINTS.items():
+                print(f"Measuring cold start of lowe-cli {cli_args[0]}...", file=sys.stderr)
+                seconds: List[float] = []
+                for _ in range(args.repeat):
+                    result = run_child("cli", cli_args, env, workdir)
+                    if not record(f"cold_start.{name}", result):
+                        break
+                    seconds.append(result.seconds)
+                if seconds:
+                    metrics[f"cold_start.{name}.median_s"] = statistics.median(seconds)
+                    metrics[f"cold_start.{name}.min_s"] = min(seconds)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        **git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "repeat": args.repeat,
+            "documents": args.documents,
+            "turns": args.turns,
+            "history_lines": args.history_lines,
+            "first_token_ms": args.first_token_ms,
+            "token_ms": args.token_ms,
+            "response_tokens": args.response_tokens,
+            "real_embeddings": args.real_embeddings,
+        },
+        "metrics": metrics,
+        "errors": errors,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compare the metrics of two runs.
+
+    Args:
+        results: Results of this run
+        baseline: Results of the run to compare with
+        threshold: Relative increase, e.g. 0.1 for 10%, above which a metric regressed
+
+    Returns:
+        Names of the regressed metrics
+    """
+    if results["settings"] != baseline.get("settings"):
+        print("warning: the baseline ran with different settings", file=sys.stderr)
+
+    regressions: List[str] = []
+    for name, value in sorted(results["metrics"].items()):
+        old = baseline.get("metrics", {}).get(name)
+        if old is None or not name.endswith(COMPARED_SUFFIXES):
+            continue
+        change = (value - old) / old if old else 0.0
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{'[REGRESSED]' if regressed else '           '} {name:40} {old:10.3f} -> {value:10.3f} ({change:+.1%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the offline LoweCLI benchmarks")
+    parser.add_argument('--child', choices=sorted(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument('--repeat', type=int, default=5, help='Cold starts per entry point')
+    parser.add_argument('--documents', type=int, default=500, help='Number of knowledge-base documents to index')
+    parser.add_argument('--turns', type=int, default=8, help='Number of ask turns')
+    parser.add_argument('--history-lines', type=int, default=10000, help='Number of lines of the shell history file')
+    parser.add_argument('--first-token-ms', type=float, default=300, help='Latency of the fake chat model before its first token')
+    parser.add_argument('--token-ms', type=float, default=5, help='Latency of the fake chat model between tokens')
+    parser.add_argument('--response-tokens', type=int, default=60, help='Length of the fake chat model answers')
+    parser.add_argument('--real-embeddings', action='store_true', help='Use the real embeddings model instead of the fake one')
+    parser.add_argument('--workdir', help='Keep the index, caches and process output in this directory')
+    parser.add_argument('--output', help='Results file (defaults to benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Results file to compare with')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative increase reported as a regression')
+    parser.add_argument('args', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_scenario(args.child, args.args)
+
+    results = run_suite(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{(results['commit'] or 'unknown')[:12]}{'-dirty' if results['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    for name, value in sorted(results["metrics"].items()):
+        print(f"{name:40} {value:10.3f}")
+    failed = bool(results["errors"])
+    if args.compare:
+        with open(args.compare, "r") as f:
+            failed = bool(compare(results, json.load(f), args.threshold)) or failed
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
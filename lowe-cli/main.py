@@ -1,6 +1,6 @@
 import argparse
+from utils.profiler import Profiler
 from dotenv import load_dotenv
-from services.lowe_cli import LoweCli
 
 INTRO_MSG: str = """
 Welcome to LoweCLI!
@@ -14,17 +14,58 @@ def main() -> None:
     parser.add_argument('-d', '--docs', help='Look up docs')
     parser.add_argument('-p', '--perform', help='execute user command')
     parser.add_argument('-l', '--lookup', help='Look up for a specific document')
+    parser.add_argument('--tag', action='append', dest='tags', metavar='TAG', help='restrict lookup to documents with this tag (repeatable)')
+    parser.add_argument('--reindex', action='store_true', help='update the index with knowledge base changes')
+    parser.add_argument('--serve', action='store_true', help='run a resident daemon that keeps models warm')
+    parser.add_argument('--no-cache', action='store_true', help='bypass the response cache')
+    parser.add_argument('--cache-stats', action='store_true', help='show response cache hit/miss counters')
+    parser.add_argument('--resume', nargs='?', const='', metavar='ID', help='resume the last chat session, or the one with this id')
+    parser.add_argument('--sessions', action='store_true', help='list stored chat sessions')
+    parser.add_argument('--batch', metavar='FILE', help='run the help/perform/lookup requests of a JSONL file ("-" for stdin) concurrently')
+    parser.add_argument('--batch-output', metavar='FILE', help='write batch results to this file instead of stdout')
+    parser.add_argument('--concurrency', type=int, metavar='N', help='maximum number of batch requests in flight')
+    parser.add_argument('--profile', action='store_true', help='print a per-stage timing breakdown (runs in-process)')
+    parser.add_argument('--profile-trace', metavar='FILE', help='also write the timings as Chrome trace-event JSON')
     args: argparse.Namespace = parser.parse_args()
-    if args.docs:
+    if args.profile or args.profile_trace:
+        Profiler.enable()
+    try:
+        run(args)
+    finally:
+        if Profiler.is_enabled():
+            Profiler.print_report(args.profile_trace)
+
+def run(args: argparse.Namespace) -> None:
+    # Imported after load_dotenv so that Constants picks up the .env settings
+    with Profiler.span("import services.lowe_cli"):
+        from services.lowe_cli import LoweCli
+    if Profiler.is_enabled():
+        # Profile this process rather than a daemon's
+        LoweCli.disable_daemon()
+    if args.no_cache:
+        LoweCli.disable_cache()
+    if args.cache_stats:
+        LoweCli.cache_stats()
+    elif args.sessions:
+        LoweCli.sessions()
+    elif args.serve:
+        LoweCli.serve()
+    elif args.batch:
+        LoweCli.batch(args.batch, args.batch_output, args.concurrency)
+    elif args.reindex:
+        LoweCli.reindex()
+    elif args.docs:
         LoweCli.help(args.docs)
     elif args.perform:
         LoweCli.perform(args.perform)
     elif args.lookup:
+        LoweCli.warm_up_lookup(args.lookup)
         LoweCli.index()
-        LoweCli.lookup(args.lookup)
+        LoweCli.lookup(args.lookup, args.tags)
     else:
-        print(INTRO_MSG)
-        LoweCli.ask()
+        if args.resume is None:
+            print(INTRO_MSG)
+        LoweCli.ask(args.resume)
 
 if __name__ == "__main__":
     import warnings
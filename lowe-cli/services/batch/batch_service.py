@@ -0,0 +1,264 @@
+"""Concurrent execution of many help, perform and lookup requests from a JSONL file."""
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, IO, Iterable, List, Optional
+from services.commands.command_factory import CommandFactory
+from utils.constants import Constants
+from utils.profiler import Profiler
+
+BATCH_COMMANDS = ("help", "perform", "lookup")
+
+
+@dataclass
+class BatchItem:
+    """One request of a batch, e.g. {"id": "q1", "command": "lookup", "input": "...", "tags": ["git"]}."""
+    id: str
+    command: str
+    input: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    # Set when the input line could not be parsed, the item is then reported without running
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one batch item."""
+    id: str
+    command: str
+    output: Optional[str] = None
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+    # Approximate tokens of the retrieved context sent to the model, None when no context was assembled
+    context_tokens: Optional[int] = None
+
+    def to_json(self) -> str:
+        """Serialize the result as one JSONL line, without the trailing newline."""
+        return json.dumps({
+            "id": self.id,
+            "command": self.command,
+            "output": self.output,
+            "error": self.error,
+            "latency_ms": round(self.latency_ms, 1),
+            "context_tokens": self.context_tokens,
+        }, ensure_ascii=False)
+
+
+@dataclass
+class BatchSummary:
+    """Totals of a batch run."""
+    total: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+
+class BatchService:
+    """
+    Runs batch items concurrently through the async model interface.
+
+    All items share the LlmClient singleton, so the model, the embeddings
+    and the vector store are loaded once. Concurrency is bounded by a
+    semaphore, and the start of each item by a token bucket rate limiter,
+    so throughput is set by the provider's rate limit rather than by
+    serial round-trips.
+    """
+
+    @staticmethod
+    def parse_line(line: str, line_number: int) -> Optional[BatchItem]:
+        """
+        Parse one line of a batch file.
+
+        Args:
+            line: JSON object with "command" (help, perform or lookup) and "input",
+                and optionally "id" and, for lookup, "tags"
+            line_number: Line number in the file, the id of items without one
+
+        Returns:
+            The item, with its error set if the line is invalid. None for blank lines.
+        """
+        if not line.strip():
+            return None
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            return BatchItem(str(line_number), "", "", error=f"Invalid JSON: {e}")
+        if not isinstance(data, dict):
+            return BatchItem(str(line_number), "", "", error="Expected a JSON object")
+
+        item_id = str(data.get("id", line_number))
+        command = data.get("command")
+        user_input = data.get("input")
+        if command not in BATCH_COMMANDS:
+            return BatchItem(item_id, str(command or ""), "", error=f"Unsupported command: {command}, expected one of {', '.join(BATCH_COMMANDS)}")
+        if not isinstance(user_input, str) or not user_input.strip():
+            return BatchItem(item_id, command, "", error="Missing input")
+        options: Dict[str, Any] = {}
+        if command == "lookup" and data.get("tags"):
+            tags = data["tags"]
+            options["tags"] = [tags] if isinstance(tags, str) else list(tags)
+        return BatchItem(item_id, command, user_input, options)
+
+    @staticmethod
+    def read_items(path: str) -> List[BatchItem]:
+        """
+        Read the items of a batch file.
+
+        Args:
+            path: Path of the JSONL file, "-" for stdin
+
+        Returns:
+            Items in file order
+        """
+        if path == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        items = (BatchService.parse_line(line, number) for number, line in enumerate(lines, 1))
+        return [item for item in items if item is not None]
+
+    @staticmethod
+    async def arun(
+        items: Iterable[BatchItem],
+        concurrency: int = Constants.BATCH_CONCURRENCY,
+        requests_per_second: float = Constants.BATCH_REQUESTS_PER_SECOND
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Run batch items concurrently.
+
+        Args:
+            items: Items to run
+            concurrency: Maximum number of items in flight
+            requests_per_second: Maximum rate at which items start, 0 for no limit
+
+        Yields:
+            Results in completion order. Failed items are reported with their
+            error rather than interrupting the batch.
+        """
+        items = list(items)
+        lookup_error: Optional[str] = None
+        if any(item.command == "lookup" and item.error is None for item in items):
+            # Build the index and open the vector store once, before the lookups race for them
+            lookup_error = await asyncio.to_thread(BatchService._prepare_lookup)
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        rate_limiter: Any = None
+        if requests_per_second > 0:
+            from langchain_core.rate_limiters import InMemoryRateLimiter
+
+            rate_limiter = InMemoryRateLimiter(requests_per_second=requests_per_second, check_every_n_seconds=0.05)
+        from services.llm_client import LlmClient
+
+        factory = CommandFactory()
+
+        async def run_item(item: BatchItem) -> BatchResult:
+            if item.error is not None:
+                return BatchResult(item.id, item.command, error=item.error)
+            if item.command == "lookup" and lookup_error is not None:
+                return BatchResult(item.id, item.command, error=lookup_error)
+            async with semaphore:
+                if rate_limiter is not None:
+                    await rate_limiter.aacquire()
+                start = time.perf_counter()
+                try:
+                    with Profiler.span(f"batch:{item.command}", id=item.id):
+                        handler = factory.get_handler(item.command, item.options)
+                        output = await handler.acompute(handler.prepare(item.input))
+                    return BatchResult(
+                        item.id, item.command, output=output, latency_ms=(time.perf_counter() - start) * 1000,
+                        context_tokens=LlmClient.context_tokens.get()
+                    )
+                except Exception as e:
+                    return BatchResult(
+                        item.id, item.command, error=f"{type(e).__name__}: {e}", latency_ms=(time.perf_counter() - start) * 1000
+                    )
+
+        tasks = [asyncio.ensure_future(run_item(item)) for item in items]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def run(
+        items: Iterable[BatchItem],
+        concurrency: int = Constants.BATCH_CONCURRENCY,
+        requests_per_second: float = Constants.BATCH_REQUESTS_PER_SECOND,
+        on_result: Optional[Callable[[BatchResult], None]] = None
+    ) -> List[BatchResult]:
+        """
+        Run batch items concurrently from synchronous code.
+
+        Args:
+            items: Items to run
+            concurrency: Maximum number of items in flight
+            requests_per_second: Maximum rate at which items start, 0 for no limit
+            on_result: Called with each result as soon as it completes
+
+        Returns:
+            Results in completion order
+        """
+        async def collect() -> List[BatchResult]:
+            results: List[BatchResult] = []
+            async for result in BatchService.arun(items, concurrency, requests_per_second):
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+            return results
+
+        return asyncio.run(collect())
+
+    @staticmethod
+    def run_file(
+        path: str,
+        output: IO[str],
+        concurrency: int = Constants.BATCH_CONCURRENCY,
+        requests_per_second: float = Constants.BATCH_REQUESTS_PER_SECOND
+    ) -> BatchSummary:
+        """
+        Run a batch file, writing each result as a JSONL line as soon as it completes.
+
+        Args:
+            path: Path of the JSONL batch file, "-" for stdin
+            output: Stream the results are written to
+            concurrency: Maximum number of items in flight
+            requests_per_second: Maximum rate at which items start, 0 for no limit
+
+        Returns:
+            Totals of the run
+        """
+        start = time.perf_counter()
+        summary = BatchSummary()
+
+        def write(result: BatchResult) -> None:
+            summary.total += 1
+            summary.failed += result.error is not None
+            output.write(result.to_json() + "\n")
+            output.flush()
+
+        BatchService.run(BatchService.read_items(path), concurrency, requests_per_second, write)
+        summary.elapsed = time.perf_counter() - start
+        return summary
+
+    @staticmethod
+    def _prepare_lookup() -> Optional[str]:
+        """
+        Build the index if it doesn't exist and load the vector store, without printing.
+
+        Returns:
+            Why lookups can't run, see LookupCommandHandler.embedding_model_error, None if they can
+        """
+        from services.commands.index_command_handler import IndexCommandHandler
+        from services.commands.lookup_command_handler import LookupCommandHandler
+        from services.llm_client import LlmClient
+
+        LookupCommandHandler.warm_up()
+        IndexCommandHandler().compute("")
+        error = LookupCommandHandler.embedding_model_error()
+        if error is None:
+            LlmClient.get_instance().get_chroma_service()
+        return error
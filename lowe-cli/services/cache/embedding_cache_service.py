@@ -0,0 +1,278 @@
+"""Persistent content-addressed cache of text embeddings."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from utils.constants import Constants
+from utils.profiler import Profiler
+
+# Bytes per stored vector component
+COMPONENT_SIZE: int = 2
+
+
+class EmbeddingCacheService:
+    """
+    On-disk store of the embeddings of one model, keyed by the sha256 of the text.
+
+    Vectors are stored as float16 rows of a file read through a memory map,
+    with a SQLite index from text hash to row. Once the store holds
+    EMBEDDING_CACHE_MAX_MB, the least recently used tenth of its rows is
+    freed for new vectors.
+    """
+
+    def __init__(self, model_id: str) -> None:
+        """
+        Initialize the store of a model. Its files are only created by the first put.
+
+        Args:
+            model_id: Id of the model the vectors come from, see EmbeddingModelService.model_id
+        """
+        self.model_id: str = model_id
+        self.path: str = os.path.join(
+            Constants.EMBEDDING_CACHE_DIR, hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16]
+        )
+        self.dimension: Optional[int] = None
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._vectors: Any = None
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        """Get the key of a document text, the hex sha256 of its UTF-8 encoding."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def query_key(text: str) -> str:
+        """
+        Get the key of a query text.
+
+        Models such as FastEmbed's or e5 embed queries differently from
+        documents, so a query never shares the entry of the same document text.
+        """
+        return hashlib.sha256(b"query\0" + text.encode("utf-8")).hexdigest()
+
+    def get(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Get the cached vectors of texts.
+
+        Args:
+            keys: Keys of the texts, see text_key and query_key
+
+        Returns:
+            Vectors by key, for the keys in the cache
+        """
+        with self._lock:
+            if not keys or not self._open(create=False):
+                return {}
+            found: Dict[str, int] = {}
+            unique = list(dict.fromkeys(keys))
+            # Stays under SQLite's limit on query parameters
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, row FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+            if not found:
+                return {}
+            vectors = self._read_rows(list(found.values()))
+            if vectors is None:
+                return {}
+            self._connection.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?", [(time.time(), key) for key in found]
+            )
+            self._connection.commit()
+        return dict(zip(found, vectors))
+
+    def put(self, vectors: Dict[str, List[float]]) -> None:
+        """
+        Store the vectors of texts, evicting the least recently used ones when the store is full.
+
+        Args:
+            vectors: Vectors by text key, see text_key and query_key
+        """
+        if not vectors:
+            return
+        import numpy as np
+
+        with self._lock:
+            dimension = len(next(iter(vectors.values())))
+            if not self._open(create=True, dimension=dimension) or dimension != self.dimension:
+                return
+            capacity = max(1, Constants.EMBEDDING_CACHE_MAX_MB * 1024 * 1024 // (dimension * COMPONENT_SIZE))
+            connection = self._connection
+            # Serializes row allocation with other processes sharing the store
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                allocated = connection.execute("SELECT value FROM meta WHERE name = 'rows'").fetchone()[0]
+                with open(self._vectors_path(), "r+b") as f:
+                    for key, vector in vectors.items():
+                        if connection.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone():
+                            continue
+                        free = connection.execute("SELECT row FROM free_rows LIMIT 1").fetchone()
+                        if free is None and allocated >= capacity:
+                            self._evict(max(1, capacity // 10))
+                            free = connection.execute("SELECT row FROM free_rows LIMIT 1").fetchone()
+                        if free is not None:
+                            row = free[0]
+                            connection.execute("DELETE FROM free_rows WHERE row = ?", (row,))
+                        else:
+                            row = allocated
+                            allocated += 1
+                        f.seek(row * dimension * COMPONENT_SIZE)
+                        f.write(np.asarray(vector, dtype=np.float16).tobytes())
+                        connection.execute(
+                            "INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)", (key, row, time.time())
+                        )
+                connection.execute("UPDATE meta SET value = ? WHERE name = 'rows'", (allocated,))
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f16")
+
+    def _open(self, create: bool, dimension: Optional[int] = None) -> bool:
+        """
+        Open the store on first use. Callers must hold the lock.
+
+        Args:
+            create: Create the store if it doesn't exist
+            dimension: Size of the vectors, needed to create the store
+
+        Returns:
+            Whether the store is open
+        """
+        if self._connection is not None:
+            return True
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                self.dimension = json.load(f)["dimension"]
+        elif create and dimension:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self._vectors_path(), "ab"):
+                pass
+            tmp_path = meta_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"model_id": self.model_id, "dimension": dimension}, f)
+            os.replace(tmp_path, meta_path)
+            self.dimension = dimension
+        else:
+            return False
+
+        connection = sqlite3.connect(os.path.join(self.path, "index.sqlite3"), timeout=10, check_same_thread=False)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, last_used REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        connection.execute("CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY)")
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        connection.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('rows', 0)")
+        connection.commit()
+        self._connection = connection
+        return True
+
+    def _read_rows(self, rows: List[int]) -> Optional[List[List[float]]]:
+        """Read vectors from the memory-mapped file, remapping it when it grew. Callers must hold the lock."""
+        import numpy as np
+
+        row_size = self.dimension * COMPONENT_SIZE
+        needed = max(rows) + 1
+        if self._vectors is None or len(self._vectors) < needed:
+            available = os.path.getsize(self._vectors_path()) // row_size
+            if available < needed:
+                return None
+            self._vectors = np.memmap(self._vectors_path(), dtype=np.float16, mode="r", shape=(available, self.dimension))
+        return self._vectors[rows].astype(np.float32).tolist()
+
+    def _evict(self, count: int) -> None:
+        """Free the rows of the least recently used entries. Callers must hold the lock and a write transaction."""
+        evicted = self._connection.execute(
+            "SELECT key, row FROM entries ORDER BY last_used, row LIMIT ?", (count,)
+        ).fetchall()
+        self._connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+        self._connection.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(row,) for _, row in evicted])
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper serving vectors of previously embedded texts from an EmbeddingCacheService.
+
+    The wrapped model is only loaded when a text misses the cache, so
+    repeated queries and re-indexed unchanged chunks never run it. Queries
+    are also kept in an in-memory LRU of EMBEDDING_CACHE_QUERY_LRU entries.
+    """
+
+    def __init__(self, model_id: str, load_model: Callable[[], Embeddings]) -> None:
+        """
+        Initialize the wrapper.
+
+        Args:
+            model_id: Id of the wrapped model, see EmbeddingModelService.model_id
+            load_model: Returns the wrapped model, called on the first cache miss
+        """
+        self.model_id: str = model_id
+        self.store: EmbeddingCacheService = EmbeddingCacheService(model_id)
+        self._load_model: Callable[[], Embeddings] = load_model
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queries_lock: threading.Lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, running the model only for those not in the cache."""
+        keys = [EmbeddingCacheService.text_key(text) for text in texts]
+        with Profiler.span("embedding_cache:get", texts=len(texts)):
+            cached = self._get(keys)
+        missing: Dict[str, str] = {key: text for key, text in zip(keys, texts) if key not in cached}
+        if missing:
+            computed = self._load_model().embed_documents(list(missing.values()))
+            new_vectors = dict(zip(missing, computed))
+            self._put(new_vectors)
+            cached.update(new_vectors)
+        return [cached[key] for key in keys]
+
+    def is_cached(self, text: str) -> bool:
+        """Check if the query embedding of a text can be served without the model."""
+        key = EmbeddingCacheService.query_key(text)
+        with self._queries_lock:
+            if key in self._queries:
+                return True
+        return key in self._get([key])
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, from the in-memory LRU or the cache when it was embedded before."""
+        key = EmbeddingCacheService.query_key(text)
+        with self._queries_lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                return vector
+        with Profiler.span("embedding_cache:get", texts=1):
+            vector = self._get([key]).get(key)
+        if vector is None:
+            vector = self._load_model().embed_query(text)
+            self._put({key: vector})
+        with self._queries_lock:
+            self._queries[key] = vector
+            while len(self._queries) > Constants.EMBEDDING_CACHE_QUERY_LRU:
+                self._queries.popitem(last=False)
+        return vector
+
+    def _get(self, keys: List[str]) -> Dict[str, List[float]]:
+        try:
+            return self.store.get(keys)
+        except (OSError, sqlite3.Error, ValueError):
+            # A damaged or unwritable cache only costs the model calls it would have saved
+            return {}
+
+    def _put(self, vectors: Dict[str, List[float]]) -> None:
+        try:
+            self.store.put(vectors)
+        except (OSError, sqlite3.Error, ValueError):
+            pass
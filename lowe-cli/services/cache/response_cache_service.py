@@ -0,0 +1,181 @@
+"""Persistent on-disk cache for LLM responses."""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from utils.constants import Constants
+
+
+class ResponseCacheService:
+    """
+    SQLite-backed response cache with a TTL, an entry cap and LRU eviction.
+
+    Responses are keyed by model name, provider and the normalized messages
+    (which include the system prompt).
+    """
+
+    _bypass: ContextVar[bool] = ContextVar("response_cache_bypass", default=False)
+    _lock: threading.Lock = threading.Lock()
+    _connection: Optional[sqlite3.Connection] = None
+    _db_path: Optional[str] = None
+
+    @staticmethod
+    def set_bypass(bypass: bool) -> None:
+        """
+        Bypass the cache for the current context, e.g. for --no-cache.
+
+        Args:
+            bypass: True to neither read from nor write to the cache
+        """
+        ResponseCacheService._bypass.set(bypass)
+
+    @staticmethod
+    def is_bypassed() -> bool:
+        """Check if the cache is bypassed for the current context."""
+        return ResponseCacheService._bypass.get()
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Check if responses should be read from and written to the cache."""
+        return Constants.RESPONSE_CACHE_ENABLED and not ResponseCacheService.is_bypassed()
+
+    @staticmethod
+    def normalize_messages(messages: Any) -> List[Dict[str, str]]:
+        """
+        Normalize model input into a list of role/content pairs.
+
+        Args:
+            messages: A prompt string, a prompt value or a list of messages
+
+        Returns:
+            Messages with their role and whitespace-normalized text content
+        """
+        from langchain_core.messages import convert_to_messages
+        from langchain_core.prompt_values import PromptValue
+
+        if isinstance(messages, str):
+            messages = [("human", messages)]
+        elif isinstance(messages, PromptValue):
+            messages = messages.to_messages()
+
+        normalized: List[Dict[str, str]] = []
+        for message in convert_to_messages(messages):
+            content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+            normalized.append({"role": message.type, "content": re.sub(r"\s+", " ", content).strip()})
+        return normalized
+
+    @staticmethod
+    def make_key(model_name: str, model_provider: str, messages: Any) -> str:
+        """
+        Build the cache key for a model request.
+
+        Args:
+            model_name: Name of the chat model
+            model_provider: Provider of the chat model
+            messages: Model input, see normalize_messages
+
+        Returns:
+            Hex digest identifying the request
+        """
+        payload = json.dumps({
+            "model_name": model_name,
+            "model_provider": model_provider,
+            "messages": ResponseCacheService.normalize_messages(messages),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get(key: str) -> Optional[str]:
+        """
+        Get a cached response, counting the hit or miss.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached response, or None if missing or expired
+        """
+        now = time.time()
+        with ResponseCacheService._lock:
+            connection = ResponseCacheService._get_connection()
+            row = connection.execute(
+                "SELECT content FROM responses WHERE key = ? AND created_at >= ?",
+                (key, now - Constants.RESPONSE_CACHE_TTL)
+            ).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            ResponseCacheService._increment(connection, "hits" if row is not None else "misses")
+            connection.commit()
+        return row[0] if row is not None else None
+
+    @staticmethod
+    def put(key: str, content: str) -> None:
+        """
+        Store a response, evicting expired and least recently used entries.
+
+        Args:
+            key: Cache key from make_key
+            content: Response text to cache
+        """
+        now = time.time()
+        with ResponseCacheService._lock:
+            connection = ResponseCacheService._get_connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            connection.execute("DELETE FROM responses WHERE created_at < ?", (now - Constants.RESPONSE_CACHE_TTL,))
+            connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (Constants.RESPONSE_CACHE_MAX_ENTRIES,)
+            )
+            connection.commit()
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """Get the persisted hit/miss counters and the number of cached entries."""
+        with ResponseCacheService._lock:
+            connection = ResponseCacheService._get_connection()
+            counters = dict(connection.execute("SELECT name, value FROM stats").fetchall())
+            entries = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": entries}
+
+    @staticmethod
+    def clear() -> None:
+        """Remove all cached responses and reset the counters."""
+        with ResponseCacheService._lock:
+            connection = ResponseCacheService._get_connection()
+            connection.execute("DELETE FROM responses")
+            connection.execute("DELETE FROM stats")
+            connection.commit()
+
+    @staticmethod
+    def _increment(connection: sqlite3.Connection, name: str) -> None:
+        connection.execute(
+            "INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,)
+        )
+
+    @staticmethod
+    def _get_connection() -> sqlite3.Connection:
+        """Open the cache database on first use. Callers must hold the lock."""
+        db_path = os.path.join(Constants.CACHE_DIR, "response_cache.sqlite3")
+        if ResponseCacheService._connection is None or ResponseCacheService._db_path != db_path:
+            os.makedirs(Constants.CACHE_DIR, exist_ok=True)
+            connection = sqlite3.connect(db_path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            connection.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            connection.commit()
+            ResponseCacheService._connection = connection
+            ResponseCacheService._db_path = db_path
+        return ResponseCacheService._connection
@@ -0,0 +1,145 @@
+"""Semantic answer cache for knowledge-base lookups."""
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from services.cache.response_cache_service import ResponseCacheService
+from services.huggingface.embedding_model_service import EmbeddingModelService
+from services.vector_db.chroma_service import ChromaService
+from services.vector_db.index_manifest_service import IndexManifestService
+from utils.constants import Constants
+
+
+class SemanticCacheService:
+    """
+    Caches lookup answers by query embedding.
+
+    A lookup whose nearest cached query is at least SEMANTIC_CACHE_THRESHOLD
+    cosine-similar gets the cached answer. Entries are tied to the index
+    version they were answered from, so they stop matching once the index
+    changes, and to the model and lookup parameters, see params_key. Each
+    put prunes entries that can no longer match, those older than
+    SEMANTIC_CACHE_TTL and the oldest beyond SEMANTIC_CACHE_MAX_ENTRIES.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the semantic cache with the shared embeddings model."""
+        self.embeddings: Embeddings = EmbeddingModelService.get_cached_embeddings()
+        self._store: Optional[Chroma] = None
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Check if lookups should use the semantic cache."""
+        return Constants.SEMANTIC_CACHE_ENABLED and not ResponseCacheService.is_bypassed()
+
+    @staticmethod
+    def params_key(**params: Any) -> str:
+        """
+        Build a key for the lookup parameters that affect the answer.
+
+        Args:
+            params: Lookup parameters such as the chat model, the system prompt, k and collection
+
+        Returns:
+            Hex digest of the parameters
+        """
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, query: str, params_key: str) -> Optional[str]:
+        """
+        Get the cached answer of the most similar previous query.
+
+        Args:
+            query: The lookup query
+            params_key: Key of the lookup parameters, see params_key
+
+        Returns:
+            The cached answer, or None if no cached query is similar enough
+        """
+        version = IndexManifestService.version()
+        if version is None:
+            return None
+
+        results: List[Tuple[Document, float]] = self.get_store().similarity_search_with_score(
+            query, k=1, filter={"$and": [
+                {"index_version": version},
+                {"params": params_key},
+                {"created_at": {"$gte": time.time() - Constants.SEMANTIC_CACHE_TTL}},
+            ]}
+        )
+        if not results:
+            return None
+        document, distance = results[0]
+        # The collection uses cosine distance, i.e. 1 - cosine similarity
+        if 1 - distance < Constants.SEMANTIC_CACHE_THRESHOLD:
+            return None
+        return document.metadata.get("answer")
+
+    def put(self, query: str, params_key: str, answer: str) -> None:
+        """
+        Cache the answer to a lookup query.
+
+        Args:
+            query: The lookup query
+            params_key: Key of the lookup parameters, see params_key
+            answer: The generated answer
+        """
+        version = IndexManifestService.version()
+        if version is None or not answer:
+            return
+
+        metadata: Dict[str, Any] = {
+            "answer": answer, "index_version": version, "params": params_key, "created_at": time.time()
+        }
+        self.get_store().add_texts([query], metadatas=[metadata], ids=[uuid.uuid4().hex])
+        self.prune(version)
+
+    def prune(self, version: str) -> None:
+        """
+        Remove entries of other index versions, expired entries and the oldest beyond SEMANTIC_CACHE_MAX_ENTRIES.
+
+        Args:
+            version: Current index version
+        """
+        store = self.get_store()
+        entries = store.get(include=["metadatas"])
+        cutoff = time.time() - Constants.SEMANTIC_CACHE_TTL
+        stale: List[str] = []
+        live: List[Tuple[float, str]] = []
+        for entry_id, metadata in zip(entries["ids"], entries["metadatas"]):
+            metadata = metadata or {}
+            created_at = metadata.get("created_at", 0)
+            if metadata.get("index_version") != version or created_at < cutoff:
+                stale.append(entry_id)
+            else:
+                live.append((created_at, entry_id))
+        live.sort(reverse=True)
+        stale.extend(entry_id for _, entry_id in live[Constants.SEMANTIC_CACHE_MAX_ENTRIES:])
+        if stale:
+            store.delete(ids=stale)
+
+    @staticmethod
+    def persist_directory() -> str:
+        """Get the directory the cached queries are stored in."""
+        return os.path.join(Constants.CACHE_DIR, "semantic_cache")
+
+    def get_store(self) -> Chroma:
+        """Get the Chroma collection holding cached queries, opening it on first use."""
+        if self._store is None:
+            self._store = Chroma(
+                collection_name=Constants.SEMANTIC_CACHE_COLLECTION,
+                embedding_function=self.embeddings,
+                # Kept outside CHROMA_DB_PATH, whose existence means "indexed"
+                client=ChromaService.get_client(SemanticCacheService.persist_directory()),
+                collection_metadata={"hnsw:space": "cosine"},
+            )
+        return self._store
+
+    def clear(self) -> None:
+        """Remove all cached answers."""
+        self.get_store().reset_collection()
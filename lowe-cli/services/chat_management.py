@@ -1,13 +1,15 @@
-from typing import Dict, Any
-from langchain_core.chat_history import InMemoryChatMessageHistory
+from collections import OrderedDict
+from typing import Any, Dict, Optional
 from langchain_core.messages import BaseMessage
+from services.chat_memory import ChatMemory
 from services.llm_client import LlmClient
 from utils.constants import Constants
 
 
 class ChatManagement:
     def __init__(self) -> None:
-        self.chats_by_session_id: Dict[str, InMemoryChatMessageHistory] = {}
+        # Most recently used last, bounded to CHAT_SESSIONS_IN_MEMORY sessions
+        self.chats_by_session_id: OrderedDict[str, ChatMemory] = OrderedDict()
         self.llm_client: LlmClient = LlmClient.get_instance()
 
     def call_model(self, state: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
@@ -15,19 +17,28 @@ class ChatManagement:
             raise ValueError(
                 "Make sure that the config includes the following information: {'configurable': {'session_id': 'some_value'}}"
             )
-        # Fetch the history of messages and append to it any new messages.
-        chat_history: InMemoryChatMessageHistory = self.get_chat_history(config["configurable"]["session_id"])
-        messages = [{"role": "system", "content": Constants.ASK_SYSTEM_PROMPT}] + list(chat_history.messages) + state["messages"]
+        # Fetch the bounded history (summary plus recent turns) and append the new messages.
+        chat_history: ChatMemory = self.get_chat_history(config["configurable"]["session_id"])
+        messages = chat_history.messages(Constants.ASK_SYSTEM_PROMPT) + state["messages"]
         ai_message: BaseMessage = self.llm_client.invoke(messages)
         # Finally, update the chat message history to include
         # the new input message from the user together with the
         # response from the model.
-        chat_history.add_messages(state["messages"] + [ai_message])
+        chat_history.add_turn(state["messages"] + [ai_message])
         return {"messages": ai_message}
 
-    def get_chat_history(self, session_id: str) -> InMemoryChatMessageHistory:
-        chat_history: InMemoryChatMessageHistory | None = self.chats_by_session_id.get(session_id)
+    def get_chat_history(self, session_id: str) -> ChatMemory:
+        chat_history: Optional[ChatMemory] = self.chats_by_session_id.get(session_id)
         if chat_history is None:
-            chat_history = InMemoryChatMessageHistory()
+            # Stored sessions are loaded lazily on their first turn
+            chat_history = ChatMemory(self.llm_client, session_id)
+            chat_history.restore()
             self.chats_by_session_id[session_id] = chat_history
+            while len(self.chats_by_session_id) > Constants.CHAT_SESSIONS_IN_MEMORY:
+                self.chats_by_session_id.popitem(last=False)
+        self.chats_by_session_id.move_to_end(session_id)
         return chat_history
+
+    def summarize_in_background(self, session_id: str) -> None:
+        """Fold the session's older turns into its summary, off the critical path of the next reply."""
+        self.get_chat_history(session_id).summarize_in_background()
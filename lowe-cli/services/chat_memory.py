@@ -0,0 +1,163 @@
+"""Bounded chat history: a sliding window of recent turns plus a running summary."""
+import contextvars
+import threading
+from typing import List, Optional
+from langchain_core.messages import BaseMessage, SystemMessage, convert_to_messages
+from services.context.context_assembler_service import ContextAssemblerService
+from services.llm_client import LlmClient
+from services.sessions.session_service import SessionService
+from utils.constants import Constants
+
+# A turn is the user message(s) followed by the model's reply
+Turn = List[BaseMessage]
+
+
+class ChatMemory:
+    """
+    Chat history of a session whose size sent to the model stays bounded.
+
+    The last CHAT_HISTORY_TURNS turns that fit in CHAT_HISTORY_TOKEN_BUDGET
+    are sent verbatim. Older turns are folded into a running summary by a
+    background thread, so summarizing never delays a reply.
+
+    With a session id, turns and summaries are appended to the session store
+    so that the conversation can be resumed later.
+    """
+
+    def __init__(
+        self,
+        llm_client: LlmClient,
+        session_id: Optional[str] = None,
+        max_turns: int = Constants.CHAT_HISTORY_TURNS,
+        token_budget: int = Constants.CHAT_HISTORY_TOKEN_BUDGET
+    ) -> None:
+        """
+        Initialize an empty chat memory.
+
+        Args:
+            llm_client: Client used to summarize older turns
+            session_id: Id of the session to persist the history to, None to keep it in memory only
+            max_turns: Maximum number of recent turns sent verbatim
+            token_budget: Maximum number of tokens of the recent turns sent verbatim
+        """
+        self.llm_client: LlmClient = llm_client
+        self.session_id: Optional[str] = session_id
+        self.max_turns: int = max_turns
+        self.token_budget: int = token_budget
+        self.summary: str = ""
+        # Number of turns folded into the summary so far
+        self.summarized: int = 0
+        # Turns not folded into the summary yet, oldest first
+        self.turns: List[Turn] = []
+        self._lock: threading.Lock = threading.Lock()
+        self._summarizer: Optional[threading.Thread] = None
+
+    @staticmethod
+    def turn_tokens(turn: Turn) -> int:
+        """Estimate the number of tokens of a turn."""
+        return sum(ContextAssemblerService.count_tokens(LlmClient.message_text(message.content)) for message in turn)
+
+    def messages(self, system_prompt: str) -> List[BaseMessage]:
+        """
+        Get the history to send to the model with the next user message.
+
+        Args:
+            system_prompt: System prompt of the conversation
+
+        Returns:
+            The system prompt extended with the running summary, if any,
+            followed by the recent turns
+        """
+        with self._lock:
+            summary = self.summary
+            window = self.turns[len(self.turns) - self._window_size():]
+
+        # Some providers only accept a single, leading system message
+        if summary:
+            system_prompt = f"{system_prompt}\n\nSummary of the earlier conversation:\n{summary}"
+        messages: List[BaseMessage] = [SystemMessage(system_prompt)]
+        for turn in window:
+            messages.extend(turn)
+        return messages
+
+    def restore(self) -> None:
+        """Load the summary and recent turns of the session from the session store."""
+        if self.session_id is None:
+            return
+        tail = SessionService.load_tail(self.session_id)
+        turns: List[Turn] = [
+            convert_to_messages([(message["role"], message["content"]) for message in record["messages"]])
+            for record in tail.turns
+        ]
+        with self._lock:
+            self.summary, self.summarized, self.turns = tail.summary, tail.summarized, turns
+
+    def add_turn(self, turn: Turn) -> None:
+        """Record a completed turn."""
+        with self._lock:
+            number = self.summarized + len(self.turns)
+            self.turns.append(list(turn))
+        if self.session_id is not None:
+            SessionService.append(self.session_id, {
+                "type": "turn",
+                "n": number,
+                "messages": [
+                    {"role": message.type, "content": LlmClient.message_text(message.content)} for message in turn
+                ],
+            })
+
+    def summarize_in_background(self) -> None:
+        """Fold turns that slid out of the window into the summary on a background thread."""
+        with self._lock:
+            if self._summarizer is not None and self._summarizer.is_alive():
+                return
+            if len(self.turns) <= self._window_size():
+                return
+            # Keeps settings such as --no-cache for the summary request
+            context = contextvars.copy_context()
+            self._summarizer = threading.Thread(target=context.run, args=(self._summarize,), daemon=True)
+            self._summarizer.start()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for a running summarization to finish."""
+        summarizer = self._summarizer
+        if summarizer is not None:
+            summarizer.join(timeout)
+
+    def _window_size(self) -> int:
+        """Get the number of recent turns sent verbatim. Callers must hold the lock."""
+        size, tokens = 0, 0
+        for turn in reversed(self.turns[-self.max_turns:] if self.max_turns > 0 else []):
+            tokens += self.turn_tokens(turn)
+            # The last turn is always kept, however long
+            if size and tokens > self.token_budget:
+                break
+            size += 1
+        return size
+
+    def _summarize(self) -> None:
+        while True:
+            with self._lock:
+                count = len(self.turns) - self._window_size()
+                if count <= 0:
+                    return
+                summary, folded = self.summary, self.turns[:count]
+
+            transcript = "\n".join(
+                f"{message.type}: {LlmClient.message_text(message.content)}" for turn in folded for message in turn
+            )
+            try:
+                response = self.llm_client.invoke(
+                    f"Current summary:\n{summary or '(none)'}\n\nNew conversation turns:\n{transcript}",
+                    Constants.CHAT_SUMMARY_PROMPT
+                )
+            except Exception:
+                # The turns stay unsummarized and are retried after the next reply
+                return
+            with self._lock:
+                self.summary = LlmClient.message_text(response.content).strip()
+                self.summarized += count
+                del self.turns[:count]
+                record = {"type": "summary", "turns": self.summarized, "text": self.summary}
+            if self.session_id is not None:
+                SessionService.append(self.session_id, record)
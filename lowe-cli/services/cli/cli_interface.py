@@ -1,10 +1,11 @@
 """CLI interface for handling user interactions and input processing."""
-import uuid
-from typing import Dict, Any
-from langchain_core.messages import HumanMessage, AIMessage
+from typing import Dict, Any, Iterator, Optional
+from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from langgraph.constants import START
 from langgraph.graph import StateGraph, MessagesState
 from services.chat_management import ChatManagement
+from services.llm_client import LlmClient
+from services.sessions.session_service import SessionService
 from services.ui.ui_service import UIService
 from services.cli.input_handler import InputHandler
 
@@ -12,10 +13,17 @@ from services.cli.input_handler import InputHandler
 class CLIInterface:
     """Main CLI interface for handling user interactions."""
     
-    def __init__(self) -> None:
-        """Initialize the CLI interface with a chat graph and input handler."""
-        self.session_id: uuid.UUID = uuid.uuid4()
+    def __init__(self, session_id: Optional[str] = None) -> None:
+        """
+        Initialize the CLI interface with a chat graph and input handler.
+        
+        Args:
+            session_id: Id of a stored session to resume, a new session is started when omitted
+        """
+        self.session_id: str = session_id or SessionService.new_session_id()
+        self.resumed: bool = session_id is not None
         self.config: Dict[str, Any] = {"configurable": {"session_id": self.session_id}}
+        self.chat_management: ChatManagement = ChatManagement()
         self.graph: StateGraph = self._build_graph()
         self.input_handler: InputHandler = InputHandler()
     
@@ -23,7 +31,7 @@ class CLIInterface:
         """Build and compile the chat graph."""
         builder = StateGraph(state_schema=MessagesState)
         builder.add_edge(START, "model")
-        builder.add_node("model", ChatManagement().call_model)
+        builder.add_node("model", self.chat_management.call_model)
         return builder.compile()
     
     def get_user_input(self) -> str:
@@ -67,19 +75,48 @@ class CLIInterface:
         
         return True
     
-    def process_message(self, message: str) -> None:
-        """Process a user message through the chat graph."""
-        input_message = HumanMessage(content=message)
+    def stream_reply(self, message: str) -> Iterator[str]:
+        """
+        Stream the model's reply to a user message through the chat graph.
         
-        with UIService.with_spinner("Thinking") as spinner:
-            for event in self.graph.stream({"messages": [input_message]}, self.config, stream_mode="values"):
-                last_message = event["messages"][-1]
-                if isinstance(last_message, AIMessage):
-                    spinner.ok("💡 ")
-                    UIService.render_markdown(last_message.content)
+        Args:
+            message: The user message
+            
+        Yields:
+            Text chunks of the reply as the model generates them
+        """
+        input_message = HumanMessage(content=message)
+        streamed: bool = False
+        last_message: Optional[BaseMessage] = None
+        for mode, payload in self.graph.stream(
+            {"messages": [input_message]}, self.config, stream_mode=["messages", "values"]
+        ):
+            if mode == "values":
+                last_message = payload["messages"][-1]
+                continue
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "model" and not isinstance(chunk, HumanMessage):
+                text = LlmClient.message_text(chunk.content)
+                if text:
+                    streamed = True
+                    yield text
+        # Models that don't stream tokens only produce the final message
+        if not streamed and isinstance(last_message, AIMessage):
+            yield LlmClient.message_text(last_message.content)
+    
+    def process_message(self, message: str) -> None:
+        """Process a user message through the chat graph, rendering the reply as it streams."""
+        UIService.stream_output(self.stream_reply(message))
+        # Summarize older turns while the user reads the reply and types the next message
+        self.chat_management.summarize_in_background(self.session_id)
     
     def run(self) -> None:
         """Run the main CLI interaction loop with improved error handling."""
+        SessionService.evict(keep=self.session_id)
+        if self.resumed:
+            UIService.print_info(f"Resumed session {self.session_id}")
+        else:
+            UIService.print_info(f"Session {self.session_id} (continue it later with --resume {self.session_id})")
         while True:
             try:
                 UIService.print_prompt()
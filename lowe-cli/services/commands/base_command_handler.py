@@ -1,11 +1,19 @@
 """Base command handler class for common functionality."""
 from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator
 from services.ui.ui_service import UIService
 
 
 class BaseCommandHandler(ABC):
     """Abstract base class for command handlers."""
     
+    # How the command output is rendered, see UIService.render_output
+    output_style: str = "markdown"
+    # Spinner text shown until the first output arrives
+    spinner_text: str = "Thinking"
+    # Command options such as lookup tags, set by CommandFactory.get_handler
+    options: Dict[str, Any] = {}
+    
     def validate_input(self, user_message: str, error_msg: str) -> str:
         """
         Validate and clean user input.
@@ -18,15 +26,93 @@ class BaseCommandHandler(ABC):
             Cleaned user message
             
         Raises:
-            ValueError: If input is invalid
+            ValueError: If input is invalid, carrying the error message
         """
         user_message = user_message.strip()
         if not user_message:
             UIService.print_error(error_msg)
-            raise ValueError("Invalid input")
+            raise ValueError(error_msg)
+        return user_message
+    
+    @staticmethod
+    def warm_up(user_message: str = "") -> None:
+        """
+        Start loading what the command needs on background threads, before it is dispatched.
+        
+        Commands wait for a load in progress when they get to it, so this
+        only overlaps loading with other work. Nothing to load by default.
+        
+        Args:
+            user_message: Input the command will run with, empty if unknown
+        """
+        return None
+    
+    def prepare(self, user_message: str) -> str:
+        """
+        Validate the user message before the command is computed.
+        
+        Args:
+            user_message: The user input for the command
+            
+        Returns:
+            User message to compute the command with
+            
+        Raises:
+            ValueError: If input is invalid
+        """
         return user_message
     
     @abstractmethod
-    def execute(self, user_message: str) -> None:
-        """Execute the command with the given user message."""
+    def stream(self, user_message: str) -> Iterator[str]:
+        """
+        Stream the command output in chunks as it is generated.
+        
+        Args:
+            user_message: The validated user input for the command
+            
+        Yields:
+            Chunks of the command output
+        """
         pass
+    
+    def compute(self, user_message: str) -> str:
+        """
+        Compute the full command output without rendering it.
+        
+        Args:
+            user_message: The validated user input for the command
+            
+        Returns:
+            Command output to be rendered
+        """
+        return "".join(self.stream(user_message))
+    
+    async def acompute(self, user_message: str) -> str:
+        """
+        Compute the full command output without blocking the event loop, e.g. in batch mode.
+        
+        Runs compute on a worker thread; handlers that call the model
+        override it to use the model's async interface instead.
+        
+        Args:
+            user_message: The validated user input for the command
+            
+        Returns:
+            Command output
+        """
+        import asyncio
+
+        return await asyncio.to_thread(self.compute, user_message)
+    
+    def render(self, content: str) -> None:
+        """Render the command output to the console."""
+        UIService.render_output(content, self.output_style)
+    
+    def execute(self, user_message: str) -> None:
+        """Execute the command with the given user message, rendering output as it streams."""
+        try:
+            user_message = self.prepare(user_message)
+        except ValueError:
+            return
+
+        UIService.stream_output(self.stream(user_message), self.output_style, self.spinner_text)
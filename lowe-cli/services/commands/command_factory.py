@@ -1,56 +1,126 @@
 """Command factory for creating and managing command handlers."""
-from typing import Dict, Type
+import importlib
+from typing import Any, Dict, Optional, Tuple, Type
 from services.commands.base_command_handler import BaseCommandHandler
-from services.commands.help_command_handler import HelpCommandHandler
-from services.commands.perform_command_handler import PerformCommandHandler
-from services.commands.lookup_command_handler import LookupCommandHandler
-from services.commands.index_command_handler import IndexCommandHandler
+from services.daemon.daemon_client import DaemonClient, DaemonUnavailableError
+from utils.profiler import Profiler
 
 
 class CommandFactory:
     """Factory class for creating and managing command handlers."""
-    
+
     def __init__(self) -> None:
-        """Initialize the command factory with available command handlers."""
-        self._handlers: Dict[str, Type[BaseCommandHandler]] = {
-            'help': HelpCommandHandler,
-            'perform': PerformCommandHandler,
-            'lookup': LookupCommandHandler,
-            'index': IndexCommandHandler
+        """
+        Initialize the command factory with available command handlers.
+
+        Handlers are registered by module path and class name so that a handler
+        module (and the heavy services it depends on) is only imported when its
+        command is dispatched.
+        """
+        self._handlers: Dict[str, Tuple[str, str]] = {
+            'help': ('services.commands.help_command_handler', 'HelpCommandHandler'),
+            'perform': ('services.commands.perform_command_handler', 'PerformCommandHandler'),
+            'lookup': ('services.commands.lookup_command_handler', 'LookupCommandHandler'),
+            'index': ('services.commands.index_command_handler', 'IndexCommandHandler'),
+            'reindex': ('services.commands.reindex_command_handler', 'ReindexCommandHandler')
         }
-    
-    def get_handler(self, command_name: str) -> BaseCommandHandler:
+        self._loaded: Dict[str, Type[BaseCommandHandler]] = {}
+        # Forward commands to a running daemon, falling back to in-process execution
+        self.use_daemon: bool = True
+
+    def load_handler_class(self, command_name: str) -> Type[BaseCommandHandler]:
+        """
+        Import and return the handler class for the specified command.
+
+        Args:
+            command_name: Name of the command to load the handler class for
+
+        Returns:
+            Command handler class
+
+        Raises:
+            ValueError: If command is not supported
+        """
+        if command_name not in self._handlers:
+            raise ValueError(f"Unsupported command: {command_name}")
+
+        handler_class = self._loaded.get(command_name)
+        if handler_class is None:
+            module_path, class_name = self._handlers[command_name]
+            with Profiler.span(f"import {module_path}"):
+                handler_class = getattr(importlib.import_module(module_path), class_name)
+            self._loaded[command_name] = handler_class
+        return handler_class
+
+    def get_handler(self, command_name: str, options: Optional[Dict[str, Any]] = None) -> BaseCommandHandler:
         """
         Get a fresh command handler instance for the specified command.
-        
+
         Args:
             command_name: Name of the command to get handler for
-            
+            options: Command options, e.g. {"tags": [...]} for lookup
+
         Returns:
             Fresh command handler instance
-            
+
         Raises:
             ValueError: If command is not supported
         """
-        if command_name not in self._handlers:
-            raise ValueError(f"Unsupported command: {command_name}")
-        
-        return self._handlers[command_name]()
-    
-    def execute_command(self, command_name: str, user_message: str = "") -> None:
+        handler_class = self.load_handler_class(command_name)
+        with Profiler.span(f"init {handler_class.__name__}"):
+            handler = handler_class()
+        handler.options = dict(options or {})
+        return handler
+
+    def warm_up(self, command_name: str, user_message: str = "") -> None:
+        """
+        Start loading what a command needs in the background, unless a daemon will execute it.
+
+        Args:
+            command_name: Name of the command about to be executed
+            user_message: User input the command will run with
+
+        Raises:
+            ValueError: If command is not supported
+        """
+        if self.use_daemon and DaemonClient.is_running():
+            return
+        self.load_handler_class(command_name).warm_up(user_message)
+
+    def execute_command(
+        self,
+        command_name: str,
+        user_message: str = "",
+        options: Optional[Dict[str, Any]] = None
+    ) -> None:
         """
         Execute a command with the given user message.
-        
+
+        The command runs on the resident daemon when one is listening, otherwise
+        in this process.
+
         Args:
             command_name: Name of the command to execute
             user_message: User input for the command
-            
+            options: Command options, see get_handler
+
         Raises:
             ValueError: If command is not supported
         """
-        handler = self.get_handler(command_name)
-        handler.execute(user_message)
-    
+        if command_name not in self._handlers:
+            raise ValueError(f"Unsupported command: {command_name}")
+
+        if self.use_daemon:
+            try:
+                DaemonClient.execute(command_name, user_message, options)
+                return
+            except DaemonUnavailableError:
+                pass
+
+        with Profiler.span(f"command:{command_name}"):
+            handler = self.get_handler(command_name, options)
+            handler.execute(user_message)
+
     def list_available_commands(self) -> list[str]:
         """Get a list of available command names."""
         return list(self._handlers.keys())
@@ -1,4 +1,5 @@
 """Simplified command handlers using modular command factory."""
+from typing import List, Optional
 from services.commands.command_factory import CommandFactory
 
 
@@ -18,11 +19,21 @@ class CommandHandlers:
         CommandHandlers._factory.execute_command('perform', user_message)
 
     @staticmethod
-    def lookup(user_message: str) -> None:
-        """Handle lookup command."""
-        CommandHandlers._factory.execute_command('lookup', user_message)
+    def lookup(user_message: str, tags: Optional[List[str]] = None) -> None:
+        """Handle lookup command, optionally restricted to documents with any of the tags."""
+        CommandHandlers._factory.execute_command('lookup', user_message, {"tags": tags} if tags else None)
+
+    @staticmethod
+    def warm_up_lookup(user_message: str) -> None:
+        """Start loading the models and stores a lookup needs in the background."""
+        CommandHandlers._factory.warm_up('lookup', user_message)
 
     @staticmethod
     def index() -> None:
         """Handle index command."""
         CommandHandlers._factory.execute_command('index')
+
+    @staticmethod
+    def reindex() -> None:
+        """Handle reindex command."""
+        CommandHandlers._factory.execute_command('reindex')
@@ -1,7 +1,7 @@
 """Help command handler."""
+from typing import Iterator
 from services.commands.base_command_handler import BaseCommandHandler
 from services.llm_client import LlmClient
-from services.ui.ui_service import UIService
 from utils.constants import Constants
 
 
@@ -12,24 +12,23 @@ class HelpCommandHandler(BaseCommandHandler):
         """Initialize the help command handler with a shared LlmClient instance."""
         self.llm_client: LlmClient = LlmClient.get_instance()
     
-    def execute(self, user_message: str) -> None:
+    def prepare(self, user_message: str) -> str:
+        """Validate the help query."""
+        return self.validate_input(
+            user_message, 
+            "Please enter a valid question for help."
+        )
+    
+    def stream(self, user_message: str) -> Iterator[str]:
         """
-        Execute help command to provide assistance and explanations.
+        Stream help to provide assistance and explanations.
         
         Args:
             user_message: The help query from the user
         """
-        try:
-            user_message = self.validate_input(
-                user_message, 
-                "Please enter a valid question for help."
-            )
-        except ValueError:
-            return
-
-        def execute_help() -> str:
-            response = self.llm_client.invoke(user_message, Constants.HELP_SYSTEM_PROMPT)
-            return response.content
-
-        content: str = UIService.execute_with_spinner(execute_help)
-        UIService.render_markdown(content)
+        return self.llm_client.stream(user_message, Constants.HELP_SYSTEM_PROMPT)
+    
+    async def acompute(self, user_message: str) -> str:
+        """Answer the help query with an async model call."""
+        response = await self.llm_client.ainvoke(user_message, Constants.HELP_SYSTEM_PROMPT)
+        return LlmClient.message_text(response.content)
@@ -1,7 +1,7 @@
 """Index command handler."""
 import os
+from typing import Iterator
 from services.commands.base_command_handler import BaseCommandHandler
-from services.vector_db.indexing_service import IndexingService
 from services.ui.ui_service import UIService
 from utils.constants import Constants
 
@@ -9,10 +9,31 @@ from utils.constants import Constants
 class IndexCommandHandler(BaseCommandHandler):
     """Handler for index command operations."""
     
+    output_style: str = "success"
+    spinner_text: str = "Indexing"
+    
     def __init__(self) -> None:
         """Initialize the index command handler."""
         self.db_path: str = Constants.CHROMA_DB_PATH
     
+    def stream(self, user_message: str = "") -> Iterator[str]:
+        """
+        Build the document index if it doesn't exist.
+        
+        Args:
+            user_message: Not used for index command, kept for interface consistency
+        """
+        if os.path.exists(self.db_path):
+            yield "Index already exists"
+            return
+
+        from services.vector_db.indexing_service import IndexingService
+
+        IndexingService.index_documents(
+            Constants.KNOWLEDGE_BASE, progress=lambda report: UIService.update_status(f"{self.spinner_text}: {report}")
+        )
+        yield "Indexing completed"
+    
     def execute(self, user_message: str = "") -> None:
         """
         Execute index command to build the document index if it doesn't exist.
@@ -21,10 +42,6 @@ class IndexCommandHandler(BaseCommandHandler):
             user_message: Not used for index command, kept for interface consistency
         """
         if not os.path.exists(self.db_path):
-            def execute_index() -> str:
-                IndexingService.index_documents(Constants.KNOWLEDGE_BASE)
-                return "Indexing completed"
-
-            UIService.execute_with_spinner(execute_index, "Indexing")
+            UIService.execute_with_spinner(lambda: self.compute(user_message), self.spinner_text)
         else:
             UIService.print_success("Index already exists")
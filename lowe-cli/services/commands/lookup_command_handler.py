@@ -1,8 +1,12 @@
 """Lookup command handler."""
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
 from services.commands.base_command_handler import BaseCommandHandler
 from services.llm_client import LlmClient
 from services.ui.ui_service import UIService
 from utils.constants import Constants
+from utils.profiler import Profiler
 
 
 class LookupCommandHandler(BaseCommandHandler):
@@ -12,15 +16,107 @@ class LookupCommandHandler(BaseCommandHandler):
         """Initialize the lookup command handler with a shared LlmClient instance."""
         self.llm_client: LlmClient = LlmClient.get_instance()
     
-    def execute(self, user_message: str) -> None:
+    @staticmethod
+    def warm_up(user_message: str = "") -> None:
         """
-        Execute lookup command to search and retrieve information from the knowledge base.
+        Initialize the chat model, load the embedding model and open the Chroma clients concurrently.
+        
+        Each runs on a daemon thread while the index is checked. The lookup
+        joins them where it needs them: LlmClient.get_instance and the
+        embeddings and Chroma client registries wait for a load in progress.
+        A failed warm-up is left for the lookup to retry and report.
+        
+        Args:
+            user_message: The search query, the embedding model isn't loaded
+                when its embedding is cached. Empty if unknown.
+        """
+        def load_embeddings() -> None:
+            from services.cache.embedding_cache_service import CachedEmbeddings
+            from services.huggingface.embedding_model_service import EmbeddingModelService
+
+            embeddings = EmbeddingModelService.get_cached_embeddings()
+            if user_message and isinstance(embeddings, CachedEmbeddings) and embeddings.is_cached(user_message):
+                return
+            EmbeddingModelService.warm_up()
+
+        def open_chroma() -> None:
+            from services.vector_db.chroma_service import ChromaService
+
+            # Opening creates the persist directory, which would make the
+            # index check believe the index already exists
+            if os.path.exists(Constants.CHROMA_DB_PATH):
+                ChromaService.get_client(Constants.CHROMA_DB_PATH)
+            if Constants.SEMANTIC_CACHE_ENABLED:
+                from services.cache.semantic_cache_service import SemanticCacheService
+
+                ChromaService.get_client(SemanticCacheService.persist_directory())
+
+        steps: Dict[str, Callable[[], Any]] = {
+            "chat_model": LlmClient.get_instance,
+            "embeddings": load_embeddings,
+            "chroma": open_chroma,
+        }
+        for name, target in steps.items():
+            threading.Thread(
+                target=LookupCommandHandler._warm_up_step, args=(name, target), name=f"warm-up:{name}", daemon=True
+            ).start()
+    
+    @staticmethod
+    def _warm_up_step(name: str, target: Callable[[], Any]) -> None:
+        try:
+            with Profiler.span(f"warm_up:{name}"):
+                target()
+        except Exception:
+            pass
+    
+    def prepare(self, user_message: str) -> str:
+        """
+        Check that the index can be searched with the configured embeddings model.
         
         Args:
             user_message: The search query from the user
+            
+        Returns:
+            The search query
+            
+        Raises:
+            ValueError: If the index was built with an incompatible embeddings model
         """
-        def execute_lookup() -> str:
-            return self.llm_client.retrieve_and_invoke(user_message, Constants.LOOKUP_SYSTEM_PROMPT)
+        error = LookupCommandHandler.embedding_model_error()
+        if error is not None:
+            UIService.print_error(error)
+            raise ValueError(error)
+        return user_message
+    
+    @staticmethod
+    def embedding_model_error() -> Optional[str]:
+        """Describe why the index can't be searched with the configured embeddings model, None if it can."""
+        from services.huggingface.embedding_model_service import EmbeddingModelService
+        from services.vector_db.index_manifest_service import IndexManifestService
 
-        content: str = UIService.execute_with_spinner(execute_lookup)
-        UIService.render_markdown(content)
+        current = EmbeddingModelService.model_info()
+        indexed = IndexManifestService.embedding_model_mismatch(current)
+        if indexed is None:
+            return None
+        return (
+            f"The index was built with the {indexed.get('backend')} embeddings model {indexed.get('model')}, "
+            f"but {current['backend']} {current['model']} is configured. Run lowe-cli --reindex to rebuild it."
+        )
+    
+    def stream(self, user_message: str) -> Iterator[str]:
+        """
+        Stream lookup to search and retrieve information from the knowledge base.
+        
+        Args:
+            user_message: The search query from the user, searched within the
+                documents tagged with any of the "tags" option when given
+        """
+        return self.llm_client.retrieve_and_stream(
+            user_message, Constants.LOOKUP_SYSTEM_PROMPT, tags=self.options.get("tags")
+        )
+    
+    async def acompute(self, user_message: str) -> str:
+        """Answer the search query from the knowledge base with an async model call."""
+        return await self.llm_client.aretrieve_and_invoke(
+            user_message, Constants.LOOKUP_SYSTEM_PROMPT, tags=self.options.get("tags")
+        )
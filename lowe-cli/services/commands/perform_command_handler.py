@@ -1,15 +1,17 @@
 """Perform command handler."""
+from typing import Any, Iterator
 from langchain_core.prompts import ChatPromptTemplate
 from services.commands.base_command_handler import BaseCommandHandler
 from services.llm_client import LlmClient
-from services.history.history_service import HistoryService
-from services.ui.ui_service import UIService
+from services.history.history_index_service import HistoryIndexService
 from utils.constants import Constants
 
 
 class PerformCommandHandler(BaseCommandHandler):
     """Handler for perform command operations."""
     
+    output_style: str = "success"
+    
     def __init__(self) -> None:
         """Initialize the perform command handler with prompt template and shared LlmClient instance."""
         self.prompt_template: ChatPromptTemplate = ChatPromptTemplate([
@@ -18,28 +20,33 @@ class PerformCommandHandler(BaseCommandHandler):
         ])
         self.llm_client: LlmClient = LlmClient.get_instance()
     
-    def execute(self, user_message: str) -> None:
+    def prepare(self, user_message: str) -> str:
+        """Validate the instruction to perform."""
+        return self.validate_input(
+            user_message, 
+            "Please enter a valid instruction to perform."
+        )
+    
+    def stream(self, user_message: str) -> Iterator[str]:
         """
-        Execute perform command to generate shell commands based on user instructions.
+        Stream shell commands based on user instructions.
         
         Args:
             user_message: The instruction from the user
         """
-        try:
-            user_message = self.validate_input(
-                user_message, 
-                "Please enter a valid instruction to perform."
-            )
-        except ValueError:
-            return
-
-        def execute_perform() -> str:
-            messages = self.prompt_template.invoke({
-                "question": user_message, 
-                "context": HistoryService.get_recent_history()
-            })
-            response = self.llm_client.invoke(messages)
-            return response.content
+        return self.llm_client.stream(self.build_messages(user_message))
+    
+    async def acompute(self, user_message: str) -> str:
+        """Suggest shell commands with an async model call, reading the history index on a worker thread."""
+        import asyncio
 
-        content: str = UIService.execute_with_spinner(execute_perform)
-        UIService.print_success(content)
+        messages = await asyncio.to_thread(self.build_messages, user_message)
+        response = await self.llm_client.ainvoke(messages)
+        return LlmClient.message_text(response.content)
+    
+    def build_messages(self, user_message: str) -> Any:
+        """Build the prompt from the instruction and the shell history related to it."""
+        return self.prompt_template.invoke({
+            "question": user_message, 
+            "context": HistoryIndexService.relevant_history(user_message)
+        })
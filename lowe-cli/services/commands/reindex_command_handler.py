@@ -0,0 +1,26 @@
+"""Reindex command handler."""
+from typing import Iterator
+from services.commands.base_command_handler import BaseCommandHandler
+from services.ui.ui_service import UIService
+from utils.constants import Constants
+
+
+class ReindexCommandHandler(BaseCommandHandler):
+    """Handler for reindex command operations."""
+    
+    output_style: str = "success"
+    spinner_text: str = "Indexing"
+    
+    def stream(self, user_message: str = "") -> Iterator[str]:
+        """
+        Update the document index with the chunks that changed in the knowledge base.
+        
+        Args:
+            user_message: Not used for reindex command, kept for interface consistency
+        """
+        from services.vector_db.indexing_service import IndexingService
+
+        stats = IndexingService.index_documents(
+            Constants.KNOWLEDGE_BASE, progress=lambda report: UIService.update_status(f"{self.spinner_text}: {report}")
+        )
+        yield f"Reindexing completed: {stats}"
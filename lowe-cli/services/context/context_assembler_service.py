@@ -0,0 +1,174 @@
+"""Token-budgeted assembly of retrieved chunks into the RAG prompt context."""
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from utils.constants import Constants
+
+
+@dataclass
+class AssembledContext:
+    """Context text for the prompt along with what went into it."""
+    text: str = ""
+    tokens: int = 0
+    chunks: int = 0
+    sources: int = 0
+
+
+class ContextAssemblerService:
+    """
+    Packs retrieved chunks into a token budget.
+
+    Duplicate chunks and chunks contained in another one are dropped, the
+    best ranked chunks are packed until the budget is spent, and chunks of
+    the same document are merged under a single compact citation header.
+    A best ranked chunk that is over the budget on its own is truncated.
+    """
+
+    # Shortest shared text treated as splitter overlap between two chunks
+    MIN_OVERLAP_CHARS: int = 20
+
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """
+        Estimate the number of tokens of a text.
+
+        Uses CHARS_PER_TOKEN characters per token (four by default, the usual
+        rule of thumb), close enough for budgeting without depending on a
+        model tokenizer.
+
+        Args:
+            text: Text to measure
+
+        Returns:
+            Approximate token count
+        """
+        return math.ceil(len(text) / Constants.CHARS_PER_TOKEN)
+
+    @staticmethod
+    def assemble(documents: List[Document], token_budget: int = Constants.CONTEXT_TOKEN_BUDGET) -> AssembledContext:
+        """
+        Assemble the prompt context from retrieved chunks.
+
+        Args:
+            documents: Retrieved chunks, best ranked first
+            token_budget: Maximum number of tokens of the assembled context
+
+        Returns:
+            The context text and the number of tokens, chunks and sources it uses
+        """
+        # Source key -> (citation, token cost of its header, (dedupe key, text) of its chunks in rank order)
+        sources: Dict[str, Tuple[str, int, List[Tuple[str, str]]]] = {}
+        used_tokens = 0
+
+        for document in documents:
+            text = document.page_content.strip()
+            # Whitespace only matters for the prompt, not for telling chunks apart
+            key = ContextAssemblerService._normalize(text)
+            kept = [chunk for _, _, chunks in sources.values() for chunk in chunks]
+            if not key or any(key in other for other, _ in kept):
+                continue
+
+            source_key, citation = ContextAssemblerService._source(document)
+            # Chunks contained in this one are dropped from whichever source cited them
+            superseded = [(other, other_text) for other, other_text in kept if other in key]
+            cost = ContextAssemblerService.count_tokens(text + "\n") - sum(
+                ContextAssemblerService.count_tokens(other_text + "\n") for _, other_text in superseded
+            )
+            emptied = [
+                other_key for other_key, (_, _, chunks) in sources.items()
+                if other_key != source_key and all(chunk in superseded for chunk in chunks)
+            ]
+            cost -= sum(sources[other_key][1] for other_key in emptied)
+            # Chunks of a cited source only cost their text, new sources also their header
+            header_cost = 0
+            if source_key not in sources:
+                cited = sum(1 for other_citation, _, _ in sources.values() if other_citation)
+                header = ContextAssemblerService._header(citation, cited + 1)
+                header_cost = ContextAssemblerService.count_tokens(header + "\n\n")
+            if used_tokens + cost + header_cost > token_budget:
+                if sources:
+                    continue
+                # The best ranked chunk alone is over budget: keep its start rather than an empty context
+                text = ContextAssemblerService._truncate(text, token_budget - header_cost)
+                key = ContextAssemblerService._normalize(text)
+                if not key:
+                    continue
+                cost = ContextAssemblerService.count_tokens(text + "\n")
+
+            for other_key in emptied:
+                del sources[other_key]
+            for _, _, chunks in sources.values():
+                chunks[:] = [chunk for chunk in chunks if chunk not in superseded]
+            if source_key not in sources:
+                sources[source_key] = (citation, header_cost, [])
+            sources[source_key][2].append((key, text))
+            used_tokens += cost + header_cost
+
+        sections: List[str] = []
+        # Cited sources are numbered once packed, as sources emptied by a later chunk leave gaps
+        number = 0
+        for citation, _, chunks in sources.values():
+            body = "\n".join(ContextAssemblerService._merge_overlaps([text for _, text in chunks]))
+            if not citation:
+                sections.append(body)
+                continue
+            number += 1
+            sections.append(f"{ContextAssemblerService._header(citation, number)}\n{body}")
+        text = "\n\n".join(sections)
+        return AssembledContext(
+            text=text,
+            tokens=ContextAssemblerService.count_tokens(text),
+            chunks=sum(len(chunks) for _, _, chunks in sources.values()),
+            sources=len(sources),
+        )
+
+    @staticmethod
+    def _truncate(text: str, token_budget: int) -> str:
+        """Cut a chunk to the start that fits a token budget, counting the newline that follows it."""
+        max_chars = int(token_budget * Constants.CHARS_PER_TOKEN) - 1
+        return text[:max_chars].rstrip() if max_chars > 0 else ""
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Collapse whitespace, giving the key chunks are deduplicated and compared by."""
+        return re.sub(r"\s+", " ", text).strip()
+
+    @staticmethod
+    def _source(document: Document) -> Tuple[str, str]:
+        """Get the key identifying the source document of a chunk and its citation."""
+        title: Optional[str] = document.metadata.get("title")
+        url: Optional[str] = document.metadata.get("url")
+        if not title and not url:
+            # Chunks without a source are kept apart from each other
+            return f"#{id(document)}", ""
+        citation = " ".join(part for part in (title, f"<{url}>" if url else None) if part)
+        return f"{title}|{url}", citation
+
+    @staticmethod
+    def _header(citation: str, number: int) -> str:
+        """Get the header of a source's section, empty for chunks without a source."""
+        return f"[{number}] {citation}" if citation else ""
+
+    @staticmethod
+    def _merge_overlaps(texts: List[str]) -> List[str]:
+        """Join chunks of a document that overlap, e.g. consecutive splitter chunks."""
+        merged: List[str] = []
+        for text in texts:
+            for i, other in enumerate(merged):
+                joined = ContextAssemblerService._join(other, text) or ContextAssemblerService._join(text, other)
+                if joined is not None:
+                    merged[i] = joined
+                    break
+            else:
+                merged.append(text)
+        return merged
+
+    @staticmethod
+    def _join(first: str, second: str) -> Optional[str]:
+        """Join two texts when the end of the first is the start of the second."""
+        for size in range(min(len(first), len(second)), ContextAssemblerService.MIN_OVERLAP_CHARS - 1, -1):
+            if first.endswith(second[:size]):
+                return first + second[size:]
+        return None
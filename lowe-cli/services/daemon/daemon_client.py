@@ -0,0 +1,170 @@
+"""Client for forwarding commands to a running LoweCLI daemon."""
+import json
+import os
+import socket
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from services.cache.response_cache_service import ResponseCacheService
+from services.ui.ui_service import UIService
+from utils.constants import Constants
+
+
+class DaemonUnavailableError(ConnectionError):
+    """Raised when no daemon is listening on the socket."""
+
+
+class DaemonClient:
+    """Forwards commands over the daemon's Unix socket and renders the results."""
+
+    CONNECT_TIMEOUT: float = 0.2
+    # Settings naming files and directories, which a daemon started elsewhere may resolve differently
+    PATH_SETTINGS: Tuple[str, ...] = (
+        "CHROMA_DB_PATH", "CACHE_DIR", "EMBEDDING_CACHE_DIR", "KNOWLEDGE_BASE_CACHE_DIR", "SESSIONS_DIR"
+    )
+    # Settings selecting the models, which the daemon loaded once at startup
+    MODEL_SETTINGS: Tuple[str, ...] = ("MODEL_NAME", "MODEL_PROVIDER", "EMBEDDING_BACKEND", "EMBEDDING_MODEL_NAME")
+
+    @staticmethod
+    def connect(socket_path: str = Constants.DAEMON_SOCKET_PATH) -> socket.socket:
+        """
+        Connect to the daemon socket.
+
+        Args:
+            socket_path: Path of the daemon's Unix socket
+
+        Returns:
+            Connected socket
+
+        Raises:
+            DaemonUnavailableError: If no daemon is listening on the socket, or the
+                platform has no Unix sockets
+        """
+        if not DaemonClient.is_supported():
+            raise DaemonUnavailableError("Unix sockets are not supported on this platform")
+        if not os.path.exists(socket_path):
+            raise DaemonUnavailableError(f"No daemon socket at {socket_path}")
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(DaemonClient.CONNECT_TIMEOUT)
+        try:
+            sock.connect(socket_path)
+        except OSError as e:
+            sock.close()
+            raise DaemonUnavailableError(f"Daemon is not running: {e}") from e
+        # Bounds the wait for each response event, so that a wedged daemon can't hang the CLI
+        sock.settimeout(Constants.DAEMON_READ_TIMEOUT)
+        return sock
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Check if the platform has the Unix sockets the daemon listens on, e.g. not Windows."""
+        return hasattr(socket, "AF_UNIX")
+
+    @staticmethod
+    def settings() -> Dict[str, str]:
+        """
+        Get the settings a daemon must share with this process to serve its commands.
+
+        A daemon only serves requests whose settings match its own, so that
+        relative paths such as the default CHROMA_DB_PATH mean the same in
+        the client and the daemon, and answers come from the configured models.
+
+        Returns:
+            Value by setting name, see PATH_SETTINGS (resolved against the
+            working directory) and MODEL_SETTINGS
+        """
+        settings = {name: os.path.abspath(getattr(Constants, name)) for name in DaemonClient.PATH_SETTINGS}
+        settings.update({name: str(getattr(Constants, name)) for name in DaemonClient.MODEL_SETTINGS})
+        return settings
+
+    @staticmethod
+    def is_running(socket_path: str = Constants.DAEMON_SOCKET_PATH) -> bool:
+        """Check if a daemon is listening on the socket."""
+        try:
+            DaemonClient.connect(socket_path).close()
+            return True
+        except DaemonUnavailableError:
+            return False
+
+    @staticmethod
+    def send(
+        sock: socket.socket,
+        command_name: str,
+        user_message: str,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Send a command request and yield the daemon's response events.
+
+        Args:
+            sock: Socket connected to the daemon
+            command_name: Name of the command to execute
+            user_message: User input for the command
+            options: Command options, see CommandFactory.get_handler
+
+        Yields:
+            Response events decoded from newline-delimited JSON
+
+        Raises:
+            TimeoutError: If the daemon sends no event for DAEMON_READ_TIMEOUT seconds
+        """
+        with sock, sock.makefile("rwb") as stream:
+            request = {
+                "command": command_name,
+                "message": user_message,
+                "options": options or {},
+                "no_cache": ResponseCacheService.is_bypassed(),
+                "settings": DaemonClient.settings()
+            }
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            for line in stream:
+                yield json.loads(line)
+
+    @staticmethod
+    def execute(command_name: str, user_message: str = "", options: Optional[Dict[str, Any]] = None,
+                socket_path: str = Constants.DAEMON_SOCKET_PATH) -> None:
+        """
+        Execute a command on the daemon and render its output.
+
+        Args:
+            command_name: Name of the command to execute
+            user_message: User input for the command
+            options: Command options, see CommandFactory.get_handler
+            socket_path: Path of the daemon's Unix socket
+
+        Raises:
+            DaemonUnavailableError: If no daemon is listening, it stopped responding
+                before starting the command, or it works with other settings. Nothing
+                has been executed.
+        """
+        events = DaemonClient.send(DaemonClient.connect(socket_path), command_name, user_message, options)
+        errors: List[str] = []
+
+        def chunks() -> Iterator[str]:
+            try:
+                for event in events:
+                    if event["event"] == "chunk":
+                        yield event["text"]
+                    elif event["event"] == "status":
+                        UIService.update_status(event["text"])
+                    elif event["event"] == "error":
+                        errors.append(event["message"])
+            except TimeoutError:
+                errors.append(f"The daemon stopped responding for {Constants.DAEMON_READ_TIMEOUT:g}s")
+
+        # The daemon answers with "start" (carrying the output style), "error" or
+        # "unavailable" right after validating the input, before any output is generated
+        try:
+            first_event: Optional[Dict[str, Any]] = next(events, None)
+        except TimeoutError as e:
+            raise DaemonUnavailableError("Daemon is not responding") from e
+        if first_event is not None and first_event["event"] == "unavailable":
+            raise DaemonUnavailableError(first_event["message"])
+        if first_event is not None and first_event["event"] == "start":
+            UIService.stream_output(
+                chunks(), first_event.get("style", "markdown"), first_event.get("text", "Thinking")
+            )
+        elif first_event is not None and first_event["event"] == "error":
+            errors.append(first_event["message"])
+        for error in errors:
+            UIService.print_error(error)
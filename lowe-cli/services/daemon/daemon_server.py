@@ -0,0 +1,134 @@
+"""Resident daemon that keeps the LLM client, embedding model and Chroma handle warm."""
+import json
+import os
+import socketserver
+from typing import Any, Dict, Iterator
+from services.cache.response_cache_service import ResponseCacheService
+from services.commands.command_factory import CommandFactory
+from services.daemon.daemon_client import DaemonClient
+from services.huggingface.embedding_model_service import EmbeddingModelService
+from services.llm_client import LlmClient
+from services.ui.ui_service import UIService
+from utils.constants import Constants
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handles a single newline-delimited JSON request per connection."""
+
+    server: "_UnixServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            # Progress reported while a command runs reaches the client's spinner
+            with UIService.status_listener(lambda text: self.send({"event": "status", "text": text})):
+                for event in self.server.daemon_server.handle(json.loads(line)):
+                    self.send(event)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away, nothing left to answer
+            pass
+
+    def send(self, event: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, daemon_server: "DaemonServer") -> None:
+        self.daemon_server: DaemonServer = daemon_server
+        super().__init__(socket_path, _RequestHandler)
+
+
+class DaemonServer:
+    """Serves LoweCLI commands over a Unix socket from a single warm process."""
+
+    def __init__(self, socket_path: str = Constants.DAEMON_SOCKET_PATH) -> None:
+        """
+        Initialize the daemon server.
+
+        Args:
+            socket_path: Path of the Unix socket to listen on
+        """
+        self.socket_path: str = socket_path
+        self.factory: CommandFactory = CommandFactory()
+        self.factory.use_daemon = False
+
+    def warm_up(self) -> None:
+        """Load the chat model, embedding model and Chroma handle up front."""
+        llm_client: LlmClient = LlmClient.get_instance()
+        EmbeddingModelService.warm_up()
+        chroma_service = llm_client.get_chroma_service()
+        # Opening Chroma creates the persist directory, which would make the
+        # index command believe the index already exists
+        if os.path.exists(Constants.CHROMA_DB_PATH):
+            chroma_service.get_vector_store()
+
+    def handle(self, request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Execute a command request and yield response events.
+
+        Args:
+            request: Request with "command", "message", "options", "no_cache" and "settings" keys
+
+        Yields:
+            A "start" event, "chunk" events as output streams and an "end"
+            event, or an "error" event. "status" events reporting progress are
+            sent by the request handler as the command runs. An "unavailable"
+            event, when the client works with other settings, asks it to run the
+            command itself.
+        """
+        client_settings: Dict[str, str] = request.get("settings") or {}
+        mismatched = [
+            name for name, value in DaemonClient.settings().items() if client_settings.get(name, value) != value
+        ]
+        if mismatched:
+            yield {"event": "unavailable", "message": f"Daemon uses another {', '.join(mismatched)}"}
+            return
+
+        # Each request is handled on its own thread, so this only affects this request
+        ResponseCacheService.set_bypass(bool(request.get("no_cache")))
+        try:
+            handler = self.factory.get_handler(request.get("command", ""), request.get("options"))
+            user_message = handler.prepare(request.get("message", ""))
+        except Exception as e:
+            yield {"event": "error", "message": str(e)}
+            return
+
+        yield {"event": "start", "style": handler.output_style, "text": handler.spinner_text}
+        try:
+            for chunk in handler.stream(user_message):
+                yield {"event": "chunk", "text": chunk}
+        except Exception as e:
+            yield {"event": "error", "message": str(e)}
+            return
+        yield {"event": "end"}
+
+    def serve_forever(self) -> None:
+        """
+        Warm up and serve requests until interrupted.
+
+        Raises:
+            RuntimeError: If another daemon is already listening on the socket
+        """
+        if DaemonClient.is_running(self.socket_path):
+            raise RuntimeError(f"A LoweCLI daemon is already running on {self.socket_path}")
+        if os.path.exists(self.socket_path):
+            # Stale socket left behind by a daemon that didn't shut down cleanly
+            os.unlink(self.socket_path)
+
+        UIService.execute_with_spinner(self.warm_up, "Warming up")
+        server = _UnixServer(self.socket_path, self)
+        os.chmod(self.socket_path, 0o600)
+        UIService.print_success(f"LoweCLI daemon listening on {self.socket_path} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print()
+        finally:
+            server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
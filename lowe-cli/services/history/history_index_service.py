@@ -0,0 +1,223 @@
+"""Incrementally updated search index of the shell history."""
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+from services.history.history_service import HistoryService
+from utils.constants import Constants
+from utils.profiler import Profiler
+
+TERM_PATTERN = re.compile(r"\w+")
+# Words of an instruction that say nothing about the command
+STOP_WORDS = frozenset((
+    "a", "all", "an", "and", "are", "can", "do", "for", "from", "how", "i", "in", "into", "is", "it", "me",
+    "my", "of", "on", "or", "please", "the", "this", "to", "using", "what", "with",
+))
+SUFFIXES = ("ations", "ation", "ings", "ing", "ions", "ion", "ies", "es", "ed", "s", "e")
+# Bytes before the indexed offset compared to detect a rewritten history file
+FINGERPRINT_SIZE: int = 256
+
+
+class HistoryIndexService:
+    """
+    SQLite FTS5 index of the distinct commands of the shell history.
+
+    Each run only parses the entries appended to the history file since the
+    previous one. Commands are ranked by BM25 relevance to the instruction,
+    weighted by how often they were run and how recently.
+    """
+
+    # Weight of log(times run), so that frequency breaks ties without outweighing relevance
+    FREQUENCY_WEIGHT: float = 0.1
+
+    _lock: threading.Lock = threading.Lock()
+    _connection: Optional[sqlite3.Connection] = None
+    _db_path: Optional[str] = None
+
+    @staticmethod
+    def relevant_history(query: str, k: int = Constants.PERFORM_HISTORY_TOP_K) -> str:
+        """
+        Get the shell history most related to an instruction, as prompt context.
+
+        Args:
+            query: Instruction of the user
+            k: Maximum number of commands
+
+        Returns:
+            Related commands, best first, one per line. The most recent
+            commands when none is related or the index can't be used.
+        """
+        try:
+            HistoryIndexService.update()
+            commands = [command for command, _ in HistoryIndexService.search(query, k)]
+        except (OSError, sqlite3.Error):
+            commands = []
+        return "\n".join(commands or HistoryService.get_recent_commands(k))
+
+    @staticmethod
+    @Profiler.timed("history:index_update")
+    def update() -> int:
+        """
+        Add the entries appended to the history file since the last update.
+
+        The index is rebuilt when the file was rewritten, e.g. truncated to
+        HISTFILESIZE by bash.
+
+        Returns:
+            Number of entries added
+        """
+        history_file = HistoryService.find_history_file()
+        if history_file is None:
+            return 0
+        path, shell = history_file
+        stat = os.stat(path)
+
+        with HistoryIndexService._lock:
+            connection = HistoryIndexService._get_connection()
+            row = connection.execute("SELECT offset, inode, fingerprint FROM files WHERE path = ?", (path,)).fetchone()
+            offset = 0
+            if row is not None:
+                offset, inode, fingerprint = row
+                if (
+                    inode != stat.st_ino
+                    or stat.st_size < offset
+                    or HistoryIndexService._fingerprint(path, offset) != fingerprint
+                ):
+                    HistoryIndexService._reset(connection)
+                    offset = 0
+                elif stat.st_size == offset:
+                    return 0
+
+            commands, offset = HistoryService.read_entries(path, shell, offset)
+            sequence = connection.execute("SELECT COALESCE(MAX(last_seen), 0) FROM commands").fetchone()[0]
+            for command in commands:
+                sequence += 1
+                cursor = connection.execute(
+                    "UPDATE commands SET count = count + 1, last_seen = ? WHERE command = ?", (sequence, command)
+                )
+                if cursor.rowcount == 0:
+                    cursor = connection.execute(
+                        "INSERT INTO commands (command, count, last_seen) VALUES (?, 1, ?)", (command, sequence)
+                    )
+                    connection.execute(
+                        "INSERT INTO commands_fts (rowid, command) VALUES (?, ?)", (cursor.lastrowid, command)
+                    )
+            connection.execute(
+                "INSERT OR REPLACE INTO files (path, offset, inode, fingerprint) VALUES (?, ?, ?, ?)",
+                (path, offset, stat.st_ino, HistoryIndexService._fingerprint(path, offset))
+            )
+            connection.commit()
+        return len(commands)
+
+    @staticmethod
+    @Profiler.timed("history:search")
+    def search(
+        query: str,
+        k: int = Constants.PERFORM_HISTORY_TOP_K,
+        half_life: float = Constants.HISTORY_RECENCY_HALF_LIFE,
+        candidates: int = 200
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank indexed commands by relevance to an instruction.
+
+        Each command scores its BM25 relevance times 1 + FREQUENCY_WEIGHT *
+        log(times run), halved for every half_life entries run since it was
+        last used.
+
+        Args:
+            query: Instruction of the user
+            k: Maximum number of commands to return
+            half_life: Number of history entries after which a command's weight halves
+            candidates: Number of best BM25 matches re-ranked by frequency and recency
+
+        Returns:
+            Commands with their score, best first
+        """
+        match = HistoryIndexService.match_expression(query)
+        if not match:
+            return []
+        with HistoryIndexService._lock:
+            connection = HistoryIndexService._get_connection()
+            latest = connection.execute("SELECT COALESCE(MAX(last_seen), 0) FROM commands").fetchone()[0]
+            rows = connection.execute(
+                "SELECT commands.command, commands.count, commands.last_seen, -bm25(commands_fts) AS relevance "
+                "FROM commands_fts JOIN commands ON commands.id = commands_fts.rowid "
+                "WHERE commands_fts MATCH ? ORDER BY relevance DESC LIMIT ?",
+                (match, candidates)
+            ).fetchall()
+        scored: List[Tuple[str, float]] = []
+        for command, count, last_seen, relevance in rows:
+            frequency = 1 + HistoryIndexService.FREQUENCY_WEIGHT * math.log(count)
+            recency = 0.5 ** ((latest - last_seen) / half_life)
+            scored.append((command, relevance * frequency * recency))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """
+        Build the FTS5 query matching commands related to an instruction.
+
+        Stop words are dropped and longer words are matched by their stem as
+        a prefix, so that e.g. "migrations" matches "db:migrate".
+
+        Args:
+            query: Instruction of the user
+
+        Returns:
+            Terms joined with OR, empty if the instruction has no usable term
+        """
+        terms: List[str] = []
+        for word in TERM_PATTERN.findall(query.lower()):
+            if word in STOP_WORDS:
+                continue
+            stem = HistoryIndexService._stem(word)
+            terms.append(f'"{stem}"*' if len(stem) >= 3 else f'"{word}"')
+        return " OR ".join(dict.fromkeys(terms))
+
+    @staticmethod
+    def _stem(word: str) -> str:
+        """Strip a common English suffix, keeping at least three characters."""
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[:-len(suffix)]
+        return word
+
+    @staticmethod
+    def _fingerprint(path: str, offset: int) -> str:
+        """Hash the bytes just before an offset of a file, which change if the file is rewritten."""
+        with open(path, "rb") as f:
+            f.seek(max(0, offset - FINGERPRINT_SIZE))
+            return hashlib.sha1(f.read(min(offset, FINGERPRINT_SIZE))).hexdigest()
+
+    @staticmethod
+    def _reset(connection: sqlite3.Connection) -> None:
+        connection.execute("DELETE FROM commands")
+        connection.execute("DELETE FROM commands_fts")
+        connection.execute("DELETE FROM files")
+
+    @staticmethod
+    def _get_connection() -> sqlite3.Connection:
+        """Open the index database on first use. Callers must hold the lock."""
+        db_path = os.path.join(Constants.CACHE_DIR, "history_index.sqlite3")
+        if HistoryIndexService._connection is None or HistoryIndexService._db_path != db_path:
+            os.makedirs(Constants.CACHE_DIR, exist_ok=True)
+            connection = sqlite3.connect(db_path, check_same_thread=False)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, offset INTEGER NOT NULL, inode INTEGER NOT NULL, fingerprint TEXT NOT NULL)"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS commands ("
+                "id INTEGER PRIMARY KEY, command TEXT NOT NULL UNIQUE, count INTEGER NOT NULL, last_seen INTEGER NOT NULL)"
+            )
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS commands_fts USING fts5(command, prefix = '3')"
+            )
+            connection.commit()
+            HistoryIndexService._connection = connection
+            HistoryIndexService._db_path = db_path
+        return HistoryIndexService._connection
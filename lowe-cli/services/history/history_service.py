@@ -1,39 +1,269 @@
 """History service for retrieving shell command history."""
-import subprocess
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from utils.constants import Constants
+from utils.profiler import Profiler
+
+READ_BLOCK_SIZE: int = 64 * 1024
+
+# Start of an entry in each history format
+ENTRY_START_PATTERNS: Dict[str, re.Pattern] = {
+    # `: <start>:<elapsed>;<command>` with setopt EXTENDED_HISTORY, plain lines otherwise
+    "zsh": re.compile(r"^: \d+:\d+;"),
+    # `#<timestamp>` before each command when HISTTIMEFORMAT is set, plain lines otherwise
+    "bash": re.compile(r"^#\d+$"),
+    "fish": re.compile(r"^- cmd: "),
+}
+# zsh escapes bytes 0x83-0x9f and 0x00 as 0x83 followed by the byte xor 0x20
+ZSH_META: int = 0x83
 
 
 class HistoryService:
     """Service for managing and retrieving shell command history."""
-    
+
+    _cache: Dict[Tuple[str, int, int, int], List[str]] = {}
+    _lock: threading.Lock = threading.Lock()
+
     @staticmethod
-    def get_recent_history(max_lines: int = 100) -> str:
+    def get_recent_history(max_lines: int = Constants.HISTORY_MAX_ENTRIES) -> str:
         """
-        Run shell history command and return output as a formatted string.
-        
+        Read the most recent shell history entries as a formatted string.
+
         Args:
-            max_lines: Maximum number of history lines to retrieve
-            
+            max_lines: Maximum number of history entries to retrieve
+
+        Returns:
+            Distinct recent commands, most recent first, one per line.
+            Empty if no history file is found.
+        """
+        return "\n".join(HistoryService.get_recent_commands(max_lines))
+
+    @staticmethod
+    def get_recent_commands(max_entries: int = Constants.HISTORY_MAX_ENTRIES) -> List[str]:
+        """
+        Read the most recent distinct commands from the shell history file.
+
+        Only the end of the file is read, and results are cached until the
+        file changes.
+
+        Args:
+            max_entries: Maximum number of commands to return
+
         Returns:
-            Formatted string of recent command history
+            Commands, most recent first, each only at its latest occurrence
         """
+        history_file = HistoryService.find_history_file()
+        if history_file is None or max_entries <= 0:
+            return []
+        path, shell = history_file
         try:
-            result = subprocess.run(
-                f"history | tail -r | head -n {max_lines}",
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                shell=True,
-                executable="/bin/bash"
-            )
-            
-            if result.returncode == 0:
-                return "\n".join(
-                    line.strip() 
-                    for line in result.stdout.splitlines() 
-                    if line.strip()
+            stat = os.stat(path)
+        except OSError:
+            return []
+
+        key = (path, stat.st_mtime_ns, stat.st_size, max_entries)
+        with HistoryService._lock:
+            cached = HistoryService._cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        try:
+            with Profiler.span("history:read", path=path):
+                commands = HistoryService._read_recent(path, shell, max_entries)
+        except OSError:
+            return []
+        with HistoryService._lock:
+            # Only the latest state of each file is worth keeping
+            for stale in [other for other in HistoryService._cache if other[0] == path]:
+                del HistoryService._cache[stale]
+            HistoryService._cache[key] = commands
+        return list(commands)
+
+    @staticmethod
+    def find_history_file() -> Optional[Tuple[str, str]]:
+        """
+        Locate the history file of the user's shell.
+
+        $HISTFILE is used when set. Otherwise the file of the shell in $SHELL
+        is preferred, then the most recently modified of the bash, zsh and
+        fish history files.
+
+        Returns:
+            Path of the history file and its format ("bash", "zsh" or "fish"), None if there is none
+        """
+        home = os.path.expanduser("~")
+        shell = os.path.basename(os.getenv("SHELL") or "")
+        histfile = os.getenv("HISTFILE")
+        if histfile and os.path.isfile(histfile):
+            return histfile, HistoryService._format_of(histfile, shell)
+
+        candidates: List[Tuple[str, str]] = [
+            (os.path.join(os.getenv("ZDOTDIR") or home, ".zsh_history"), "zsh"),
+            (os.path.join(os.getenv("ZDOTDIR") or home, ".zhistory"), "zsh"),
+            (os.path.join(home, ".bash_history"), "bash"),
+            (os.path.join(os.getenv("XDG_DATA_HOME") or os.path.join(home, ".local", "share"), "fish", "fish_history"), "fish"),
+        ]
+        existing: List[Tuple[float, str, str]] = []
+        for path, file_format in candidates:
+            try:
+                existing.append((os.path.getmtime(path), path, file_format))
+            except OSError:
+                continue
+        if not existing:
+            return None
+        for _, path, file_format in existing:
+            if file_format == shell:
+                return path, file_format
+        _, path, file_format = max(existing)
+        return path, file_format
+
+    @staticmethod
+    def read_entries(path: str, shell: str, offset: int = 0) -> Tuple[List[str], int]:
+        """
+        Read the complete entries appended to a history file after an offset.
+
+        Args:
+            path: Path of the history file
+            shell: Format of the history file
+            offset: Position to read from, the end of previously read entries
+
+        Returns:
+            Commands, oldest first, and the position after the last complete entry
+        """
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # An entry still being written is left for the next read
+        end = data.rfind(b"\n") + 1
+        if shell == "zsh":
+            while end > 1 and data[end - 2:end] == b"\\\n":
+                end = data.rfind(b"\n", 0, end - 1) + 1
+        if end <= 0:
+            return [], offset
+        text = HistoryService._decode(data[:end], shell)
+        commands = [command.strip() for command in HistoryService._parse(text, shell, at_start=True)]
+        return [command for command in commands if command], offset + end
+
+    @staticmethod
+    def _format_of(path: str, shell: str) -> str:
+        """Guess the format of a history file from its name, then from the user's shell."""
+        name = os.path.basename(path)
+        if "fish" in name:
+            return "fish"
+        if "zsh" in name or name == ".zhistory":
+            return "zsh"
+        if "bash" in name:
+            return "bash"
+        return shell if shell in ENTRY_START_PATTERNS else "bash"
+
+    @staticmethod
+    def _read_recent(path: str, shell: str, max_entries: int) -> List[str]:
+        """
+        Read blocks from the end of the file until they hold max_entries distinct commands.
+
+        Each tail is parsed forwards from its first complete entry, so
+        multi-line entries are never split.
+        """
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            read_size = min(READ_BLOCK_SIZE, size)
+            while True:
+                f.seek(size - read_size)
+                data = f.read(read_size)
+                at_start = read_size == size
+                commands = HistoryService._distinct_recent(
+                    HistoryService._parse(HistoryService._decode(data, shell), shell, at_start), max_entries
                 )
+                if at_start or len(commands) >= max_entries:
+                    return commands
+                read_size = min(read_size * 2, size)
+
+    @staticmethod
+    def _decode(data: bytes, shell: str) -> str:
+        """Decode history file contents, undoing zsh's metafied encoding."""
+        if shell == "zsh" and ZSH_META in data:
+            unmetafied = bytearray()
+            escaped = False
+            for byte in data:
+                if escaped:
+                    unmetafied.append(byte ^ 0x20)
+                    escaped = False
+                elif byte == ZSH_META:
+                    escaped = True
+                else:
+                    unmetafied.append(byte)
+            data = bytes(unmetafied)
+        return data.decode("utf-8", errors="replace")
+
+    @staticmethod
+    def _parse(text: str, shell: str, at_start: bool) -> List[str]:
+        """
+        Parse history entries in file order.
+
+        Args:
+            text: Contents of the end of a history file
+            shell: Format of the history file
+            at_start: Whether the text starts at the beginning of the file
+
+        Returns:
+            Commands, oldest first
+        """
+        lines = text.split("\n")
+        if not at_start:
+            # The first line may be cut; skip to the start of the next entry
+            lines = lines[1:]
+            start_pattern = ENTRY_START_PATTERNS[shell]
+            first = next((i for i, line in enumerate(lines) if start_pattern.match(line)), None)
+            if first is not None:
+                lines = lines[first:]
+            elif shell == "fish":
+                return []
+
+        if shell == "fish":
+            return HistoryService._parse_fish(lines)
+        if shell == "zsh":
+            return HistoryService._parse_zsh(lines)
+        return [line for line in lines if line.strip() and not ENTRY_START_PATTERNS["bash"].match(line)]
+
+    @staticmethod
+    def _parse_zsh(lines: List[str]) -> List[str]:
+        """Parse zsh history lines, joining commands continued with a trailing backslash."""
+        commands: List[str] = []
+        pending: Optional[str] = None
+        for line in lines:
+            if pending is not None:
+                pending += "\n" + line
             else:
-                return ""
-                
-        except subprocess.SubprocessError:
-            return ""
+                pending = ENTRY_START_PATTERNS["zsh"].sub("", line)
+            if pending.endswith("\\"):
+                pending = pending[:-1]
+                continue
+            commands.append(pending)
+            pending = None
+        if pending is not None:
+            commands.append(pending)
+        return commands
+
+    @staticmethod
+    def _parse_fish(lines: List[str]) -> List[str]:
+        """Parse the `- cmd:` entries of a fish history file, ignoring their `when` and `paths` fields."""
+        commands: List[str] = []
+        for line in lines:
+            if line.startswith("- cmd: "):
+                # fish escapes backslashes and newlines in commands
+                commands.append(re.sub(r"\\(.)", lambda m: "\n" if m.group(1) == "n" else m.group(1), line[len("- cmd: "):]))
+        return commands
+
+    @staticmethod
+    def _distinct_recent(commands: List[str], max_entries: int) -> List[str]:
+        """Get up to max_entries distinct commands, most recent first."""
+        seen: Dict[str, None] = {}
+        for command in reversed(commands):
+            command = command.strip()
+            if command and command not in seen:
+                seen[command] = None
+                if len(seen) >= max_entries:
+                    break
+        return list(seen)
@@ -1,11 +1,309 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+"""Embedding model service with pluggable backends and a process-wide, thread-safe model registry."""
+import gc
+import os
+import platform
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from utils.constants import Constants
+from utils.profiler import Profiler
+
+# Registry key: (backend, model name, device)
+ModelKey = Tuple[str, str, str]
+
+# Backends running sentence-transformers models; they produce interchangeable vectors for the same model
+SENTENCE_TRANSFORMERS_BACKENDS = ("huggingface", "onnx", "onnx-int8")
+EMBEDDING_BACKENDS = SENTENCE_TRANSFORMERS_BACKENDS + ("fastembed",)
+# Extra to install for each backend's optional dependencies
+BACKEND_EXTRAS: Dict[str, str] = {"onnx": "onnx", "onnx-int8": "onnx", "fastembed": "fastembed"}
+
+
+class RegistryEmbeddings(Embeddings):
+    """
+    Embeddings looking up the registry's model on every call.
+
+    Long-lived holders such as vector stores keep this instead of the model,
+    so that EmbeddingModelService.release can free the model; the next call
+    loads it again.
+    """
+
+    def __init__(self, backend: str, model_name: str, device: str) -> None:
+        """
+        Initialize the lookup.
+
+        Args:
+            backend: Backend running the model, one of EMBEDDING_BACKENDS
+            model_name: Sentence-transformers or FastEmbed model name
+            device: Device to load the model on, "auto" lets the backend pick
+        """
+        self.backend: str = backend
+        self.model_name: str = model_name
+        self.device: str = device
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the registry's model."""
+        return EmbeddingModelService.get_embeddings(self.backend, self.model_name, self.device).embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query with the registry's model."""
+        return EmbeddingModelService.get_embeddings(self.backend, self.model_name, self.device).embed_query(text)
 
 
 class EmbeddingModelService:
-    """Service to get HuggingFace embeddings model."""
+    """
+    Service to get the embeddings model.
+
+    EMBEDDING_BACKEND selects how the model runs:
+    - huggingface: sentence-transformers on PyTorch
+    - onnx: sentence-transformers on ONNX Runtime
+    - onnx-int8: ONNX Runtime with the model's dynamically quantized int8 export
+    - fastembed: FastEmbed's quantized ONNX models, without PyTorch
+    """
+
+    _models: Dict[ModelKey, Embeddings] = {}
+    _cached: Dict[ModelKey, Embeddings] = {}
+    _load_locks: Dict[ModelKey, threading.Lock] = {}
+    _registry_lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def get_embeddings(
+        backend: str = Constants.EMBEDDING_BACKEND,
+        model_name: str = Constants.EMBEDDING_MODEL_NAME,
+        device: str = Constants.EMBEDDING_DEVICE
+    ) -> Embeddings:
+        """
+        Get the shared embeddings model, loading it on first use.
+
+        Concurrent callers asking for the same model wait for a single load
+        instead of loading it again.
+
+        Args:
+            backend: Backend running the model, one of EMBEDDING_BACKENDS
+            model_name: Sentence-transformers or FastEmbed model name
+            device: Device to load the model on, "auto" lets the backend pick
+
+        Returns:
+            Shared embeddings model
+
+        Raises:
+            ValueError: If the backend is not supported
+            ImportError: If the backend's optional dependencies are not installed
+        """
+        key: ModelKey = (backend, model_name, device)
+        embeddings: Optional[Embeddings] = EmbeddingModelService._models.get(key)
+        if embeddings is not None:
+            return embeddings
+
+        with EmbeddingModelService._registry_lock:
+            load_lock = EmbeddingModelService._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            embeddings = EmbeddingModelService._models.get(key)
+            if embeddings is None:
+                embeddings = EmbeddingModelService._load(backend, model_name, device)
+                EmbeddingModelService._models[key] = embeddings
+        return embeddings
+
+    @staticmethod
+    def get_cached_embeddings(
+        backend: str = Constants.EMBEDDING_BACKEND,
+        model_name: str = Constants.EMBEDDING_MODEL_NAME,
+        device: str = Constants.EMBEDDING_DEVICE
+    ) -> Embeddings:
+        """
+        Get the shared embeddings model behind the persistent embedding cache.
+
+        The model itself is only loaded when a text misses the cache. Without
+        EMBEDDING_CACHE_ENABLED texts are embedded by get_embeddings's model.
+        Either way the result doesn't hold on to the model, so it can be kept
+        for the life of the process, see release.
+
+        Args:
+            backend: Backend running the model, one of EMBEDDING_BACKENDS
+            model_name: Sentence-transformers or FastEmbed model name
+            device: Device to load the model on, "auto" lets the backend pick
+
+        Returns:
+            Shared embeddings
+        """
+        key: ModelKey = (backend, model_name, device)
+        with EmbeddingModelService._registry_lock:
+            cached = EmbeddingModelService._cached.get(key)
+            if cached is None:
+                if Constants.EMBEDDING_CACHE_ENABLED:
+                    from services.cache.embedding_cache_service import CachedEmbeddings
+
+                    cached = CachedEmbeddings(
+                        EmbeddingModelService.model_id(backend, model_name),
+                        lambda: EmbeddingModelService.get_embeddings(backend, model_name, device)
+                    )
+                else:
+                    cached = RegistryEmbeddings(backend, model_name, device)
+                EmbeddingModelService._cached[key] = cached
+        return cached
+
+    @staticmethod
+    def warm_up(
+        backend: str = Constants.EMBEDDING_BACKEND,
+        model_name: str = Constants.EMBEDDING_MODEL_NAME,
+        device: str = Constants.EMBEDDING_DEVICE
+    ) -> None:
+        """Load the embeddings model into the registry ahead of its first use."""
+        EmbeddingModelService.get_embeddings(backend, model_name, device)
+
+    @staticmethod
+    def limit_threads(workers: int, backend: str = Constants.EMBEDDING_BACKEND) -> None:
+        """
+        Share the cores between threads embedding concurrently with one in-process model.
+
+        PyTorch runs each call on every core, so concurrent calls would
+        oversubscribe them. ONNX Runtime and FastEmbed size their thread pools
+        when the model loads and are left alone.
+
+        Args:
+            workers: Number of threads embedding at the same time
+            backend: Backend running the model
+        """
+        if backend != "huggingface":
+            return
+        import torch
+
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
 
     @staticmethod
-    def get_huggingface_embeddings(model_name: str = "sentence-transformers/all-mpnet-base-v2") -> HuggingFaceEmbeddings:
-        """Get HuggingFace embeddings model."""
-        embeddings: HuggingFaceEmbeddings = HuggingFaceEmbeddings(model_name=model_name)
-        return embeddings
\ No newline at end of file
+    def model_id(
+        backend: str = Constants.EMBEDDING_BACKEND,
+        model_name: str = Constants.EMBEDDING_MODEL_NAME
+    ) -> str:
+        """
+        Identify the vectors a model produces, e.g. to key cached embeddings.
+
+        Args:
+            backend: Backend running the model
+            model_name: Model name
+
+        Returns:
+            The backend and model name, and for onnx-int8 the quantized export loaded
+        """
+        if backend == "onnx-int8":
+            return f"{backend}:{model_name}:{EmbeddingModelService._int8_onnx_file()}"
+        return f"{backend}:{model_name}"
+
+    @staticmethod
+    def model_info(
+        backend: str = Constants.EMBEDDING_BACKEND,
+        model_name: str = Constants.EMBEDDING_MODEL_NAME
+    ) -> Dict[str, str]:
+        """
+        Describe an embeddings model, as recorded in the index metadata.
+
+        Args:
+            backend: Backend running the model
+            model_name: Model name
+
+        Returns:
+            The backend and model name
+        """
+        return {"backend": backend, "model": model_name}
+
+    @staticmethod
+    def is_compatible(indexed: Dict[str, str], current: Dict[str, str]) -> bool:
+        """
+        Check if vectors of one embeddings model can be searched with another.
+
+        The sentence-transformers backends run the same weights, so switching
+        between them keeps an index usable. FastEmbed exports its own models.
+
+        Args:
+            indexed: Model the index was built with, see model_info
+            current: Model queries would be embedded with
+
+        Returns:
+            Whether the index can be searched without rebuilding it
+        """
+        def family(backend: Optional[str]) -> str:
+            return "sentence-transformers" if backend in SENTENCE_TRANSFORMERS_BACKENDS else str(backend)
+
+        return indexed.get("model") == current.get("model") and family(indexed.get("backend")) == family(current.get("backend"))
+
+    @staticmethod
+    def release(model_name: Optional[str] = None, device: Optional[str] = None) -> None:
+        """
+        Drop embeddings models from the registry so their memory can be reclaimed.
+
+        Embeddings from get_cached_embeddings, which vector stores and the
+        semantic cache keep, only look the model up when a text needs it, so
+        they don't keep a released model alive and load it again on next use.
+
+        Args:
+            model_name: Model to release, all models when omitted
+            device: Device of the model to release, all devices when omitted
+        """
+        with EmbeddingModelService._registry_lock:
+            for key in list(EmbeddingModelService._models):
+                if model_name is not None and key[1] != model_name:
+                    continue
+                if device is not None and key[2] != device:
+                    continue
+                del EmbeddingModelService._models[key]
+            for key in list(EmbeddingModelService._cached):
+                if (model_name is None or key[1] == model_name) and (device is None or key[2] == device):
+                    del EmbeddingModelService._cached[key]
+        gc.collect()
+
+    @staticmethod
+    def loaded_models() -> List[ModelKey]:
+        """Get the (backend, model name, device) keys currently held in the registry."""
+        return list(EmbeddingModelService._models)
+
+    @staticmethod
+    def _load(backend: str, model_name: str, device: str) -> Embeddings:
+        """Load an embeddings model with the given backend."""
+        if backend not in EMBEDDING_BACKENDS:
+            raise ValueError(f"Unsupported embedding backend: {backend}, expected one of {', '.join(EMBEDDING_BACKENDS)}")
+        with Profiler.span("embeddings:load", backend=backend, model=model_name, device=device):
+            try:
+                if backend == "fastembed":
+                    return EmbeddingModelService._load_fastembed(model_name)
+                return EmbeddingModelService._load_sentence_transformers(backend, model_name, device)
+            except ImportError as e:
+                extra = BACKEND_EXTRAS.get(backend)
+                if extra is None:
+                    raise
+                raise ImportError(
+                    f"The {backend} embedding backend needs the {extra} extra, install it with: uv sync --extra {extra}"
+                ) from e
+
+    @staticmethod
+    def _load_sentence_transformers(backend: str, model_name: str, device: str) -> Embeddings:
+        """Load a sentence-transformers model on PyTorch or ONNX Runtime."""
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        model_kwargs: Dict[str, Any] = {} if device == "auto" else {"device": device}
+        if backend != "huggingface":
+            import onnxruntime  # noqa: F401 - fail early with the install hint
+
+            model_kwargs["backend"] = "onnx"
+        if backend == "onnx-int8":
+            model_kwargs["model_kwargs"] = {"file_name": EmbeddingModelService._int8_onnx_file()}
+        return HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs)
+
+    @staticmethod
+    def _load_fastembed(model_name: str) -> Embeddings:
+        """Load a FastEmbed model, which runs on ONNX Runtime only."""
+        import fastembed  # noqa: F401 - fail early with the install hint
+        from langchain_community.embeddings import FastEmbedEmbeddings
+
+        return FastEmbedEmbeddings(model_name=model_name, batch_size=Constants.EMBEDDING_BATCH_SIZE)
+
+    @staticmethod
+    def _int8_onnx_file() -> str:
+        """
+        Get the file of the quantized export to load from the model repository.
+
+        Sentence-transformers models ship int8 exports tuned per instruction set.
+        """
+        if Constants.EMBEDDING_ONNX_FILE:
+            return Constants.EMBEDDING_ONNX_FILE
+        if platform.machine().lower() in ("arm64", "aarch64"):
+            return "onnx/model_qint8_arm64.onnx"
+        return "onnx/model_quint8_avx2.onnx"
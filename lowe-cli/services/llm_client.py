@@ -1,16 +1,25 @@
-from typing import Any, Union, Optional
+import asyncio
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Union, Optional
 from langchain.chat_models import init_chat_model
-from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
-from langgraph.constants import START
-from langgraph.graph import StateGraph
 from typing_extensions import List, TypedDict
-from services.vector_db.chroma_service import ChromaService
+from services.cache.response_cache_service import ResponseCacheService
 from utils.constants import Constants
+from utils.profiler import Profiler
 from langchain_core.documents import Document
 
 class State(TypedDict):
     question: str
+    system_prompt: str
+    k: int
+    collection: str
+    tags: List[str]
+    url: Optional[str]
+    score_threshold: Optional[float]
+    mmr: bool
     context: List[Document]
     answer: str
 
@@ -18,6 +27,10 @@ class State(TypedDict):
 class LlmClient:
     _instance: Optional['LlmClient'] = None
     _model: Any = None
+    # Serializes initialization, which may start on a warm-up thread
+    _init_lock: threading.Lock = threading.Lock()
+    # Approximate tokens of the last context assembled in the current thread or task, None if it didn't assemble one
+    context_tokens: ContextVar[Optional[int]] = ContextVar("context_tokens", default=None)
     
     def __new__(cls) -> 'LlmClient':
         if cls._instance is None:
@@ -29,46 +42,410 @@ class LlmClient:
         if not self._initialized:
             self.model_name: str = Constants.MODEL_NAME
             self.model_provider: str = Constants.MODEL_PROVIDER
-            self._model = init_chat_model(self.model_name, model_provider=self.model_provider)
+            with Profiler.span("init_chat_model", model=self.model_name):
+                self._model = init_chat_model(self.model_name, model_provider=self.model_provider)
+            self._chroma_services: Dict[str, Any] = {}
+            self._lexical_indexes: Dict[str, Any] = {}
+            self._rag_graph: Any = None
+            self._semantic_cache: Any = None
+            self._rag_prompt_template: ChatPromptTemplate = ChatPromptTemplate([
+                ("system", "{system_prompt}"),
+                ("user", Constants.RAG_USER_PROMPT)
+            ])
             self._initialized: bool = True
     
     @classmethod
     def get_instance(cls) -> 'LlmClient':
-        """Get the singleton instance of LlmClient."""
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
+        """Get the singleton instance of LlmClient, waiting for an initialization in progress on another thread."""
+        instance = cls._instance
+        if instance is None or not instance._initialized:
+            with cls._init_lock:
+                instance = cls()
+        return instance
 
-    def invoke(self, user_prompt: Union[str, List[BaseMessage]], system_prompt: Optional[str] = None) -> BaseMessage:
+    def get_chroma_service(self, collection: str = Constants.CHROMA_COLLECTION) -> Any:
+        """Get the ChromaService used for retrieval from a collection, opening it on first use."""
+        chroma_service = self._chroma_services.get(collection)
+        if chroma_service is None:
+            with Profiler.span("import services.vector_db.chroma_service"):
+                from services.vector_db.chroma_service import ChromaService
+
+            chroma_service = ChromaService(collection)
+            self._chroma_services[collection] = chroma_service
+        return chroma_service
+
+    def get_lexical_index(self, collection: str = Constants.CHROMA_COLLECTION) -> Any:
+        """Get the BM25 index of a collection, which can be searched without the embedding model."""
+        lexical_index = self._lexical_indexes.get(collection)
+        if lexical_index is None:
+            from services.vector_db.lexical_index_service import LexicalIndexService
+
+            lexical_index = LexicalIndexService(collection)
+            self._lexical_indexes[collection] = lexical_index
+        return lexical_index
+
+    def get_rag_graph(self) -> Any:
+        """Get the retrieve/generate graph, compiling it on first use."""
+        if self._rag_graph is None:
+            # LangGraph is only needed for RAG, keep it off the import path of other commands
+            with Profiler.span("rag_graph:compile"):
+                from langgraph.constants import START
+                from langgraph.graph import StateGraph
+
+                graph_builder: StateGraph = StateGraph(State).add_sequence([self.retrieve, self.generate])
+                graph_builder.add_edge(START, "retrieve")
+                self._rag_graph = graph_builder.compile()
+        return self._rag_graph
+
+    @staticmethod
+    def message_text(content: Union[str, List[Any]]) -> str:
+        """Get the text of a message content, which some providers return as a list of parts."""
+        if isinstance(content, str):
+            return content
+        return "".join(
+            part if isinstance(part, str) else part.get("text", "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+
+    def _build_messages(self, user_prompt: Union[str, List[BaseMessage]], system_prompt: Optional[str] = None) -> Any:
         if system_prompt is None:
-            message = user_prompt
-        else:
-            message = [
-                SystemMessage(system_prompt),
-                HumanMessage(user_prompt),
-            ]
-        model_response: BaseMessage = self._model.invoke(message)
+            return user_prompt
+        return [
+            SystemMessage(system_prompt),
+            HumanMessage(user_prompt),
+        ]
+
+    def _cache_key(self, message: Any) -> Optional[str]:
+        """Get the response cache key for a model input, or None when caching is off."""
+        if not ResponseCacheService.is_enabled():
+            return None
+        return ResponseCacheService.make_key(self.model_name, self.model_provider, message)
+
+    def invoke(self, user_prompt: Union[str, List[BaseMessage]], system_prompt: Optional[str] = None) -> BaseMessage:
+        message = self._build_messages(user_prompt, system_prompt)
+        cache_key = self._cache_key(message)
+        if cache_key is not None:
+            cached = ResponseCacheService.get(cache_key)
+            if cached is not None:
+                return AIMessage(cached)
+
+        with Profiler.span("llm:invoke", model=self.model_name):
+            model_response: BaseMessage = self._model.invoke(message)
+        if cache_key is not None:
+            ResponseCacheService.put(cache_key, self.message_text(model_response.content))
         return model_response
 
-    def retrieve_and_invoke(self, user_message: str, system_prompt: Optional[str] = None) -> str:
-        graph_builder: StateGraph = StateGraph(State).add_sequence([self.retrieve, self.generate])
-        graph_builder.add_edge(START, "retrieve")
-        graph = graph_builder.compile()
-        response: dict[str, Any] = graph.invoke({"question": user_message})
-        return response["answer"]
+    async def ainvoke(self, user_prompt: Union[str, List[BaseMessage]], system_prompt: Optional[str] = None) -> BaseMessage:
+        """
+        Call the model through its async interface, so that many calls can run concurrently.
+        
+        Args:
+            user_prompt: Prompt or messages to send to the model
+            system_prompt: Optional system prompt sent before a plain prompt
+            
+        Returns:
+            The model response, served from the response cache when possible
+        """
+        message = self._build_messages(user_prompt, system_prompt)
+        cache_key = self._cache_key(message)
+        if cache_key is not None:
+            cached = ResponseCacheService.get(cache_key)
+            if cached is not None:
+                return AIMessage(cached)
+
+        with Profiler.span("llm:ainvoke", model=self.model_name):
+            model_response: BaseMessage = await self._model.ainvoke(message)
+        if cache_key is not None:
+            ResponseCacheService.put(cache_key, self.message_text(model_response.content))
+        return model_response
+
+    def stream(self, user_prompt: Union[str, List[BaseMessage]], system_prompt: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream the model response token by token.
+        
+        Args:
+            user_prompt: Prompt or messages to send to the model
+            system_prompt: Optional system prompt sent before a plain prompt
+            
+        Yields:
+            Text chunks of the response as the model generates them
+        """
+        message = self._build_messages(user_prompt, system_prompt)
+        cache_key = self._cache_key(message)
+        if cache_key is not None:
+            cached = ResponseCacheService.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks: List[str] = []
+        for chunk in Profiler.stream("llm:stream", self._model.stream(message)):
+            text = self.message_text(chunk.content)
+            if text:
+                chunks.append(text)
+                yield text
+        # Only cache responses that streamed to completion
+        if cache_key is not None:
+            ResponseCacheService.put(cache_key, "".join(chunks))
+
+    def retrieve_and_invoke(
+        self,
+        user_message: str,
+        system_prompt: Optional[str] = None,
+        k: int = Constants.RAG_TOP_K,
+        collection: str = Constants.CHROMA_COLLECTION,
+        tags: Optional[List[str]] = None,
+        url: Optional[str] = None,
+        score_threshold: Optional[float] = Constants.RAG_SCORE_THRESHOLD,
+        mmr: bool = Constants.RAG_MMR
+    ) -> str:
+        """
+        Answer a question from the knowledge base using the compiled RAG graph.
+        
+        Args:
+            user_message: The question to answer
+            system_prompt: System prompt for the answer, defaults to Constants.RAG_PROMPT
+            k: Number of documents to retrieve
+            collection: Chroma collection to retrieve from
+            tags: Only retrieve from documents with any of these tags
+            url: Only retrieve from the document with this url
+            score_threshold: Minimum relevance of vector search results
+            mmr: Diversify vector search results with maximal marginal relevance
+            
+        Returns:
+            The generated answer
+        """
+        return "".join(self.retrieve_and_stream(
+            user_message, system_prompt, k, collection, tags, url, score_threshold, mmr
+        ))
+
+    async def aretrieve_and_invoke(
+        self,
+        user_message: str,
+        system_prompt: Optional[str] = None,
+        k: int = Constants.RAG_TOP_K,
+        collection: str = Constants.CHROMA_COLLECTION,
+        tags: Optional[List[str]] = None,
+        url: Optional[str] = None,
+        score_threshold: Optional[float] = Constants.RAG_SCORE_THRESHOLD,
+        mmr: bool = Constants.RAG_MMR
+    ) -> str:
+        """
+        Answer a question from the knowledge base with an async model call.
+        
+        Retrieval and the semantic cache run on worker threads, so that many
+        questions can be answered concurrently from one event loop. Arguments
+        are the same as for retrieve_and_stream.
+        
+        Returns:
+            The generated answer
+        """
+        state: State = self._rag_input(user_message, system_prompt, k, collection, tags, url, score_threshold, mmr)
+        lexical_context: Optional[List[Document]] = await asyncio.to_thread(
+            self.lexical_match, user_message, k, collection, tags, url
+        )
+        semantic_cache = self.get_semantic_cache() if lexical_context is None else None
+        params_key: str = ""
+        if semantic_cache is not None:
+            params_key = semantic_cache.params_key(
+                model_name=self.model_name, model_provider=self.model_provider,
+                system_prompt=state["system_prompt"], k=k, collection=collection,
+                tags=state["tags"], url=url, score_threshold=score_threshold, mmr=mmr
+            )
+            cached = await asyncio.to_thread(semantic_cache.get, user_message, params_key)
+            if cached is not None:
+                return cached
+
+        if lexical_context is not None:
+            state["context"] = lexical_context
+        else:
+            state["context"] = (await asyncio.to_thread(self.retrieve, state))["context"]
+        messages = self._rag_messages(state)
+        answer = self.message_text((await self.ainvoke(messages)).content)
+        if semantic_cache is not None:
+            await asyncio.to_thread(semantic_cache.put, user_message, params_key, answer)
+        return answer
+
+    def retrieve_and_stream(
+        self,
+        user_message: str,
+        system_prompt: Optional[str] = None,
+        k: int = Constants.RAG_TOP_K,
+        collection: str = Constants.CHROMA_COLLECTION,
+        tags: Optional[List[str]] = None,
+        url: Optional[str] = None,
+        score_threshold: Optional[float] = Constants.RAG_SCORE_THRESHOLD,
+        mmr: bool = Constants.RAG_MMR
+    ) -> Iterator[str]:
+        """
+        Answer a question from the knowledge base, streaming the answer token by token.
+        
+        Answers to questions similar enough to a previous one are served from
+        the semantic cache without calling the model. Identifier-like
+        questions with a confident BM25 match are answered from the lexical
+        index without loading the embedding model.
+        
+        Args:
+            user_message: The question to answer
+            system_prompt: System prompt for the answer, defaults to Constants.RAG_PROMPT
+            k: Number of documents to retrieve
+            collection: Chroma collection to retrieve from
+            tags: Only retrieve from documents with any of these tags
+            url: Only retrieve from the document with this url
+            score_threshold: Minimum relevance of vector search results
+            mmr: Diversify vector search results with maximal marginal relevance
+            
+        Yields:
+            Text chunks of the answer as the model generates them
+        """
+        rag_input: State = self._rag_input(
+            user_message, system_prompt, k, collection, tags, url, score_threshold, mmr
+        )
+        lexical_context: Optional[List[Document]] = self.lexical_match(user_message, k, collection, tags, url)
+        if lexical_context is not None:
+            # Confident identifier match: skip the embedding model entirely
+            rag_input["context"] = lexical_context
+            semantic_cache = None
+        else:
+            semantic_cache = self.get_semantic_cache()
+        params_key: str = ""
+        if semantic_cache is not None:
+            params_key = semantic_cache.params_key(
+                model_name=self.model_name, model_provider=self.model_provider,
+                system_prompt=rag_input["system_prompt"], k=k, collection=collection,
+                tags=rag_input["tags"], url=url, score_threshold=score_threshold, mmr=mmr
+            )
+            with Profiler.span("semantic_cache:get"):
+                cached = semantic_cache.get(user_message, params_key)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks: List[str] = []
+        final_state: dict[str, Any] = {}
+        for mode, payload in self.get_rag_graph().stream(rag_input, stream_mode=["messages", "values"]):
+            if mode == "values":
+                final_state = payload
+                continue
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "generate":
+                text = self.message_text(chunk.content)
+                if text:
+                    chunks.append(text)
+                    yield text
+        # Models that don't stream tokens only produce the final state
+        if not chunks and final_state.get("answer"):
+            chunks.append(final_state["answer"])
+            yield final_state["answer"]
+
+        if semantic_cache is not None:
+            semantic_cache.put(user_message, params_key, "".join(chunks))
+
+    def get_semantic_cache(self) -> Any:
+        """Get the semantic answer cache for lookups, or None when it is disabled."""
+        if not Constants.SEMANTIC_CACHE_ENABLED or ResponseCacheService.is_bypassed():
+            return None
+        if self._semantic_cache is None:
+            from services.cache.semantic_cache_service import SemanticCacheService
+
+            self._semantic_cache = SemanticCacheService()
+        return self._semantic_cache
+
+    def _rag_input(
+        self,
+        user_message: str,
+        system_prompt: Optional[str],
+        k: int,
+        collection: str,
+        tags: Optional[List[str]],
+        url: Optional[str],
+        score_threshold: Optional[float],
+        mmr: bool
+    ) -> State:
+        return {
+            "question": user_message,
+            "system_prompt": system_prompt or Constants.RAG_PROMPT,
+            "k": k,
+            "collection": collection,
+            "tags": sorted(set(tags or [])),
+            "url": url,
+            "score_threshold": score_threshold,
+            "mmr": mmr
+        }
+
+    def lexical_match(
+        self,
+        question: str,
+        k: int = Constants.RAG_TOP_K,
+        collection: str = Constants.CHROMA_COLLECTION,
+        tags: Optional[List[str]] = None,
+        url: Optional[str] = None
+    ) -> Optional[List[Document]]:
+        """
+        Get the BM25 results for a question when they are confident enough to skip vector search.
+
+        Args:
+            question: The question to answer
+            k: Number of documents to retrieve
+            collection: Chroma collection to retrieve from
+            tags: Only retrieve from documents with any of these tags
+            url: Only retrieve from the document with this url
+
+        Returns:
+            The retrieved documents, or None if vector search is needed
+        """
+        if not Constants.HYBRID_SEARCH_ENABLED:
+            return None
+        from services.vector_db.hybrid_search_service import HybridSearchService
+
+        hits = self.get_lexical_index(collection).search(question, k=max(k, 2), tags=tags, url=url)
+        return HybridSearchService.lexical_match(question, hits, k)
 
     # Define application steps
     def retrieve(self, state: State) -> dict[str, List[Document]]:
-        chroma_service: ChromaService = ChromaService()
-        retrieved_docs: List[Document] = chroma_service.search(state["question"])
-        return {"context": retrieved_docs}
-
-    def generate(self, state: State) -> dict[str, str]:
-        prompt_template: ChatPromptTemplate = ChatPromptTemplate([
-            ("system", Constants.RAG_PROMPT),
-            ("user", Constants.RAG_USER_PROMPT)
-        ])
-        docs_content: str = "\n\n".join(doc.page_content for doc in state["context"])
-        messages = prompt_template.invoke({"question": state["question"], "context": docs_content})
+        if state.get("context"):
+            # Already retrieved by the lexical fast path
+            return {"context": state["context"]}
+
+        collection: str = state.get("collection") or Constants.CHROMA_COLLECTION
+        k: int = state.get("k") or Constants.RAG_TOP_K
+        filters: Dict[str, Any] = {"tags": state.get("tags"), "url": state.get("url")}
+        search_options: Dict[str, Any] = {
+            "score_threshold": state.get("score_threshold"),
+            "mmr": state.get("mmr", False),
+            **filters
+        }
+        chroma_service = self.get_chroma_service(collection)
+        if not Constants.HYBRID_SEARCH_ENABLED:
+            return {"context": chroma_service.search(state["question"], k=k, **search_options)}
+
+        from services.vector_db.hybrid_search_service import HybridSearchService
+
+        fetch_k: int = max(k, Constants.RAG_FETCH_K)
+        lexical_docs: List[Document] = [
+            document for document, _ in self.get_lexical_index(collection).search(state["question"], k=fetch_k, **filters)
+        ]
+        dense_docs: List[Document] = chroma_service.search(state["question"], k=fetch_k, **search_options)
+        return {"context": HybridSearchService.fuse([lexical_docs, dense_docs], k)}
+
+    def generate(self, state: State) -> dict[str, Any]:
+        messages = self._rag_messages(state)
         response: BaseMessage = self.invoke(messages)
-        return {"answer": response.content}
+        return {"answer": self.message_text(response.content)}
+
+    def _rag_messages(self, state: State) -> Any:
+        """Build the answer prompt from the retrieved context, recording the tokens of the context in context_tokens."""
+        from services.context.context_assembler_service import ContextAssemblerService
+
+        with Profiler.span("context:assemble", chunks=len(state["context"])) as span:
+            context = ContextAssemblerService.assemble(state["context"], Constants.CONTEXT_TOKEN_BUDGET)
+            if span is not None:
+                span.args.update(tokens=context.tokens, kept_chunks=context.chunks, sources=context.sources)
+        LlmClient.context_tokens.set(context.tokens)
+        messages = self._rag_prompt_template.invoke({
+            "system_prompt": state.get("system_prompt") or Constants.RAG_PROMPT,
+            "question": state["question"],
+            "context": context.text
+        })
+        return messages
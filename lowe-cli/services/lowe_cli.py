@@ -1,17 +1,49 @@
 """Simplified and modular LoweCli class."""
-from services.cli.cli_interface import CLIInterface
+from typing import List, Optional
 from services.commands.command_handlers import CommandHandlers
+from services.ui.ui_service import UIService
 
 
 class LoweCli:
     """Main CLI application class with simplified, modular design."""
     
     @staticmethod
-    def ask() -> None:
-        """Start the interactive CLI session."""
-        cli: CLIInterface = CLIInterface()
+    def ask(resume: Optional[str] = None) -> None:
+        """
+        Start the interactive CLI session.
+        
+        Args:
+            resume: Id of the session to resume, "" for the most recent one, None for a new session
+        """
+        # Imported here so one-shot commands don't pay for the chat graph
+        from services.cli.cli_interface import CLIInterface
+        from services.sessions.session_service import SessionService
+
+        session_id: Optional[str] = None
+        if resume is not None:
+            session_id = resume or SessionService.latest_session_id()
+            if session_id is None or not SessionService.exists(session_id):
+                UIService.print_error(f"No chat session to resume{f' with id {resume}' if resume else ''}")
+                return
+
+        cli: CLIInterface = CLIInterface(session_id)
         cli.run()
 
+    @staticmethod
+    def sessions() -> None:
+        """List the stored chat sessions, most recent first."""
+        import time
+        from rich.markup import escape
+        from services.sessions.session_service import SessionService
+
+        sessions = SessionService.list_sessions()
+        if not sessions:
+            UIService.print_info("No chat sessions")
+            return
+        for session in sessions:
+            updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(session.updated_at))
+            UIService.print_info(f"{session.session_id}  {updated}  {escape(session.title)}")
+
     @staticmethod
     def help(user_message: str) -> None:
         """Handle help command."""
@@ -23,11 +55,89 @@ class LoweCli:
         CommandHandlers.perform(user_message)
 
     @staticmethod
-    def lookup(user_message: str) -> None:
-        """Handle lookup command."""
-        CommandHandlers.lookup(user_message)
+    def lookup(user_message: str, tags: Optional[List[str]] = None) -> None:
+        """Handle lookup command, optionally restricted to documents with any of the tags."""
+        CommandHandlers.lookup(user_message, tags)
+
+    @staticmethod
+    def batch(path: str, output_path: Optional[str] = None, concurrency: Optional[int] = None) -> None:
+        """
+        Run the requests of a JSONL batch file concurrently, in this process.
+        
+        Args:
+            path: Path of the batch file, "-" for stdin
+            output_path: File the JSONL results are written to, stdout if None
+            concurrency: Maximum number of requests in flight, Constants.BATCH_CONCURRENCY if None
+        """
+        import sys
+        from services.batch.batch_service import BatchService
+        from utils.constants import Constants
+
+        concurrency = concurrency or Constants.BATCH_CONCURRENCY
+        try:
+            if output_path:
+                with open(output_path, "w", encoding="utf-8") as output:
+                    summary = BatchService.run_file(path, output, concurrency)
+            else:
+                summary = BatchService.run_file(path, sys.stdout, concurrency)
+        except OSError as e:
+            # A missing or unreadable batch file, or an output file that can't be written
+            UIService.print_error(f"{e.strerror}: {e.filename}" if e.filename else str(e))
+            return
+        # On stderr, so that stdout only holds the JSONL results
+        print(
+            f"Batch: {summary.total} requests, {summary.failed} failed in {summary.elapsed:.1f}s",
+            file=sys.stderr
+        )
+
+    @staticmethod
+    def warm_up_lookup(user_message: str) -> None:
+        """Start loading what a lookup needs, to overlap it with the index check."""
+        CommandHandlers.warm_up_lookup(user_message)
 
     @staticmethod
     def index() -> None:
         """Handle index command."""
-        CommandHandlers.index()
\ No newline at end of file
+        CommandHandlers.index()
+
+    @staticmethod
+    def reindex() -> None:
+        """Handle reindex command."""
+        CommandHandlers.reindex()
+
+    @staticmethod
+    def serve() -> None:
+        """Run the resident daemon that keeps models warm for other invocations."""
+        from services.daemon.daemon_client import DaemonClient
+
+        if not DaemonClient.is_supported():
+            UIService.print_error("The daemon needs Unix sockets, which this platform doesn't support")
+            return
+        from services.daemon.daemon_server import DaemonServer
+
+        DaemonServer().serve_forever()
+
+    @staticmethod
+    def disable_daemon() -> None:
+        """Execute commands in this process even when a daemon is running, e.g. to profile them."""
+        CommandHandlers._factory.use_daemon = False
+
+    @staticmethod
+    def disable_cache() -> None:
+        """Bypass the response cache for this invocation."""
+        from services.cache.response_cache_service import ResponseCacheService
+
+        ResponseCacheService.set_bypass(True)
+
+    @staticmethod
+    def cache_stats() -> None:
+        """Show the response cache hit/miss counters."""
+        from services.cache.response_cache_service import ResponseCacheService
+
+        stats = ResponseCacheService.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+        UIService.print_info(
+            f"Response cache: {stats['entries']} entries, {stats['hits']} hits, "
+            f"{stats['misses']} misses ({hit_rate:.1f}% hit rate)"
+        )
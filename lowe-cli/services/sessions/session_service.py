@@ -0,0 +1,221 @@
+"""Append-only JSONL store of chat sessions."""
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from utils.constants import Constants
+
+# A session record: {"type": "turn", "n": ..., "messages": [...]} or {"type": "summary", "turns": ..., "text": ...}
+Record = Dict[str, Any]
+
+READ_BLOCK_SIZE: int = 64 * 1024
+
+
+@dataclass
+class SessionInfo:
+    """A stored chat session, as listed by --sessions."""
+    session_id: str
+    updated_at: float
+    size: int
+    title: str
+
+
+@dataclass
+class SessionTail:
+    """What is needed to resume a session: its summary and the turns not folded into it."""
+    summary: str = ""
+    # Number of turns folded into the summary
+    summarized: int = 0
+    turns: List[Record] = field(default_factory=list)
+
+
+class SessionService:
+    """
+    Stores each chat session as a JSONL file of turn and summary records.
+
+    Records are only ever appended. Resuming reads the file backwards and
+    stops as soon as it has the latest summary and the turns after it.
+    """
+
+    _lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def new_session_id() -> str:
+        """Create a session id that sorts by creation time."""
+        return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+    @staticmethod
+    def session_path(session_id: str) -> str:
+        """Get the path of a session's file."""
+        if not session_id or os.path.basename(session_id) != session_id:
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(Constants.SESSIONS_DIR, f"{session_id}.jsonl")
+
+    @staticmethod
+    def exists(session_id: str) -> bool:
+        """Check if a session has been stored."""
+        return os.path.exists(SessionService.session_path(session_id))
+
+    @staticmethod
+    def append(session_id: str, record: Record) -> None:
+        """
+        Append a record to a session.
+
+        Args:
+            session_id: Id of the session
+            record: Turn or summary record
+        """
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with SessionService._lock:
+            os.makedirs(Constants.SESSIONS_DIR, exist_ok=True)
+            with open(SessionService.session_path(session_id), "a", encoding="utf-8") as f:
+                f.write(line)
+
+    @staticmethod
+    def load_tail(session_id: str, max_turns: int = Constants.CHAT_RESUME_MAX_TURNS) -> SessionTail:
+        """
+        Load what is needed to resume a session, reading the file from the end.
+
+        Args:
+            session_id: Id of the session
+            max_turns: Maximum number of unsummarized turns to load
+
+        Returns:
+            The latest summary and up to max_turns turns after it, oldest first
+        """
+        tail = SessionTail()
+        found_summary = False
+        for record in SessionService._reverse_records(SessionService.session_path(session_id)):
+            if record.get("type") == "summary":
+                if not found_summary:
+                    found_summary = True
+                    tail.summary = record.get("text", "")
+                    tail.summarized = record.get("turns", 0)
+            elif record.get("type") == "turn":
+                # Turns may be appended while a summary is generated, so
+                # unsummarized turns can precede the summary record
+                if found_summary and record.get("n", 0) < tail.summarized:
+                    break
+                tail.turns.append(record)
+                if len(tail.turns) >= max_turns:
+                    break
+        tail.turns.reverse()
+        if tail.turns:
+            # Turns beyond max_turns are dropped as if they had been summarized
+            tail.summarized = max(tail.summarized, tail.turns[0].get("n", 0))
+        return tail
+
+    @staticmethod
+    def latest_session_id() -> Optional[str]:
+        """Get the id of the most recently updated session, if any."""
+        sessions = SessionService.list_sessions()
+        return sessions[0].session_id if sessions else None
+
+    @staticmethod
+    def list_sessions() -> List[SessionInfo]:
+        """
+        List the stored sessions.
+
+        Returns:
+            Sessions, most recently updated first, titled by their first message
+        """
+        if not os.path.isdir(Constants.SESSIONS_DIR):
+            return []
+
+        sessions: List[SessionInfo] = []
+        for entry in os.scandir(Constants.SESSIONS_DIR):
+            if not entry.name.endswith(".jsonl"):
+                continue
+            stat = entry.stat()
+            sessions.append(SessionInfo(
+                session_id=entry.name[:-len(".jsonl")],
+                updated_at=stat.st_mtime,
+                size=stat.st_size,
+                title=SessionService._title(entry.path),
+            ))
+        sessions.sort(key=lambda session: session.updated_at, reverse=True)
+        return sessions
+
+    @staticmethod
+    def evict(
+        max_age_days: float = Constants.CHAT_SESSION_MAX_AGE_DAYS,
+        max_total_bytes: int = Constants.CHAT_SESSIONS_MAX_BYTES,
+        keep: Optional[str] = None
+    ) -> List[str]:
+        """
+        Delete sessions not updated for max_age_days, then the oldest ones until the store fits max_total_bytes.
+
+        Args:
+            max_age_days: Age after which a session is deleted
+            max_total_bytes: Maximum total size of the stored sessions
+            keep: Id of a session that must not be deleted, e.g. the current one
+
+        Returns:
+            Ids of the deleted sessions
+        """
+        now = time.time()
+        remaining = [session for session in SessionService.list_sessions() if session.session_id != keep]
+        total = sum(session.size for session in remaining)
+        if keep is not None and SessionService.exists(keep):
+            total += os.path.getsize(SessionService.session_path(keep))
+
+        deleted: List[str] = []
+        # Oldest first
+        for session in reversed(remaining):
+            if now - session.updated_at <= max_age_days * 24 * 60 * 60 and total <= max_total_bytes:
+                continue
+            try:
+                os.remove(SessionService.session_path(session.session_id))
+            except FileNotFoundError:
+                pass
+            total -= session.size
+            deleted.append(session.session_id)
+        return deleted
+
+    @staticmethod
+    def _title(path: str, max_length: int = 60) -> str:
+        """Get the first user message of a session, read from its first line."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get("type") == "turn" and record.get("messages"):
+                        title = " ".join(str(record["messages"][0].get("content", "")).split())
+                        return title if len(title) <= max_length else title[:max_length - 1] + "…"
+        except (OSError, ValueError):
+            pass
+        return ""
+
+    @staticmethod
+    def _reverse_records(path: str) -> Iterator[Record]:
+        """Read the records of a session file from the last to the first, one block at a time."""
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0:
+                size = min(READ_BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b"\n")
+                # The first line may continue in the previous block
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield SessionService._decode(line)
+            if remainder.strip():
+                yield SessionService._decode(remainder)
+
+    @staticmethod
+    def _decode(line: bytes) -> Record:
+        try:
+            return json.loads(line)
+        except ValueError:
+            # A line cut short by a crash is skipped
+            return {}
@@ -1,25 +1,110 @@
-from typing import List, Union
-from langchain_text_splitters import RecursiveJsonSplitter
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from utils.constants import Constants
 
-# Type alias for JSON data
-JsonData = Union[dict, list, str, int, float, bool, None]
+# Chroma metadata values must be scalars
+Metadata = Dict[str, Any]
 
 
 class SplitterService:
-    """Service to handle json splitting operations."""
+    """Service to handle knowledge base splitting operations."""
+
+    _splitters: Dict[Tuple[int, int], RecursiveCharacterTextSplitter] = {}
+
+    @staticmethod
+    def get_splitter(
+        chunk_size: int = Constants.CHUNK_SIZE,
+        chunk_overlap: int = Constants.CHUNK_OVERLAP
+    ) -> RecursiveCharacterTextSplitter:
+        """Get a text splitter for the given chunk size and overlap, creating it on first use."""
+        key = (chunk_size, chunk_overlap)
+        splitter: Optional[RecursiveCharacterTextSplitter] = SplitterService._splitters.get(key)
+        if splitter is None:
+            splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+            SplitterService._splitters[key] = splitter
+        return splitter
 
     @staticmethod
-    def split_json(json_data: JsonData) -> List[Document]:
+    def split_documents(
+        documents: Iterable[Any],
+        chunk_size: int = Constants.CHUNK_SIZE,
+        chunk_overlap: int = Constants.CHUNK_OVERLAP
+    ) -> Iterator[Document]:
         """
-        Split JSON data into smaller chunks using RecursiveJsonSplitter.
-        
+        Split knowledge base documents into chunks, one document at a time.
+
         Args:
-            json_data: The JSON data to split (can be dict, list, str, int, float, bool, or None)
-            
+            documents: Knowledge base documents, e.g. streamed from LoaderService.iter_documents
+            chunk_size: Maximum number of characters per chunk
+            chunk_overlap: Number of characters shared by consecutive chunks
+
+        Yields:
+            Chunks carrying the metadata of their source document
+        """
+        for document in documents:
+            yield from SplitterService.split_document(document, chunk_size, chunk_overlap)
+
+    @staticmethod
+    def split_document(
+        document: Any,
+        chunk_size: int = Constants.CHUNK_SIZE,
+        chunk_overlap: int = Constants.CHUNK_OVERLAP
+    ) -> Iterator[Document]:
+        """
+        Split the body of a knowledge base document into chunks.
+
+        Args:
+            document: Document with "title", "body", "url" and "meta.tags" keys;
+                documents without a body are split as JSON text
+            chunk_size: Maximum number of characters per chunk
+            chunk_overlap: Number of characters shared by consecutive chunks
+
+        Yields:
+            Chunks of the body with the document's title, url and tags as metadata
+        """
+        if isinstance(document, dict) and isinstance(document.get("body"), str):
+            text: str = document["body"]
+        else:
+            text = json.dumps(document, ensure_ascii=False)
+        metadata: Metadata = SplitterService.document_metadata(document)
+
+        for chunk in SplitterService.get_splitter(chunk_size, chunk_overlap).split_text(text):
+            yield Document(page_content=chunk, metadata=dict(metadata))
+
+    @staticmethod
+    def document_metadata(document: Any) -> Metadata:
+        """
+        Get the metadata that chunks of a document carry.
+
+        Tags are stored both as a comma-separated "tags" string and as one
+        "tag_<name>" flag per tag, since Chroma metadata can't hold lists.
+
+        Args:
+            document: Knowledge base document
+
         Returns:
-            List of Document objects containing the split data
+            Title, url and tags of the document, omitting missing values
         """
-        splitter: RecursiveJsonSplitter = RecursiveJsonSplitter(max_chunk_size=300)
-        docs: List[Document] = splitter.create_documents(texts=[json_data])
-        return docs
\ No newline at end of file
+        if not isinstance(document, dict):
+            return {}
+
+        metadata: Metadata = {}
+        for key in ("title", "url"):
+            if isinstance(document.get(key), str):
+                metadata[key] = document[key]
+
+        meta = document.get("meta")
+        tags: List[str] = meta.get("tags", []) if isinstance(meta, dict) else []
+        tags = [tag for tag in tags if isinstance(tag, str) and tag]
+        if tags:
+            metadata["tags"] = ",".join(tags)
+            for tag in tags:
+                metadata[SplitterService.tag_key(tag)] = True
+        return metadata
+
+    @staticmethod
+    def tag_key(tag: str) -> str:
+        """Get the metadata key flagging chunks with the given tag."""
+        return "tag_" + tag.strip().lower()
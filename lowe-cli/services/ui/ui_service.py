@@ -1,14 +1,21 @@
 """UI Service for handling common UI patterns and interactions."""
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
 from rich import print as rich_print
 from rich.console import Console
+from rich.live import Live
 from rich.markdown import Markdown
 from yaspin import yaspin
-from typing import Any, Callable
+from typing import Any, Callable, Iterable, Iterator, Optional
+from utils.profiler import Profiler
 
 
 class UIService:
     """Service for handling common UI operations."""
     
+    _status_listener: ContextVar[Optional[Callable[[str], None]]] = ContextVar("status_listener", default=None)
+    
     @staticmethod
     def print_error(message: str) -> None:
         """Print an error message in red."""
@@ -37,9 +44,75 @@ class UIService:
     @staticmethod
     def render_markdown(content: str) -> None:
         """Render markdown content to the console."""
+        with Profiler.span("ui:render_markdown", characters=len(content)):
+            console = Console()
+            md = Markdown(content)
+            console.print(md)
+    
+    @staticmethod
+    def render_output(content: str, style: str = "markdown") -> None:
+        """
+        Render command output in the given style.
+        
+        Args:
+            content: Output to render
+            style: "markdown" to render as markdown, "success" to print in green
+        """
+        if style == "success":
+            UIService.print_success(content)
+        else:
+            UIService.render_markdown(content)
+    
+    @staticmethod
+    def stream_output(chunks: Iterable[str], style: str = "markdown", text: str = "Thinking") -> str:
+        """
+        Render command output incrementally as chunks arrive.
+        
+        A spinner runs until the first chunk. On a terminal, markdown is
+        re-rendered live and "success" output is printed in green as it
+        streams; otherwise the raw text is written to stdout unchanged.
+        
+        Args:
+            chunks: Output text chunks, e.g. tokens streamed from the model
+            style: "markdown" or "success", see render_output
+            text: Spinner text shown while waiting for the first chunk
+            
+        Returns:
+            The full rendered content
+        """
         console = Console()
-        md = Markdown(content)
-        console.print(md)
+        iterator = iter(chunks)
+        with Profiler.span("ui:wait_first_chunk"):
+            if console.is_terminal:
+                with UIService.with_spinner(text) as spinner, UIService.status_listener(UIService._spinner_updater(spinner)):
+                    first: Optional[str] = next(iterator, None)
+                    spinner.ok("💡 ")
+            else:
+                first = next(iterator, None)
+        if first is None:
+            return ""
+
+        content: str = first
+        with Profiler.span("ui:stream_render"):
+            if not console.is_terminal:
+                sys.stdout.write(first)
+                for chunk in iterator:
+                    content += chunk
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                sys.stdout.write("\n")
+            elif style == "success":
+                console.print(first, style="green", end="", markup=False, highlight=False)
+                for chunk in iterator:
+                    content += chunk
+                    console.print(chunk, style="green", end="", markup=False, highlight=False)
+                console.print()
+            else:
+                with Live(Markdown(content), console=console, refresh_per_second=12, vertical_overflow="visible") as live:
+                    for chunk in iterator:
+                        content += chunk
+                        live.update(Markdown(content))
+        return content
     
     @staticmethod
     def with_spinner(text: str, color: str = "yellow") -> yaspin:
@@ -53,7 +126,40 @@ class UIService:
         color: str = "yellow"
     ) -> Any:
         """Execute a function with a spinner and return the result."""
-        with UIService.with_spinner(text, color) as spinner:
+        with UIService.with_spinner(text, color) as spinner, UIService.status_listener(UIService._spinner_updater(spinner)):
             result = func()
             spinner.ok("💡 ")
             return result
+    
+    @staticmethod
+    @contextmanager
+    def status_listener(listener: Callable[[str], None]) -> Iterator[None]:
+        """
+        Route status updates of the current context to a listener.
+        
+        Args:
+            listener: Called with the text of each update_status call
+        """
+        token = UIService._status_listener.set(listener)
+        try:
+            yield
+        finally:
+            UIService._status_listener.reset(token)
+    
+    @staticmethod
+    def update_status(text: str) -> None:
+        """
+        Report progress of a long-running operation, e.g. as the text of the running spinner.
+        
+        Args:
+            text: Status text, ignored when nothing is listening
+        """
+        listener = UIService._status_listener.get()
+        if listener is not None:
+            listener(text)
+    
+    @staticmethod
+    def _spinner_updater(spinner: yaspin) -> Callable[[str], None]:
+        def update(text: str) -> None:
+            spinner.text = text
+        return update
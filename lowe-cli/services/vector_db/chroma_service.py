@@ -1,34 +1,172 @@
-from typing import List
+import threading
+from typing import Any, Dict, List, Optional
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from services.huggingface.embedding_model_service import EmbeddingModelService
+from services.text_splitter.splitter_service import SplitterService
 from utils.constants import Constants
+from utils.profiler import Profiler
 
 
 class ChromaService:
     """Service to handle Chroma vector database operations."""
     
-    def __init__(self) -> None:
-        """Initialize the ChromaService with the specified embeddings model."""
-        self.embeddings: HuggingFaceEmbeddings = EmbeddingModelService.get_huggingface_embeddings()
-
-    def add(self, documents: List[Document]) -> None:
-        """Add documents to the Chroma vector store."""
-        vector_store: Chroma = self.__vector_store()
-        vector_store.add_documents(documents=documents)
-
-    def search(self, query: str, k: int = 5) -> List[Document]:
-        """Search for similar documents in the Chroma vector store."""
-        vector_store: Chroma = self.__vector_store()
-        retrieved_docs: List[Document] = vector_store.similarity_search(query)
+    # Chroma clients by persist directory, shared by the collections stored there
+    _clients: Dict[str, Any] = {}
+    _clients_lock: threading.Lock = threading.Lock()
+    
+    def __init__(self, collection_name: str = Constants.CHROMA_COLLECTION) -> None:
+        """
+        Initialize the ChromaService with the specified embeddings model.
+        
+        Args:
+            collection_name: Name of the Chroma collection to use
+        """
+        self.collection_name: str = collection_name
+        self.embeddings: Embeddings = EmbeddingModelService.get_cached_embeddings()
+        self._vector_store: Optional[Chroma] = None
+
+    def add(self, documents: List[Document], ids: Optional[List[str]] = None) -> None:
+        """Add documents to the Chroma vector store, optionally under the given ids."""
+        vector_store: Chroma = self.get_vector_store()
+        vector_store.add_documents(documents=documents, ids=ids)
+
+    def embed(self, documents: List[Document]) -> List[List[float]]:
+        """Embed the content of documents with the collection's embeddings model."""
+        with Profiler.span("embeddings:embed", documents=len(documents)):
+            return self.embeddings.embed_documents([document.page_content for document in documents])
+
+    def upsert(self, documents: List[Document], embeddings: List[List[float]], ids: List[str]) -> None:
+        """
+        Insert or update documents with precomputed embeddings, in batches of CHROMA_INSERT_BATCH_SIZE.
+
+        Args:
+            documents: Documents to store
+            embeddings: Embedding of each document, see embed
+            ids: Id of each document
+        """
+        collection = self.get_vector_store()._collection
+        batch_size: int = Constants.CHROMA_INSERT_BATCH_SIZE
+        with Profiler.span("chroma:upsert", documents=len(ids)):
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                collection.upsert(
+                    ids=ids[start:end],
+                    embeddings=embeddings[start:end],
+                    # Chroma rejects empty metadata dicts
+                    metadatas=[document.metadata or None for document in documents[start:end]],
+                    documents=[document.page_content for document in documents[start:end]],
+                )
+
+    def delete(self, ids: List[str]) -> None:
+        """Delete documents from the Chroma vector store by id."""
+        if ids:
+            with Profiler.span("chroma:delete", documents=len(ids)):
+                self.get_vector_store().delete(ids=ids)
+
+    def reset(self) -> None:
+        """Remove all documents from the collection."""
+        self.get_vector_store().reset_collection()
+
+    @staticmethod
+    def build_filter(tags: Optional[List[str]] = None, url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Build a Chroma metadata filter restricting search to chunks with any of the tags and the url.
+
+        Args:
+            tags: Tags of the documents to search, any of them matches
+            url: Url of the document to search
+
+        Returns:
+            A "where" filter, or None when there is nothing to filter on
+        """
+        conditions: List[Dict[str, Any]] = []
+        if tags:
+            tag_conditions = [{SplitterService.tag_key(tag): True} for tag in dict.fromkeys(tags)]
+            conditions.append(tag_conditions[0] if len(tag_conditions) == 1 else {"$or": tag_conditions})
+        if url:
+            conditions.append({"url": url})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def search(
+        self,
+        query: str,
+        k: int = Constants.RAG_TOP_K,
+        score_threshold: Optional[float] = None,
+        mmr: bool = False,
+        fetch_k: int = Constants.RAG_FETCH_K,
+        lambda_mult: float = Constants.RAG_MMR_LAMBDA,
+        tags: Optional[List[str]] = None,
+        url: Optional[str] = None
+    ) -> List[Document]:
+        """
+        Search for similar documents in the Chroma vector store.
+        
+        Tag and url filters are applied by Chroma before ranking, so results
+        only come from matching documents.
+        
+        Args:
+            query: Search query
+            k: Number of documents to return
+            score_threshold: Minimum relevance score in [0, 1], ignored with mmr
+            mmr: Diversify results with maximal marginal relevance
+            fetch_k: Number of candidates MMR selects from
+            lambda_mult: MMR trade-off, 1 for relevance only and 0 for diversity only
+            tags: Only search documents with any of these tags
+            url: Only search the document with this url
+            
+        Returns:
+            The most relevant documents, best first
+        """
+        vector_store: Chroma = self.get_vector_store()
+        where: Optional[Dict[str, Any]] = self.build_filter(tags, url)
+        with Profiler.span("chroma:search", k=k, mmr=mmr):
+            if mmr:
+                return vector_store.max_marginal_relevance_search(
+                    query, k=k, fetch_k=max(k, fetch_k), lambda_mult=lambda_mult, filter=where
+                )
+            if score_threshold is not None:
+                scored_docs = vector_store.similarity_search_with_relevance_scores(
+                    query, k=k, filter=where, score_threshold=score_threshold
+                )
+                return [document for document, _ in scored_docs]
+            retrieved_docs: List[Document] = vector_store.similarity_search(query, k=k, filter=where)
         return retrieved_docs
 
-    def __vector_store(self) -> Chroma:
-        """Get Chroma embeddings model."""
-        vector_store: Chroma = Chroma(
-            collection_name="cli_sage_collection",
-            embedding_function=self.embeddings,
-            persist_directory=Constants.CHROMA_DB_PATH,  # Where to save data locally
-        )
-        return vector_store
\ No newline at end of file
+    def get_vector_store(self) -> Chroma:
+        """Get the Chroma vector store, opening the persist directory on first use."""
+        if self._vector_store is None:
+            with Profiler.span("chroma:open", collection=self.collection_name):
+                self._vector_store = Chroma(
+                    collection_name=self.collection_name,
+                    embedding_function=self.embeddings,
+                    client=ChromaService.get_client(Constants.CHROMA_DB_PATH),  # Where to save data locally
+                )
+        return self._vector_store
+
+    @staticmethod
+    def get_client(persist_directory: str) -> Any:
+        """
+        Get the shared Chroma client of a persist directory, opening it on first use.
+
+        The client can be opened without the embeddings model, e.g. while it
+        is still loading. Opening creates the directory.
+
+        Args:
+            persist_directory: Directory the collections are stored in
+
+        Returns:
+            Persistent Chroma client
+        """
+        with ChromaService._clients_lock:
+            client = ChromaService._clients.get(persist_directory)
+            if client is None:
+                with Profiler.span("chroma:open_client", path=persist_directory):
+                    import chromadb
+
+                    client = chromadb.PersistentClient(path=persist_directory)
+                ChromaService._clients[persist_directory] = client
+        return client
\ No newline at end of file
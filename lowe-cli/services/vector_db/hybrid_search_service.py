@@ -0,0 +1,74 @@
+"""Fusion of lexical and vector search results."""
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from services.vector_db.index_manifest_service import IndexManifestService
+from services.vector_db.lexical_index_service import LexicalIndexService
+from utils.constants import Constants
+
+
+class HybridSearchService:
+    """Service to combine BM25 and vector rankings of knowledge-base chunks."""
+
+    @staticmethod
+    def document_id(document: Document) -> str:
+        """Get the chunk id of a retrieved document, derived from its content when the store didn't return it."""
+        return document.id or IndexManifestService.content_id({"text": document.page_content, "metadata": document.metadata})
+
+    @staticmethod
+    def fuse(rankings: List[List[Document]], k: int = Constants.RAG_TOP_K, rrf_k: int = Constants.RRF_K) -> List[Document]:
+        """
+        Merge rankings with reciprocal-rank fusion.
+
+        Each document scores the sum of 1 / (rrf_k + rank) over the rankings
+        it appears in, so documents ranked well by several retrievers win.
+
+        Args:
+            rankings: Documents ordered best first, one list per retriever
+            k: Number of documents to return
+            rrf_k: Damping constant, larger values flatten the rank differences
+
+        Returns:
+            The k best documents by fused score
+        """
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, document in enumerate(ranking, start=1):
+                doc_id = HybridSearchService.document_id(document)
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+                documents.setdefault(doc_id, document)
+        best = sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+        return [documents[doc_id] for doc_id in best]
+
+    @staticmethod
+    def lexical_match(
+        query: str,
+        hits: List[Tuple[Document, float]],
+        k: int = Constants.RAG_TOP_K,
+        min_ratio: float = Constants.LEXICAL_FAST_PATH_RATIO
+    ) -> Optional[List[Document]]:
+        """
+        Decide if BM25 results answer a query on their own.
+
+        That is the case for identifier-like queries whose best hit contains
+        every query term and scores clearly above the runner-up.
+
+        Args:
+            query: Search query
+            hits: BM25 results, best first, see LexicalIndexService.search
+            k: Number of documents to return
+            min_ratio: How many times the runner-up's score the best hit must reach
+
+        Returns:
+            The top k lexical results when the match is confident, None otherwise
+        """
+        if not hits or not LexicalIndexService.is_identifier_query(query):
+            return None
+
+        best, best_score = hits[0]
+        best_terms = set(LexicalIndexService.terms(best.metadata.get("title", "") + " " + best.page_content))
+        if not set(LexicalIndexService.terms(query)) <= best_terms:
+            return None
+        if len(hits) > 1 and best_score < min_ratio * hits[1][1]:
+            return None
+        return [document for document, _ in hits[:k]]
@@ -0,0 +1,154 @@
+"""Metadata describing the current state of the knowledge-base index."""
+import hashlib
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+from utils.constants import Constants
+
+
+# Manifest layout: document id -> ids of the chunks indexed for it
+Manifest = Dict[str, List[str]]
+
+
+class IndexManifestService:
+    """Service to read and write the knowledge-base index metadata."""
+
+    # Version reported for indexes built before versions were recorded
+    LEGACY_VERSION: str = "legacy"
+
+    @staticmethod
+    def content_id(content: Any) -> str:
+        """
+        Derive a deterministic id from JSON-serializable content.
+
+        Args:
+            content: Document or chunk content
+
+        Returns:
+            Hex sha256 digest of the canonical JSON encoding
+        """
+        canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def manifest_path() -> str:
+        """Get the path of the manifest of indexed documents and chunks."""
+        return os.path.join(Constants.CHROMA_DB_PATH, "manifest.json")
+
+    @staticmethod
+    def load_manifest() -> Optional[Manifest]:
+        """
+        Load the manifest of what is currently indexed.
+
+        Returns:
+            Chunk ids by document id, or None if the index has no manifest
+        """
+        try:
+            with open(IndexManifestService.manifest_path(), "r") as f:
+                return json.load(f)["documents"]
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def save_manifest(manifest: Manifest) -> None:
+        """
+        Save the manifest of what is currently indexed.
+
+        Args:
+            manifest: Chunk ids by document id
+        """
+        IndexManifestService._write(IndexManifestService.manifest_path(), json.dumps({"documents": manifest}))
+
+    @staticmethod
+    def manifest_version(manifest: Manifest) -> str:
+        """Get the index version matching a manifest, stable while its content doesn't change."""
+        chunk_ids = sorted(chunk_id for chunk_ids in manifest.values() for chunk_id in chunk_ids)
+        return IndexManifestService.content_id(chunk_ids)
+
+    @staticmethod
+    def version_path() -> str:
+        """Get the path of the file holding the index version."""
+        return os.path.join(Constants.CHROMA_DB_PATH, "index_version")
+
+    @staticmethod
+    def version() -> Optional[str]:
+        """
+        Get the version of the current index.
+
+        Returns:
+            Version string that changes whenever the index content changes,
+            or None if there is no index
+        """
+        try:
+            with open(IndexManifestService.version_path(), "r") as f:
+                return f.read().strip() or IndexManifestService.LEGACY_VERSION
+        except FileNotFoundError:
+            return IndexManifestService.LEGACY_VERSION if os.path.exists(Constants.CHROMA_DB_PATH) else None
+
+    @staticmethod
+    def bump_version(version: Optional[str] = None) -> str:
+        """
+        Record that the index content changed.
+
+        Args:
+            version: New version, a random one when omitted
+
+        Returns:
+            The recorded version
+        """
+        version = version or uuid.uuid4().hex
+        IndexManifestService._write(IndexManifestService.version_path(), version)
+        return version
+
+    @staticmethod
+    def embedding_model_path() -> str:
+        """Get the path of the file describing the embeddings model the index was built with."""
+        return os.path.join(Constants.CHROMA_DB_PATH, "embedding_model.json")
+
+    @staticmethod
+    def embedding_model() -> Optional[Dict[str, str]]:
+        """
+        Get the embeddings model the index was built with.
+
+        Returns:
+            The model's backend and name, see EmbeddingModelService.model_info,
+            or None for indexes built before the model was recorded
+        """
+        try:
+            with open(IndexManifestService.embedding_model_path(), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def save_embedding_model(model_info: Dict[str, str]) -> None:
+        """Record the embeddings model the index was built with."""
+        IndexManifestService._write(IndexManifestService.embedding_model_path(), json.dumps(model_info))
+
+    @staticmethod
+    def embedding_model_mismatch(current: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """
+        Check if the index can be searched with the configured embeddings model.
+
+        Args:
+            current: Model queries are embedded with, see EmbeddingModelService.model_info
+
+        Returns:
+            The model the index was built with if its vectors are incompatible, None otherwise
+        """
+        from services.huggingface.embedding_model_service import EmbeddingModelService
+
+        indexed = IndexManifestService.embedding_model()
+        if indexed is None or EmbeddingModelService.is_compatible(indexed, current):
+            return None
+        return indexed
+
+    @staticmethod
+    def _write(path: str, content: str) -> None:
+        """Atomically replace a file in the index directory."""
+        os.makedirs(Constants.CHROMA_DB_PATH, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
@@ -1,24 +1,179 @@
-from typing import Union, List
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 from langchain_core.documents import Document
+from services.cache.semantic_cache_service import SemanticCacheService
+from services.huggingface.embedding_model_service import EmbeddingModelService
 from services.text_splitter.splitter_service import SplitterService
 from services.vector_db.chroma_service import ChromaService
+from services.vector_db.index_manifest_service import IndexManifestService, Manifest
+from services.vector_db.lexical_index_service import LexicalIndexService
 from services.web_base_loader.loader_service import LoaderService
+from utils.constants import Constants
+from utils.profiler import Profiler
 
-# Type alias for JSON data (matching the text_splitter service)
-JsonData = Union[dict, list, str, int, float, bool, None]
+# An embedding batch: chunk ids, chunks and their embeddings
+EmbeddedBatch = Tuple[List[str], List[Document], List[List[float]]]
+
+
+@dataclass
+class IndexStats:
+    """Outcome of an indexing run."""
+    added: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.deleted)
+
+    def __str__(self) -> str:
+        return f"{self.added} chunks added, {self.deleted} removed, {self.unchanged} unchanged"
+
+
+@dataclass
+class IndexProgress:
+    """Live throughput of an indexing run."""
+    documents: int = 0
+    embedded: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.perf_counter() - self.started_at, 1e-9)
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.elapsed
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.embedded / self.elapsed
+
+    def __str__(self) -> str:
+        return (
+            f"{self.documents} docs ({self.documents_per_second:.1f}/s), "
+            f"{self.embedded} chunks embedded ({self.chunks_per_second:.1f}/s)"
+        )
 
 
 class IndexingService:
     """Service to handle indexing operations."""
 
     @staticmethod
-    def index_documents(urls: str) -> None:
+    @Profiler.timed("index:documents")
+    def index_documents(urls: str, progress: Optional[Callable[[IndexProgress], None]] = None) -> IndexStats:
         """
         Index documents from a web source.
         
+        Only chunks whose content changed since the last run are embedded:
+        documents and chunks get ids derived from their content, and the
+        manifest records which chunks are indexed for each document. The
+        index is rebuilt when it was embedded with an incompatible model.
+        
+        New chunks are embedded in batches of EMBEDDING_BATCH_SIZE by a pool
+        of EMBEDDING_WORKERS threads while documents keep streaming in, and
+        the results are upserted into Chroma as they complete. The model
+        already uses every core, so one worker is the default. The BM25
+        lexical index is kept in sync with the same chunk ids.
+        
         Args:
             urls: The URL to load documents from
+            progress: Called with the running throughput as documents are read and chunks embedded
+            
+        Returns:
+            Counts of added, deleted and unchanged chunks
         """
-        docs: JsonData = LoaderService.load(urls)
-        all_splits: List[Document] = SplitterService.split_json(docs)
-        ChromaService().add(all_splits)
\ No newline at end of file
+        chroma_service: ChromaService = ChromaService()
+        lexical_index: LexicalIndexService = LexicalIndexService(chroma_service.collection_name)
+        manifest = IndexManifestService.load_manifest()
+        embedding_model: Dict[str, str] = EmbeddingModelService.model_info()
+        if manifest is None or IndexManifestService.embedding_model_mismatch(embedding_model) is not None:
+            # Indexes built before the manifest existed have random chunk ids, and
+            # vectors of another embeddings model can't be searched with this one
+            chroma_service.reset()
+            lexical_index.reset()
+            manifest = {}
+        # Indexes built before the lexical index existed get it backfilled
+        backfill_lexical: bool = bool(manifest) and not lexical_index.exists()
+        lexical_ids: List[str] = []
+        lexical_batch: List[Document] = []
+
+        indexed_ids: Set[str] = {chunk_id for chunk_ids in manifest.values() for chunk_id in chunk_ids}
+        seen_ids: Set[str] = set()
+        new_manifest: Manifest = {}
+        stats = IndexStats()
+        report = IndexProgress()
+        batch_ids: List[str] = []
+        batch: List[Document] = []
+
+        def notify() -> None:
+            if progress is not None:
+                progress(report)
+
+        def embed(ids: List[str], documents: List[Document]) -> EmbeddedBatch:
+            return ids, documents, chroma_service.embed(documents)
+
+        if Constants.EMBEDDING_WORKERS > 1:
+            EmbeddingModelService.limit_threads(Constants.EMBEDDING_WORKERS)
+        with ThreadPoolExecutor(max_workers=Constants.EMBEDDING_WORKERS) as executor:
+            pending: Deque[Future] = deque()
+
+            def store(max_pending: int) -> None:
+                # Bounds the chunks held in memory to a few batches per worker
+                while len(pending) > max_pending:
+                    ids, documents, embeddings = pending.popleft().result()
+                    chroma_service.upsert(documents, embeddings, ids)
+                    lexical_index.add(documents, ids)
+                    report.embedded += len(ids)
+                    notify()
+
+            for document in LoaderService.iter_documents(urls):
+                doc_id: str = IndexManifestService.content_id(document)
+                chunk_ids: List[str] = []
+                for chunk in SplitterService.split_document(document):
+                    # Chunks keep their id when other parts of their document change
+                    chunk_id = IndexManifestService.content_id({"text": chunk.page_content, "metadata": chunk.metadata})
+                    chunk_ids.append(chunk_id)
+                    if chunk_id in seen_ids:
+                        continue
+                    seen_ids.add(chunk_id)
+                    if chunk_id in indexed_ids:
+                        stats.unchanged += 1
+                        if backfill_lexical:
+                            lexical_ids.append(chunk_id)
+                            lexical_batch.append(chunk)
+                            if len(lexical_batch) >= Constants.EMBEDDING_BATCH_SIZE:
+                                lexical_index.add(lexical_batch, lexical_ids)
+                                lexical_ids, lexical_batch = [], []
+                        continue
+
+                    stats.added += 1
+                    batch_ids.append(chunk_id)
+                    batch.append(chunk)
+                    if len(batch) >= Constants.EMBEDDING_BATCH_SIZE:
+                        pending.append(executor.submit(embed, batch_ids, batch))
+                        batch_ids, batch = [], []
+                        store(2 * Constants.EMBEDDING_WORKERS)
+                new_manifest[doc_id] = list(dict.fromkeys(chunk_ids))
+                report.documents += 1
+                notify()
+
+            if batch:
+                pending.append(executor.submit(embed, batch_ids, batch))
+            store(0)
+            lexical_index.add(lexical_batch, lexical_ids)
+
+        deleted_ids: List[str] = sorted(indexed_ids - seen_ids)
+        stats.deleted = len(deleted_ids)
+        chroma_service.delete(deleted_ids)
+        lexical_index.delete(deleted_ids)
+        IndexManifestService.save_manifest(new_manifest)
+        IndexManifestService.save_embedding_model(embedding_model)
+        if stats.changed or IndexManifestService.version() == IndexManifestService.LEGACY_VERSION:
+            IndexManifestService.bump_version(IndexManifestService.manifest_version(new_manifest))
+            # Cached answers were generated from the previous index content
+            SemanticCacheService().clear()
+        return stats
@@ -0,0 +1,158 @@
+"""Persisted BM25 index of the knowledge-base chunks."""
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, List, Optional, Tuple
+from langchain_core.documents import Document
+from services.text_splitter.splitter_service import SplitterService
+from utils.constants import Constants
+from utils.profiler import Profiler
+
+# Identifier characters kept inside tokens, so that e.g. MAX_CONNECTIONS stays one term
+TOKEN_PATTERN = re.compile(r"\w+")
+# Words shaped like a command name, config key, flag, version or error code: punctuation
+# inside a word (snake_case, a.b, a/b, 3.11), a leading dash (--flag), letters next to
+# digits (E0382, utf8) or camelCase. A bare number such as "3" or "10" is not one.
+IDENTIFIER_PATTERN = re.compile(r"\w[_.:/-]+\w|^--?[A-Za-z]|[A-Za-z]\d|\d[A-Za-z]|[a-z][A-Z]")
+
+
+class LexicalIndexService:
+    """
+    SQLite FTS5 index ranking chunks with BM25.
+
+    It is built next to the Chroma collection at index time and holds the
+    same chunk ids, so it can be queried without loading the embedding model.
+    """
+
+    TITLE_WEIGHT: float = 2.0
+    CONTENT_WEIGHT: float = 1.0
+
+    def __init__(self, collection_name: str = Constants.CHROMA_COLLECTION) -> None:
+        """
+        Initialize the lexical index of a collection.
+
+        Args:
+            collection_name: Name of the Chroma collection the index mirrors
+        """
+        self.collection_name: str = collection_name
+        self.db_path: str = os.path.join(Constants.CHROMA_DB_PATH, f"lexical_{collection_name}.sqlite3")
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def terms(query: str) -> List[str]:
+        """Get the lowercased search terms of a query, as the index tokenizes them."""
+        return list(dict.fromkeys(term.lower() for term in TOKEN_PATTERN.findall(query)))
+
+    @staticmethod
+    def is_identifier_query(query: str, max_terms: int = 3) -> bool:
+        """
+        Check if a query looks like an exact identifier rather than a natural language question.
+
+        Args:
+            query: Search query
+            max_terms: Longest query, in terms, still considered an identifier
+
+        Returns:
+            True for short queries with a word shaped like an identifier, see IDENTIFIER_PATTERN
+        """
+        words = query.split()
+        return 0 < len(words) <= max_terms and any(IDENTIFIER_PATTERN.search(word) for word in words)
+
+    def exists(self) -> bool:
+        """Check if the index has been built."""
+        return os.path.exists(self.db_path)
+
+    def add(self, documents: List[Document], ids: List[str]) -> None:
+        """Add chunks to the index under the given ids, replacing chunks with the same id."""
+        if not ids:
+            return
+        with self._lock, Profiler.span("lexical:add", documents=len(ids)):
+            connection = self._get_connection()
+            connection.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            connection.executemany(
+                "INSERT INTO chunks (chunk_id, title, content, metadata) VALUES (?, ?, ?, ?)",
+                [
+                    (chunk_id, document.metadata.get("title", ""), document.page_content, json.dumps(document.metadata))
+                    for chunk_id, document in zip(ids, documents)
+                ]
+            )
+            connection.commit()
+
+    def delete(self, ids: List[str]) -> None:
+        """Delete chunks from the index by id."""
+        if not ids or not self.exists():
+            return
+        with self._lock:
+            connection = self._get_connection()
+            connection.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            connection.commit()
+
+    def reset(self) -> None:
+        """Remove all chunks from the index."""
+        with self._lock:
+            connection = self._get_connection()
+            connection.execute("DELETE FROM chunks")
+            connection.commit()
+
+    def search(
+        self,
+        query: str,
+        k: int = Constants.RAG_TOP_K,
+        tags: Optional[List[str]] = None,
+        url: Optional[str] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Rank chunks containing any of the query terms with BM25.
+
+        Args:
+            query: Search query
+            k: Maximum number of chunks to return
+            tags: Only search chunks of documents with any of these tags
+            url: Only search chunks of the document with this url
+
+        Returns:
+            Chunks with their BM25 score, higher is better, best first.
+            Empty if the index hasn't been built.
+        """
+        terms = self.terms(query)
+        if not terms or not self.exists():
+            return []
+
+        match = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        conditions: List[str] = ["chunks MATCH ?"]
+        params: List[Any] = [self.TITLE_WEIGHT, self.CONTENT_WEIGHT, match]
+        if tags:
+            tag_keys = list(dict.fromkeys(SplitterService.tag_key(tag) for tag in tags))
+            conditions.append("(" + " OR ".join("json_extract(metadata, ?) = 1" for _ in tag_keys) + ")")
+            params.extend('$."' + key.replace('"', '') + '"' for key in tag_keys)
+        if url:
+            conditions.append("json_extract(metadata, '$.url') = ?")
+            params.append(url)
+        params.append(k)
+
+        with self._lock, Profiler.span("lexical:search", k=k):
+            rows = self._get_connection().execute(
+                "SELECT chunk_id, content, metadata, -bm25(chunks, 0, ?, ?, 0) AS score "
+                f"FROM chunks WHERE {' AND '.join(conditions)} ORDER BY score DESC LIMIT ?",
+                params
+            ).fetchall()
+        return [
+            (Document(page_content=content, metadata=json.loads(metadata), id=chunk_id), score)
+            for chunk_id, content, metadata, score in rows
+        ]
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Open the index database on first use. Callers must hold the lock."""
+        if self._connection is None:
+            os.makedirs(Constants.CHROMA_DB_PATH, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+                "chunk_id UNINDEXED, title, content, metadata UNINDEXED, tokenize = \"unicode61 tokenchars '_'\")"
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
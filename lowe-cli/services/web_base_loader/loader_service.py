@@ -1,23 +1,252 @@
-from typing import Union
+"""Knowledge-base loader with pooled, conditional, compressed and streaming fetches."""
+import codecs
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+from utils.constants import Constants
 
 # Type alias for JSON data
 JsonData = Union[dict, list, str, int, float, bool, None]
 
+CHUNK_SIZE: int = 64 * 1024
+
+
+class _JsonStream:
+    """Incremental reader that decodes JSON values from a stream of byte chunks."""
+
+    WHITESPACE: str = " \t\n\r"
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._decoder: json.JSONDecoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer: str = ""
+        self._pos: int = 0
+        self._eof: bool = False
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """
+        Read chunks until the buffer holds at least min_size unconsumed characters, or at least one more chunk.
+
+        Consumed input is trimmed from the buffer, which is rebuilt once per call.
+
+        Returns:
+            False if the stream had already ended
+        """
+        if self._eof:
+            return False
+        parts = [self._buffer[self._pos:]]
+        size = len(parts[0])
+        while True:
+            try:
+                text = self._utf8.decode(next(self._chunks))
+            except StopIteration:
+                text = self._utf8.decode(b"", final=True)
+                self._eof = True
+            parts.append(text)
+            size += len(text)
+            if size >= min_size or self._eof:
+                break
+        self._buffer = "".join(parts)
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Get the next non-whitespace character without consuming it, "" at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self.WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Consume the next non-whitespace character, which must be the given one."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}, found {found!r}")
+        self._pos += 1
+
+    def decode_value(self) -> Any:
+        """
+        Decode the next complete JSON value.
+
+        A value spanning many chunks is only decoded again once the buffered
+        input has doubled, so decoding stays linear in its size.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill(2 * (len(self._buffer) - self._pos))
+
+    def drain(self) -> None:
+        """Consume the rest of the stream, letting the chunk source run to completion."""
+        while not self._eof:
+            self._buffer, self._pos = "", 0
+            self._fill()
+
+    def iter_array(self) -> Iterator[Any]:
+        """Decode the items of the next JSON array one at a time."""
+        self.expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.peek() == ",":
+                self._pos += 1
+            else:
+                self.expect("]")
+                return
+
 
 class LoaderService:
     """Service to handle web base loader operations."""
 
+    _session: Optional[requests.Session] = None
+
+    @staticmethod
+    def get_session() -> requests.Session:
+        """Get the pooled HTTP session, creating it on first use."""
+        if LoaderService._session is None:
+            session = requests.Session()
+            retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+            session.mount("http://", HTTPAdapter(max_retries=retries))
+            session.mount("https://", HTTPAdapter(max_retries=retries))
+            # Advertises gzip/deflate, plus brotli/zstd when their decoders are installed
+            session.headers.update(make_headers(accept_encoding=True))
+            LoaderService._session = session
+        return LoaderService._session
+
     @staticmethod
     def load(web_path: str) -> JsonData:
         """
         Load documents from the specified web path.
-        
+
         Args:
             web_path: The URL path to load JSON data from
-            
+
         Returns:
             JSON data from the web response
         """
-        r: requests.Response = requests.get(web_path)
-        return r.json()
\ No newline at end of file
+        return json.loads(b"".join(LoaderService.fetch(web_path)))
+
+    @staticmethod
+    def iter_documents(web_path: str) -> Iterator[Any]:
+        """
+        Stream documents one at a time from the specified web path.
+
+        The body is decoded incrementally, so memory is bounded by the largest
+        document rather than the whole knowledge base.
+
+        Args:
+            web_path: The URL path to load JSON data from, either
+                {"documents": [...]} or a list of documents
+
+        Yields:
+            The documents of the knowledge base
+        """
+        chunks = LoaderService.fetch(web_path)
+        stream = _JsonStream(chunks)
+        try:
+            first = stream.peek()
+            if first == "[":
+                yield from stream.iter_array()
+            elif first != "{":
+                yield stream.decode_value()
+            else:
+                stream.expect("{")
+                while stream.peek() != "}":
+                    key = stream.decode_value()
+                    stream.expect(":")
+                    if key == "documents" and stream.peek() == "[":
+                        yield from stream.iter_array()
+                    else:
+                        stream.decode_value()
+                    if stream.peek() == ",":
+                        stream.expect(",")
+            # Let fetch finish so that the payload gets cached for revalidation
+            stream.drain()
+        finally:
+            # Releases the connection and the partial download when the consumer stops early
+            chunks.close()
+
+    @staticmethod
+    def fetch(web_path: str) -> Iterator[bytes]:
+        """
+        Fetch the body of the specified web path in chunks.
+
+        The last payload is cached locally along with its ETag/Last-Modified
+        validators; when the server answers 304 Not Modified it is served from
+        that cache.
+
+        Args:
+            web_path: The URL path to fetch
+
+        Yields:
+            Decompressed chunks of the response body
+        """
+        cache_path = os.path.join(Constants.KNOWLEDGE_BASE_CACHE_DIR, hashlib.sha256(web_path.encode("utf-8")).hexdigest())
+        validators: Dict[str, str] = LoaderService._read_validators(cache_path)
+        headers: Dict[str, str] = {}
+        if "etag" in validators:
+            headers["If-None-Match"] = validators["etag"]
+        if "last_modified" in validators:
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        timeout = (Constants.HTTP_CONNECT_TIMEOUT, Constants.HTTP_READ_TIMEOUT)
+        with LoaderService.get_session().get(web_path, headers=headers, timeout=timeout, stream=True) as r:
+            if r.status_code == requests.codes.not_modified:
+                with open(cache_path + ".json", "rb") as f:
+                    yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+                return
+            r.raise_for_status()
+
+            new_validators: Dict[str, str] = {}
+            if r.headers.get("ETag"):
+                new_validators["etag"] = r.headers["ETag"]
+            if r.headers.get("Last-Modified"):
+                new_validators["last_modified"] = r.headers["Last-Modified"]
+            if not new_validators:
+                yield from r.iter_content(CHUNK_SIZE)
+                return
+
+            # Tee the body into the cache, publishing it only once fully received
+            os.makedirs(Constants.KNOWLEDGE_BASE_CACHE_DIR, exist_ok=True)
+            tmp_path = cache_path + ".json.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        yield chunk
+                os.replace(tmp_path, cache_path + ".json")
+            finally:
+                # Left behind when the download fails or the consumer stops early
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            with open(cache_path + ".meta.json", "w") as f:
+                json.dump(new_validators, f)
+
+    @staticmethod
+    def _read_validators(cache_path: str) -> Dict[str, str]:
+        """Read the validators of the cached payload, empty if there is no usable cache."""
+        if not os.path.exists(cache_path + ".json"):
+            return {}
+        try:
+            with open(cache_path + ".meta.json", "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
@@ -1,4 +1,6 @@
 import os
+import tempfile
+from typing import Optional
 
 
 class Constants:
@@ -6,11 +8,72 @@ class Constants:
     MODEL_PROVIDER: str = os.getenv("MODEL_PROVIDER") or "google_genai"
     KNOWLEDGE_BASE: str = os.getenv("KNOWLEDGE_BASE_URL") or "http://localhost:4000/"
     CHROMA_DB_PATH: str = os.getenv("CHROMA_DB_PATH") or "./chroma_langchain_db"
+    CHROMA_COLLECTION: str = os.getenv("CHROMA_COLLECTION") or "cli_sage_collection"
+    CHUNK_SIZE: int = int(os.getenv("CHUNK_SIZE") or 1000)
+    CHUNK_OVERLAP: int = int(os.getenv("CHUNK_OVERLAP") or 100)
+    RAG_TOP_K: int = int(os.getenv("RAG_TOP_K") or 4)
+    RAG_FETCH_K: int = int(os.getenv("RAG_FETCH_K") or 20)
+    RAG_SCORE_THRESHOLD: Optional[float] = float(os.environ["RAG_SCORE_THRESHOLD"]) if os.getenv("RAG_SCORE_THRESHOLD") else None
+    RAG_MMR: bool = (os.getenv("RAG_MMR") or "false").lower() in ("1", "true", "yes")
+    RAG_MMR_LAMBDA: float = float(os.getenv("RAG_MMR_LAMBDA") or 0.5)
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET") or 1500)
+    CHARS_PER_TOKEN: float = float(os.getenv("CHARS_PER_TOKEN") or 4)
+    HYBRID_SEARCH_ENABLED: bool = (os.getenv("HYBRID_SEARCH_ENABLED") or "true").lower() in ("1", "true", "yes")
+    RRF_K: int = int(os.getenv("RRF_K") or 60)
+    LEXICAL_FAST_PATH_RATIO: float = float(os.getenv("LEXICAL_FAST_PATH_RATIO") or 1.5)
+    EMBEDDING_BACKEND: str = os.getenv("EMBEDDING_BACKEND") or "huggingface"
+    EMBEDDING_MODEL_NAME: str = os.getenv("EMBEDDING_MODEL_NAME") or "sentence-transformers/all-mpnet-base-v2"
+    EMBEDDING_ONNX_FILE: Optional[str] = os.getenv("EMBEDDING_ONNX_FILE") or None
+    EMBEDDING_DEVICE: str = os.getenv("EMBEDDING_DEVICE") or "auto"
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE") or 64)
+    EMBEDDING_WORKERS: int = int(os.getenv("EMBEDDING_WORKERS") or 1)
+    EMBEDDING_CACHE_ENABLED: bool = (os.getenv("EMBEDDING_CACHE_ENABLED") or "true").lower() in ("1", "true", "yes")
+    EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB") or 512)
+    EMBEDDING_CACHE_QUERY_LRU: int = int(os.getenv("EMBEDDING_CACHE_QUERY_LRU") or 256)
+    CHROMA_INSERT_BATCH_SIZE: int = int(os.getenv("CHROMA_INSERT_BATCH_SIZE") or 1000)
+    CACHE_DIR: str = os.getenv("CACHE_DIR") or os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "lowe-cli"
+    )
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR") or os.path.join(CACHE_DIR, "embeddings")
+    KNOWLEDGE_BASE_CACHE_DIR: str = os.getenv("KNOWLEDGE_BASE_CACHE_DIR") or os.path.join(CACHE_DIR, "knowledge_base")
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT") or 5)
+    HTTP_READ_TIMEOUT: float = float(os.getenv("HTTP_READ_TIMEOUT") or 60)
+    RESPONSE_CACHE_ENABLED: bool = (os.getenv("RESPONSE_CACHE_ENABLED") or "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_TTL: int = int(os.getenv("RESPONSE_CACHE_TTL") or 7 * 24 * 60 * 60)
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES") or 1000)
+    SEMANTIC_CACHE_ENABLED: bool = (os.getenv("SEMANTIC_CACHE_ENABLED") or "true").lower() in ("1", "true", "yes")
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD") or 0.92)
+    SEMANTIC_CACHE_COLLECTION: str = os.getenv("SEMANTIC_CACHE_COLLECTION") or "lowe_semantic_cache"
+    SEMANTIC_CACHE_TTL: int = int(os.getenv("SEMANTIC_CACHE_TTL") or 7 * 24 * 60 * 60)
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES") or 1000)
+    HISTORY_MAX_ENTRIES: int = int(os.getenv("HISTORY_MAX_ENTRIES") or 100)
+    PERFORM_HISTORY_TOP_K: int = int(os.getenv("PERFORM_HISTORY_TOP_K") or 10)
+    HISTORY_RECENCY_HALF_LIFE: float = float(os.getenv("HISTORY_RECENCY_HALF_LIFE") or 1000)
+    CHAT_HISTORY_TURNS: int = int(os.getenv("CHAT_HISTORY_TURNS") or 6)
+    CHAT_HISTORY_TOKEN_BUDGET: int = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET") or 2000)
+    SESSIONS_DIR: str = os.getenv("SESSIONS_DIR") or os.path.join(
+        os.getenv("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "lowe-cli", "sessions"
+    )
+    CHAT_RESUME_MAX_TURNS: int = int(os.getenv("CHAT_RESUME_MAX_TURNS") or 50)
+    CHAT_SESSION_MAX_AGE_DAYS: float = float(os.getenv("CHAT_SESSION_MAX_AGE_DAYS") or 30)
+    CHAT_SESSIONS_MAX_BYTES: int = int(os.getenv("CHAT_SESSIONS_MAX_BYTES") or 50 * 1024 * 1024)
+    CHAT_SESSIONS_IN_MEMORY: int = int(os.getenv("CHAT_SESSIONS_IN_MEMORY") or 8)
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY") or 8)
+    BATCH_REQUESTS_PER_SECOND: float = float(os.getenv("BATCH_REQUESTS_PER_SECOND") or 4)
+    DAEMON_SOCKET_PATH: str = os.getenv("DAEMON_SOCKET_PATH") or os.path.join(
+        os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"lowe-cli-{os.getuid()}.sock" if hasattr(os, "getuid") else "lowe-cli.sock"
+    )
+    DAEMON_READ_TIMEOUT: float = float(os.getenv("DAEMON_READ_TIMEOUT") or 60)
 
     ASK_SYSTEM_PROMPT: str = """
     You are a CLI assistant named LoweCLI. Provide clear and concise solutions for the error messages passed as chat.
     Always respond in markdown formatted text, that will be displayed in a terminal. Drop all pleasantries, be concise.
     """
+    CHAT_SUMMARY_PROMPT: str = """
+    You maintain a running summary of a conversation between a developer and LoweCLI, a CLI assistant.
+    Update the current summary with the new conversation turns. Keep error messages, commands, file names, versions and decisions verbatim.
+    Drop pleasantries and anything superseded. Respond with the updated summary only, in at most 200 words.
+    """
     HELP_SYSTEM_PROMPT: str = """
     You are a CLI assistant named LoweCLI. Provide clear and concise explanations for the query passed and if possible a code snippet to explain the concept.
     Don't answer if the query is not related to programming.
@@ -30,6 +93,8 @@ class Constants:
     """
     LOOKUP_SYSTEM_PROMPT: str = """
     You are a CLI assistant named LoweCLI. Provide information to the user based on the context passed.
+    If you don't know the answer, just say that you don't know. Drop all pleasantries, be concise.
+    Cite the matched documents when answering the question. Refer to the documents by their "title" and "url" attributes.
     """
     RAG_PROMPT: str = """
     You are a CLI assistant named LoweCLI. If you don't know the answer, just say that you don't know. Drop all pleasantries, be concise.
@@ -0,0 +1,249 @@
+"""Lightweight span timers for --profile, with a per-stage report and Chrome trace export."""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Returned by Profiler.span while profiling is off, so that disabled spans cost one flag check
+_DISABLED_SPAN: ContextManager[None] = nullcontext()
+
+
+@dataclass
+class SpanRecord:
+    """A finished span."""
+    name: str
+    start: float
+    end: float
+    depth: int
+    thread_id: int
+    args: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class StageSummary:
+    """Spans of one stage at one nesting depth, aggregated for the report."""
+    name: str
+    depth: int
+    first_start: float
+    calls: int = 0
+    total: float = 0.0
+
+
+class _Span:
+    """Span measured while profiling is on."""
+
+    __slots__ = ("name", "args", "start", "depth", "_token")
+
+    def __init__(self, name: str, args: Dict[str, Any]) -> None:
+        self.name: str = name
+        self.args: Dict[str, Any] = args
+        self.start: float = 0.0
+        self.depth: int = 0
+        self._token: Any = None
+
+    def __enter__(self) -> "_Span":
+        self.depth = Profiler._depth.get()
+        self._token = Profiler._depth.set(self.depth + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        end = time.perf_counter()
+        try:
+            Profiler._depth.reset(self._token)
+        except ValueError:
+            # Exited in another context, e.g. a generator resumed elsewhere
+            Profiler._depth.set(self.depth)
+        Profiler.record(self.name, self.start, end, self.depth, self.args)
+
+
+class Profiler:
+    """
+    Process-wide span recorder.
+
+    Spans are only recorded after enable() is called; until then span() and
+    timed() return immediately, so instrumentation can stay in hot paths.
+    """
+
+    _enabled: bool = False
+    _origin: float = time.perf_counter()
+    _spans: List[SpanRecord] = []
+    _lock: threading.Lock = threading.Lock()
+    _depth: ContextVar[int] = ContextVar("profiler_depth", default=0)
+
+    @staticmethod
+    def enable() -> None:
+        """Start recording spans."""
+        Profiler._enabled = True
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """Check if spans are being recorded."""
+        return Profiler._enabled
+
+    @staticmethod
+    def span(name: str, **args: Any) -> ContextManager[Any]:
+        """
+        Time a block of code as a stage.
+
+        Args:
+            name: Stage name, e.g. "chroma:search"
+            args: Details shown in the trace, e.g. the number of documents
+
+        Returns:
+            Context manager timing the block
+        """
+        if not Profiler._enabled:
+            return _DISABLED_SPAN
+        return _Span(name, args)
+
+    @staticmethod
+    def timed(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+        """Decorate a function so that each call is timed as a stage."""
+        def decorator(function: Callable[..., T]) -> Callable[..., T]:
+            @functools.wraps(function)
+            def wrapper(*args: Any, **kwargs: Any) -> T:
+                if not Profiler._enabled:
+                    return function(*args, **kwargs)
+                with _Span(name, {}):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def stream(name: str, items: Iterable[T]) -> Iterator[T]:
+        """
+        Time the consumption of a stream, e.g. model tokens, as a stage.
+
+        The span lasts from the first request for an item until the stream is
+        exhausted, so it includes the time the consumer spends between items.
+        The time to the first item is recorded in the span's details.
+
+        Args:
+            name: Stage name
+            items: Stream to time
+
+        Yields:
+            The items of the stream
+        """
+        if not Profiler._enabled:
+            yield from items
+            return
+        depth = Profiler._depth.get()
+        start = time.perf_counter()
+        first_item: Optional[float] = None
+        count = 0
+        try:
+            for item in items:
+                if first_item is None:
+                    first_item = time.perf_counter()
+                count += 1
+                yield item
+        finally:
+            end = time.perf_counter()
+            Profiler.record(name, start, end, depth, {
+                "items": count,
+                "first_item_ms": round(((first_item or end) - start) * 1000, 3),
+            })
+
+    @staticmethod
+    def record(name: str, start: float, end: float, depth: int = 0, args: Optional[Dict[str, Any]] = None) -> None:
+        """Record a span measured with time.perf_counter."""
+        span = SpanRecord(name, start, end, depth, threading.get_ident(), dict(args or {}))
+        with Profiler._lock:
+            Profiler._spans.append(span)
+
+    @staticmethod
+    def spans() -> List[SpanRecord]:
+        """Get the recorded spans, in the order they started."""
+        with Profiler._lock:
+            return sorted(Profiler._spans, key=lambda span: span.start)
+
+    @staticmethod
+    def summary() -> List[StageSummary]:
+        """
+        Aggregate the recorded spans per stage and nesting depth.
+
+        Returns:
+            Stages in the order they first started
+        """
+        stages: Dict[Tuple[str, int], StageSummary] = {}
+        for span in Profiler.spans():
+            stage = stages.setdefault((span.name, span.depth), StageSummary(span.name, span.depth, span.start))
+            stage.calls += 1
+            stage.total += span.duration
+        return list(stages.values())
+
+    @staticmethod
+    def report() -> str:
+        """
+        Format the per-stage breakdown of the run.
+
+        Returns:
+            A table of the stages, nested stages indented under their parent,
+            with their number of calls, total time and share of the wall time
+        """
+        wall = time.perf_counter() - Profiler._origin
+        stages = Profiler.summary()
+        names = ["  " * stage.depth + stage.name for stage in stages]
+        width = max([len("stage"), *map(len, names)])
+        lines: List[str] = [
+            f"Profile: {wall * 1000:.1f} ms since startup",
+            f"  {'stage':<{width}} {'calls':>5} {'total ms':>10} {'%':>6}",
+        ]
+        for name, stage in zip(names, stages):
+            share = stage.total / wall * 100 if wall else 0.0
+            lines.append(f"  {name:<{width}} {stage.calls:>5} {stage.total * 1000:>10.1f} {share:>5.1f}%")
+        return "\n".join(lines)
+
+    @staticmethod
+    def print_report(trace_path: Optional[str] = None) -> None:
+        """
+        Print the per-stage breakdown to stderr, keeping it apart from the command output.
+
+        Args:
+            trace_path: Also write the spans as a Chrome trace to this path
+        """
+        print(Profiler.report(), file=sys.stderr)
+        if trace_path:
+            Profiler.write_trace(trace_path)
+            print(f"Trace written to {trace_path}", file=sys.stderr)
+
+    @staticmethod
+    def write_trace(path: str) -> None:
+        """
+        Write the recorded spans as Chrome trace-event JSON.
+
+        The file can be opened in chrome://tracing or https://ui.perfetto.dev.
+
+        Args:
+            path: Path of the trace file
+        """
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {
+                "name": span.name,
+                "cat": "lowe-cli",
+                "ph": "X",
+                "ts": round((span.start - Profiler._origin) * 1_000_000, 3),
+                "dur": round(span.duration * 1_000_000, 3),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": span.args,
+            }
+            for span in Profiler.spans()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)